@@ -0,0 +1,55 @@
+"""
+NDI Wrapper using ctypes and NDI SDK 5
+This is a replacement for cyndilib to work around NDI SDK 6 bugs
+
+Shared by rvm-ndi-app and yolo8_ndi_app. Importing the package does not load
+the NDI runtime: the 'ctypes' backend locates and loads it when the first
+NDIFinder / NDIReceiver / NDISender is created (see find_ndi_library for the
+search order, or call configure(lib_path=...) with a path from the settings).
+The 'synthetic' backend generates frames in-process so the pipelines can be
+benchmarked without NDI hardware. Select it with set_backend('synthetic') or
+NDI_BACKEND=synthetic (see SyntheticNDIBackend.from_env for options).
+"""
+from .structs import (
+    NDIlib_source_t, NDIlib_find_create_t, NDIlib_video_frame_v2_t, NDIlib_recv_create_v3_t,
+    NDIlib_recv_performance_t, NDIlib_recv_queue_t, NDIlib_send_create_t, NDIlib_tally_t,
+    NDIlib_recv_color_format_e, NDIlib_recv_bandwidth_e, NDIlib_frame_type_e, NDIlib_frame_format_type_e,
+    NDIlib_FourCC_video_type_e, NDIlib_send_timecode_synthesize, NDIlib_recv_timestamp_undefined,
+    NDIFrameInfo,
+)
+from .backend import (
+    NDI_DLL_PATH, NDI_LIB_NAME, NDIBackend, CtypesNDIBackend,
+    configure, find_ndi_library, set_backend, get_backend,
+)
+from .color import BT709_UYVY_TO_RGB, uyvy_to_chw_float
+from .pool import PooledFrame, NDIFramePool, NDIFrameRing, pinned_allocator
+from .finder import make_source, NDISourceCache, NDIFinder
+from .receiver import NDIVideoFrameLease, NDIReceiver, NDIFrameSync, NDISubscription, NDIReceiverHub
+from .sender import NDISender, NDITally, NDIOutputActivity
+from .latency import LatencyController
+from .metrics import LatencyHistogram, HistogramSnapshot, MetricsRegistry, MetricsExporter
+
+__all__ = [
+    'NDIlib_source_t', 'NDIlib_find_create_t', 'NDIlib_video_frame_v2_t', 'NDIlib_recv_create_v3_t',
+    'NDIlib_recv_performance_t', 'NDIlib_recv_queue_t', 'NDIlib_send_create_t', 'NDIlib_tally_t',
+    'NDIlib_recv_color_format_e', 'NDIlib_recv_bandwidth_e', 'NDIlib_frame_type_e', 'NDIlib_frame_format_type_e',
+    'NDIlib_FourCC_video_type_e', 'NDIlib_send_timecode_synthesize', 'NDIlib_recv_timestamp_undefined',
+    'NDIFrameInfo',
+    'NDI_DLL_PATH', 'NDI_LIB_NAME', 'NDIBackend', 'CtypesNDIBackend',
+    'configure', 'find_ndi_library', 'set_backend', 'get_backend',
+    'BT709_UYVY_TO_RGB', 'uyvy_to_chw_float',
+    'PooledFrame', 'NDIFramePool', 'NDIFrameRing', 'pinned_allocator',
+    'make_source', 'NDISourceCache', 'NDIFinder',
+    'NDIVideoFrameLease', 'NDIReceiver', 'NDIFrameSync', 'NDISubscription', 'NDIReceiverHub',
+    'NDISender', 'NDITally', 'NDIOutputActivity', 'LatencyController',
+    'LatencyHistogram', 'HistogramSnapshot', 'MetricsRegistry', 'MetricsExporter',
+    'SyntheticNDIBackend', 'SentFrame',
+]
+
+
+def __getattr__(name):
+    # The synthetic backend is only imported when asked for
+    if name in ('SyntheticNDIBackend', 'SentFrame'):
+        from . import synthetic
+        return getattr(synthetic, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,415 @@
+"""
+NDI backends and backend selection
+
+The ctypes backend resolves and loads the NDI runtime only when the first
+NDI object is created, so importing the package never touches the library.
+"""
+import os
+import sys
+import ctypes
+import ctypes.util
+import threading
+from ctypes import c_bool, c_uint32, c_int, c_void_p, POINTER
+
+from .structs import (
+    NDIlib_source_t, NDIlib_find_create_t, NDIlib_video_frame_v2_t, NDIlib_recv_create_v3_t,
+    NDIlib_recv_performance_t, NDIlib_recv_queue_t, NDIlib_send_create_t, NDIlib_tally_t,
+)
+
+
+# ============================================================================
+# NDI Runtime Location
+# ============================================================================
+
+# NDI 5 DLL path (default install location on Windows)
+NDI_DLL_PATH = r"C:\Program Files\NDI\NDI 5 Tools\Runtime\Processing.NDI.Lib.x64.dll"
+
+# Runtime file name inside $NDI_RUNTIME_DIR_V5 / a configured directory
+if sys.platform == 'win32':
+    NDI_LIB_NAME = "Processing.NDI.Lib.x64.dll"
+elif sys.platform == 'darwin':
+    NDI_LIB_NAME = "libndi.dylib"
+else:
+    NDI_LIB_NAME = "libndi.so.5"
+
+_lib_path = None  # set by configure()
+
+
+def configure(lib_path=None):
+    """
+    Apply application settings (call before the first NDI object is created)
+
+    Args:
+        lib_path: NDI runtime library, or the directory containing it; takes
+            precedence over $NDI_LIB_PATH and $NDI_RUNTIME_DIR_V5
+    """
+    global _lib_path
+    _lib_path = lib_path or None
+
+
+def find_ndi_library(lib_path=None):
+    """
+    Locate the NDI runtime without loading it
+
+    Search order: lib_path, configure(lib_path=...), $NDI_LIB_PATH,
+    $NDI_RUNTIME_DIR_V5 (set by the NDI 5 runtime installer), NDI_DLL_PATH,
+    then the system loader path.
+
+    Returns:
+        path (or loader name) to pass to ctypes.CDLL
+
+    Raises:
+        RuntimeError: if the runtime is not found (lists the paths tried)
+    """
+    runtime_dir = os.environ.get('NDI_RUNTIME_DIR_V5')
+    candidates = [
+        lib_path,
+        _lib_path,
+        os.environ.get('NDI_LIB_PATH'),
+        os.path.join(runtime_dir, NDI_LIB_NAME) if runtime_dir else None,
+        NDI_DLL_PATH if sys.platform == 'win32' else None,
+    ]
+
+    tried = []
+    for candidate in candidates:
+        if not candidate:
+            continue
+        if os.path.isdir(candidate):
+            candidate = os.path.join(candidate, NDI_LIB_NAME)
+        if os.path.exists(candidate):
+            return candidate
+        tried.append(candidate)
+
+    found = ctypes.util.find_library('ndi')
+    if found:
+        return found
+
+    tried.append("system library path")
+    raise RuntimeError(
+        "NDI 5 runtime not found (tried: " + ", ".join(tried) + "). "
+        "Install the NDI 5 runtime, or set NDI_LIB_PATH / ndi_lib_path in the settings."
+    )
+
+
+# ============================================================================
+# NDI Backends
+# ============================================================================
+
+class NDIBackend:
+    """
+    Interface between the wrapper classes and an NDI implementation
+
+    Method names follow the NDI SDK functions they stand in for and take the
+    same structures. Handles returned by *_create are opaque to the wrapper
+    classes; a falsy handle means creation failed.
+    """
+
+    name = "base"
+
+    def initialize(self):
+        raise NotImplementedError
+
+    def find_create(self, find_settings):
+        raise NotImplementedError
+
+    def find_wait_for_sources(self, finder, timeout_ms):
+        """Block until the source list changes; returns False on timeout"""
+        raise NotImplementedError
+
+    def find_get_current_sources(self, finder):
+        """Returns a list of NDIlib_source_t"""
+        raise NotImplementedError
+
+    def find_destroy(self, finder):
+        raise NotImplementedError
+
+    def recv_create(self, recv_settings):
+        raise NotImplementedError
+
+    def recv_destroy(self, recv):
+        raise NotImplementedError
+
+    def recv_capture_video(self, recv, video_frame, timeout_ms):
+        """Fill video_frame (NDIlib_video_frame_v2_t) and return an NDIlib_frame_type_e"""
+        raise NotImplementedError
+
+    def recv_free_video(self, recv, video_frame):
+        raise NotImplementedError
+
+    def recv_get_no_connections(self, recv):
+        raise NotImplementedError
+
+    def recv_get_performance(self, recv, total, dropped):
+        """Fill total/dropped (NDIlib_recv_performance_t) frame counters"""
+        raise NotImplementedError
+
+    def recv_get_queue(self, recv, queue):
+        """Fill queue (NDIlib_recv_queue_t) with the frames waiting to be captured"""
+        raise NotImplementedError
+
+    def framesync_create(self, recv):
+        """Attach a frame synchronizer to recv (recv_capture_video must not be used afterwards)"""
+        raise NotImplementedError
+
+    def framesync_destroy(self, framesync):
+        raise NotImplementedError
+
+    def framesync_capture_video(self, framesync, video_frame, field_type):
+        """
+        Fill video_frame with the newest frame without waiting
+
+        The last frame is repeated if nothing new arrived; p_data is NULL
+        until the first frame has been received.
+        """
+        raise NotImplementedError
+
+    def framesync_free_video(self, framesync, video_frame):
+        raise NotImplementedError
+
+    def send_create(self, send_settings):
+        raise NotImplementedError
+
+    def send_destroy(self, sender):
+        raise NotImplementedError
+
+    def send_video(self, sender, video_frame):
+        raise NotImplementedError
+
+    def send_video_async(self, sender, video_frame):
+        """video_frame=None waits for the SDK to finish with the last async frame"""
+        raise NotImplementedError
+
+    def send_get_no_connections(self, sender, timeout_ms):
+        raise NotImplementedError
+
+    def send_get_tally(self, sender, tally, timeout_ms):
+        """Fill tally (NDIlib_tally_t); returns True if it changed within timeout_ms"""
+        raise NotImplementedError
+
+
+class CtypesNDIBackend(NDIBackend):
+    """NDI SDK 5 runtime loaded through ctypes"""
+
+    name = "ctypes"
+
+    def __init__(self, lib_path=None):
+        """
+        Args:
+            lib_path: runtime library or its directory (see find_ndi_library)
+        """
+        self.lib_path = find_ndi_library(lib_path)
+
+        # Load NDI library
+        lib = ctypes.CDLL(self.lib_path)
+
+        # NDIlib_initialize
+        lib.NDIlib_initialize.restype = c_bool
+
+        # NDIlib_find_create_v2
+        lib.NDIlib_find_create_v2.argtypes = [POINTER(NDIlib_find_create_t)]
+        lib.NDIlib_find_create_v2.restype = c_void_p
+
+        # NDIlib_find_wait_for_sources
+        lib.NDIlib_find_wait_for_sources.argtypes = [c_void_p, c_uint32]
+        lib.NDIlib_find_wait_for_sources.restype = c_bool
+
+        # NDIlib_find_get_current_sources
+        lib.NDIlib_find_get_current_sources.argtypes = [c_void_p, POINTER(c_uint32)]
+        lib.NDIlib_find_get_current_sources.restype = POINTER(NDIlib_source_t)
+
+        # NDIlib_find_destroy
+        lib.NDIlib_find_destroy.argtypes = [c_void_p]
+
+        # NDIlib_recv_create_v3
+        lib.NDIlib_recv_create_v3.argtypes = [POINTER(NDIlib_recv_create_v3_t)]
+        lib.NDIlib_recv_create_v3.restype = c_void_p
+
+        # NDIlib_recv_destroy
+        lib.NDIlib_recv_destroy.argtypes = [c_void_p]
+
+        # NDIlib_recv_capture_v2
+        lib.NDIlib_recv_capture_v2.argtypes = [
+            c_void_p,  # recv instance
+            POINTER(NDIlib_video_frame_v2_t),  # video frame
+            c_void_p,  # audio frame (NULL)
+            c_void_p,  # metadata frame (NULL)
+            c_uint32,  # timeout_in_ms
+        ]
+        lib.NDIlib_recv_capture_v2.restype = c_int
+
+        # NDIlib_recv_free_video_v2
+        lib.NDIlib_recv_free_video_v2.argtypes = [c_void_p, POINTER(NDIlib_video_frame_v2_t)]
+
+        # NDIlib_recv_get_no_connections
+        lib.NDIlib_recv_get_no_connections.argtypes = [c_void_p]
+        lib.NDIlib_recv_get_no_connections.restype = c_int
+
+        # NDIlib_recv_get_performance
+        lib.NDIlib_recv_get_performance.argtypes = [
+            c_void_p, POINTER(NDIlib_recv_performance_t), POINTER(NDIlib_recv_performance_t)
+        ]
+
+        # NDIlib_recv_get_queue
+        lib.NDIlib_recv_get_queue.argtypes = [c_void_p, POINTER(NDIlib_recv_queue_t)]
+
+        # NDIlib_framesync_create
+        lib.NDIlib_framesync_create.argtypes = [c_void_p]
+        lib.NDIlib_framesync_create.restype = c_void_p
+
+        # NDIlib_framesync_destroy
+        lib.NDIlib_framesync_destroy.argtypes = [c_void_p]
+
+        # NDIlib_framesync_capture_video
+        lib.NDIlib_framesync_capture_video.argtypes = [
+            c_void_p,  # framesync instance
+            POINTER(NDIlib_video_frame_v2_t),  # video frame
+            c_int,  # NDIlib_frame_format_type_e
+        ]
+
+        # NDIlib_framesync_free_video
+        lib.NDIlib_framesync_free_video.argtypes = [c_void_p, POINTER(NDIlib_video_frame_v2_t)]
+
+        # NDIlib_send_create
+        lib.NDIlib_send_create.argtypes = [POINTER(NDIlib_send_create_t)]
+        lib.NDIlib_send_create.restype = c_void_p
+
+        # NDIlib_send_destroy
+        lib.NDIlib_send_destroy.argtypes = [c_void_p]
+
+        # NDIlib_send_send_video_v2
+        lib.NDIlib_send_send_video_v2.argtypes = [c_void_p, POINTER(NDIlib_video_frame_v2_t)]
+
+        # NDIlib_send_send_video_async_v2
+        lib.NDIlib_send_send_video_async_v2.argtypes = [c_void_p, POINTER(NDIlib_video_frame_v2_t)]
+
+        # NDIlib_send_get_no_connections
+        lib.NDIlib_send_get_no_connections.argtypes = [c_void_p, c_uint32]
+        lib.NDIlib_send_get_no_connections.restype = c_int
+
+        # NDIlib_send_get_tally
+        lib.NDIlib_send_get_tally.argtypes = [c_void_p, POINTER(NDIlib_tally_t), c_uint32]
+        lib.NDIlib_send_get_tally.restype = c_bool
+
+        self._lib = lib
+
+    def initialize(self):
+        return self._lib.NDIlib_initialize()
+
+    def find_create(self, find_settings):
+        return self._lib.NDIlib_find_create_v2(ctypes.byref(find_settings))
+
+    def find_wait_for_sources(self, finder, timeout_ms):
+        return self._lib.NDIlib_find_wait_for_sources(finder, timeout_ms)
+
+    def find_get_current_sources(self, finder):
+        num_sources = c_uint32(0)
+        sources_ptr = self._lib.NDIlib_find_get_current_sources(finder, ctypes.byref(num_sources))
+        return [sources_ptr[i] for i in range(num_sources.value)]
+
+    def find_destroy(self, finder):
+        self._lib.NDIlib_find_destroy(finder)
+
+    def recv_create(self, recv_settings):
+        return self._lib.NDIlib_recv_create_v3(ctypes.byref(recv_settings))
+
+    def recv_destroy(self, recv):
+        self._lib.NDIlib_recv_destroy(recv)
+
+    def recv_capture_video(self, recv, video_frame, timeout_ms):
+        return self._lib.NDIlib_recv_capture_v2(
+            recv,
+            ctypes.byref(video_frame),
+            None,  # no audio
+            None,  # no metadata
+            timeout_ms
+        )
+
+    def recv_free_video(self, recv, video_frame):
+        self._lib.NDIlib_recv_free_video_v2(recv, ctypes.byref(video_frame))
+
+    def recv_get_no_connections(self, recv):
+        return self._lib.NDIlib_recv_get_no_connections(recv)
+
+    def recv_get_performance(self, recv, total, dropped):
+        self._lib.NDIlib_recv_get_performance(recv, ctypes.byref(total), ctypes.byref(dropped))
+
+    def recv_get_queue(self, recv, queue):
+        self._lib.NDIlib_recv_get_queue(recv, ctypes.byref(queue))
+
+    def framesync_create(self, recv):
+        return self._lib.NDIlib_framesync_create(recv)
+
+    def framesync_destroy(self, framesync):
+        self._lib.NDIlib_framesync_destroy(framesync)
+
+    def framesync_capture_video(self, framesync, video_frame, field_type):
+        self._lib.NDIlib_framesync_capture_video(framesync, ctypes.byref(video_frame), field_type)
+
+    def framesync_free_video(self, framesync, video_frame):
+        self._lib.NDIlib_framesync_free_video(framesync, ctypes.byref(video_frame))
+
+    def send_create(self, send_settings):
+        return self._lib.NDIlib_send_create(ctypes.byref(send_settings))
+
+    def send_destroy(self, sender):
+        self._lib.NDIlib_send_destroy(sender)
+
+    def send_video(self, sender, video_frame):
+        self._lib.NDIlib_send_send_video_v2(sender, ctypes.byref(video_frame))
+
+    def send_video_async(self, sender, video_frame):
+        self._lib.NDIlib_send_send_video_async_v2(
+            sender, ctypes.byref(video_frame) if video_frame is not None else None
+        )
+
+    def send_get_no_connections(self, sender, timeout_ms):
+        return self._lib.NDIlib_send_get_no_connections(sender, timeout_ms)
+
+    def send_get_tally(self, sender, tally, timeout_ms):
+        return self._lib.NDIlib_send_get_tally(sender, ctypes.byref(tally), timeout_ms)
+
+
+# ============================================================================
+# Backend Selection
+# ============================================================================
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def _create_backend(name):
+    if name == 'ctypes':
+        return CtypesNDIBackend()
+    if name == 'synthetic':
+        from .synthetic import SyntheticNDIBackend
+        return SyntheticNDIBackend.from_env()
+    raise ValueError(f"Unknown NDI backend: {name}")
+
+
+def set_backend(backend):
+    """
+    Select the backend used by NDIFinder / NDIReceiver / NDISender
+
+    Objects that already exist keep the backend they were created with.
+
+    Args:
+        backend: 'ctypes', 'synthetic' or an NDIBackend instance
+
+    Returns:
+        the NDIBackend now in use
+    """
+    global _backend
+    if isinstance(backend, str):
+        backend = _create_backend(backend)
+    with _backend_lock:
+        _backend = backend
+    return backend
+
+
+def get_backend():
+    """Current backend, created from $NDI_BACKEND ('ctypes' by default) on first use"""
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            _backend = _create_backend(os.environ.get('NDI_BACKEND', 'ctypes'))
+        return _backend
@@ -0,0 +1,256 @@
+"""
+Offline benchmark harness for the frame pipelines (no NDI, no GUI)
+
+The app-specific runners (python -m rvm_ndi.benchmark, yolo8_ndi_app/benchmark.py)
+describe a sweep of settings, and for every case call their process_frame on
+synthetic or recorded frames. This module provides the parts they share:
+frame generation, the sweep, the timing loop, and the JSON baseline with its
+comparison.
+"""
+import itertools
+import json
+import os
+import platform
+import time
+
+import numpy as np
+
+from .metrics import MetricsRegistry
+from .synthetic import SyntheticNDIBackend, _bgra_to_uyvy, _test_pattern
+
+RESOLUTIONS = {
+    '720p': (1280, 720),
+    '1080p': (1920, 1080),
+    '2160p': (3840, 2160),
+}
+
+# Histogram and summary value compared against a baseline by default
+COMPARE_STAGE = 'process_frame'
+COMPARE_METRICS = ('p50_ms', 'p95_ms', 'p99_ms', 'mean_ms')
+
+
+def parse_resolution(value):
+    """'1080p' or '1920x1080' -> (width, height)"""
+    if value in RESOLUTIONS:
+        return RESOLUTIONS[value]
+    try:
+        width, height = (int(v) for v in value.lower().split('x'))
+    except ValueError:
+        raise ValueError(f"Unknown resolution: {value} (use {', '.join(RESOLUTIONS)} or WIDTHxHEIGHT)")
+    return width, height
+
+
+def benchmark_frames(width, height, count=8, path=None, receive_format='bgra'):
+    """
+    Frames to feed to process_frame
+
+    Without path, count copies of the synthetic test pattern with a vertical
+    bar at different positions, so consecutive frames differ. With path, up to
+    count frames of a video or image file scaled to width x height.
+
+    Args:
+        receive_format: 'bgra' (H, W, 4) or 'uyvy' (H, W, 2), as received from NDI
+
+    Returns:
+        list of uint8 arrays
+    """
+    if path:
+        frames = SyntheticNDIBackend.load_frames(path, width, height, max_frames=count)
+    else:
+        base = _test_pattern(width, height)
+        bar_w = max(2, width // 48) & ~1
+        travel = max(width - bar_w, 1)
+        frames = []
+        for i in range(count):
+            frame = base.copy()
+            bar_x = (i * travel // count) & ~1
+            frame[:, bar_x:bar_x + bar_w, :3] = 255
+            frames.append(frame)
+
+    if receive_format == 'uyvy':
+        frames = [_bgra_to_uyvy(frame) for frame in frames]
+    return frames
+
+
+def sweep(axes, full=False):
+    """
+    Settings of every case in a sweep
+
+    Args:
+        axes: {name: [values]} in display order; the first value of each axis is
+            the base setting
+        full: every combination instead of one axis at a time
+
+    Returns:
+        list of {name: value}. One axis at a time, the base case comes first and
+        each further case changes a single axis.
+    """
+    names = list(axes)
+    if full:
+        return [dict(zip(names, values)) for values in itertools.product(*(axes[n] for n in names))]
+
+    base = {name: values[0] for name, values in axes.items()}
+    cases = [base]
+    for name in names:
+        for value in axes[name][1:]:
+            if value != base[name]:
+                cases.append(dict(base, **{name: value}))
+    return cases
+
+
+def case_name(settings):
+    """Stable name of a case, used to match it against a baseline"""
+    return ' '.join(f"{key}={value}" for key, value in settings.items())
+
+
+def run_case(process_frame, frames, num_frames=100, warmup=10, metrics=None):
+    """
+    Call process_frame on the frames in a loop and collect its latency
+
+    The warmup frames (model export, cuDNN autotuning, buffer allocation) are
+    not measured: the histograms are reset after them. The end-to-end time of
+    each call is recorded as 'process_frame' next to the stages that
+    process_frame records itself.
+
+    Args:
+        process_frame: function(frame) -> PooledFrame or None (failure)
+        metrics: MetricsRegistry that process_frame records into (a new one if None)
+
+    Returns:
+        {'frames', 'failed', 'fps', 'histograms': {stage: summary}}
+    """
+    metrics = metrics or MetricsRegistry()
+
+    def call(index):
+        result = process_frame(frames[index % len(frames)])
+        if result is not None:
+            result.release()
+        return result is not None
+
+    for index in range(warmup):
+        call(index)
+    metrics.reset()
+
+    failed = 0
+    start = time.perf_counter()
+    for index in range(num_frames):
+        t0 = time.perf_counter()
+        if call(warmup + index):
+            metrics.record(COMPARE_STAGE, (time.perf_counter() - t0) * 1000)
+        else:
+            failed += 1
+    elapsed = time.perf_counter() - start
+
+    report, _ = metrics.report()
+    return {
+        'frames': num_frames,
+        'failed': failed,
+        'fps': (num_frames - failed) / elapsed if elapsed > 0 else 0.0,
+        'histograms': report['histograms'],
+    }
+
+
+def print_case(name, result):
+    """Per-stage latency distribution of one case"""
+    print(f"\n[BENCHMARK] {name}")
+    print(f"  {result['frames'] - result['failed']} frames, {result['fps']:.2f} fps"
+          + (f", {result['failed']} failed" if result['failed'] else ""))
+    for stage, h in result['histograms'].items():
+        print(f"  {stage:20s}: mean={h['mean_ms']:7.2f}, p50={h['p50_ms']:7.2f}, p95={h['p95_ms']:7.2f}, "
+              f"p99={h['p99_ms']:7.2f}, max={h['max_ms']:7.2f} ms")
+
+
+def environment_info(**extra):
+    """Machine description stored with a baseline (numbers only compare on the same machine)"""
+    info = {
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'processor': platform.processor(),
+        'cpu_count': os.cpu_count(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+    }
+    try:
+        import cv2
+        info['opencv'] = cv2.__version__
+    except ImportError:
+        pass
+    info.update(extra)
+    return info
+
+
+def write_baseline(path, benchmark, cases, environment, config):
+    """
+    Write the results as a JSON baseline
+
+    Args:
+        benchmark: name of the pipeline ('rvm', 'yolo8')
+        cases: list of {'name', 'settings', 'frames', 'failed', 'fps', 'histograms'}
+        environment: environment_info()
+        config: options of the run (frame count, input, ...)
+    """
+    data = {
+        'benchmark': benchmark,
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'environment': environment,
+        'config': config,
+        'cases': cases,
+    }
+    with open(path, 'w') as f:
+        json.dump(data, f, indent=2)
+    print(f"\n[BENCHMARK] Results written to {path}")
+    return data
+
+
+def load_baseline(path):
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def compare_to_baseline(cases, baseline, tolerance=0.10, metric='p50_ms', stage=COMPARE_STAGE, environment=None):
+    """
+    Compare the cases with a baseline and print the differences
+
+    A case regresses when its stage/metric is more than tolerance (fraction)
+    above the baseline's value for the case of the same name. Cases missing
+    from either side are listed but do not count as regressions.
+
+    Args:
+        environment: environment_info() of this run; differences from the
+            baseline's machine are printed as a warning
+
+    Returns:
+        list of (name, baseline_ms, current_ms) of the regressed cases
+    """
+    before = {case['name']: case for case in baseline.get('cases', [])}
+    print(f"\n[BENCHMARK] Compared with baseline from {baseline.get('created', '?')} "
+          f"({stage} {metric}, tolerance {tolerance * 100:.0f}%)")
+    recorded = baseline.get('environment', {})
+    for key, value in (environment or {}).items():
+        if key in recorded and recorded[key] != value:
+            print(f"  [WARNING] {key} differs: baseline {recorded[key]!r}, now {value!r}")
+
+    regressions = []
+    for case in cases:
+        previous = before.pop(case['name'], None)
+        current = case['histograms'].get(stage, {}).get(metric)
+        if previous is None or current is None:
+            print(f"  {case['name']}: not in baseline")
+            continue
+        reference = previous['histograms'].get(stage, {}).get(metric)
+        if not reference:
+            print(f"  {case['name']}: no {stage} {metric} in baseline")
+            continue
+
+        change = current / reference - 1.0
+        regressed = change > tolerance
+        if regressed:
+            regressions.append((case['name'], reference, current))
+        print(f"  {'REGRESSION' if regressed else 'ok':10s} {case['name']}: "
+              f"{reference:.2f} -> {current:.2f} ms ({change * 100:+.1f}%)")
+    for name in before:
+        print(f"  {name}: not measured in this run")
+
+    if regressions:
+        print(f"[BENCHMARK] {len(regressions)} case(s) slower than the baseline")
+    return regressions
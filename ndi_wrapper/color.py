@@ -0,0 +1,66 @@
+"""
+Colour conversion helpers for received frames
+"""
+import numpy as np
+
+
+# BT.709 video-range UYVY -> RGB in 0-1:
+#   R = Ys + Cr * CR_R,  G = Ys + Cb * CB_G + Cr * CR_G,  B = Ys + Cb * CB_B
+# with Ys = (Y - 16) * Y_SCALE, Cb = U - 128, Cr = V - 128
+BT709_UYVY_TO_RGB = {
+    'Y_SCALE': 1.0 / 219.0,
+    'CR_R': 1.5748 / 224.0,
+    'CB_G': -0.1873 / 224.0,
+    'CR_G': -0.4681 / 224.0,
+    'CB_B': 1.8556 / 224.0,
+}
+
+
+def uyvy_to_chw_float(uyvy, out=None):
+    """
+    Convert a UYVY frame to normalized planar RGB (BT.709, video range)
+
+    The conversion works on whole macro-pixels (U Y0 V Y1), so chroma is never
+    upsampled into a temporary and the result can be written straight into a
+    model input buffer.
+
+    Args:
+        uyvy: numpy array (H, W, 2) uint8 as returned by a UYVY receiver
+        out: optional float32 array (3, H, W) to write into (C-contiguous)
+
+    Returns:
+        float32 array (3, H, W), RGB in 0-1
+    """
+    height, width = uyvy.shape[:2]
+    if width % 2:
+        raise ValueError("UYVY frame width must be even")
+
+    if out is None:
+        out = np.empty((3, height, width), dtype=np.float32)
+    elif out.shape != (3, height, width) or not out.flags['C_CONTIGUOUS']:
+        raise ValueError(f"out must be a C-contiguous (3, {height}, {width}) array")
+
+    k = BT709_UYVY_TO_RGB
+    pairs = uyvy.reshape(height, width // 2, 4)  # [U, Y0, V, Y1]
+
+    luma = pairs[:, :, 1::2].astype(np.float32)  # (H, W/2, 2)
+    luma -= 16.0
+    luma *= k['Y_SCALE']
+    cb = pairs[:, :, 0].astype(np.float32)  # (H, W/2)
+    cb -= 128.0
+    cr = pairs[:, :, 2].astype(np.float32)
+    cr -= 128.0
+
+    # Chroma offsets are computed once per macro-pixel and added to Y0 and Y1
+    r_offset = cr * k['CR_R']
+    g_offset = cb * k['CB_G']
+    g_offset += cr * k['CR_G']
+    b_offset = cb * k['CB_B']
+
+    planes = out.reshape(3, height, width // 2, 2)
+    for channel, offset in enumerate((r_offset, g_offset, b_offset)):
+        np.add(luma[:, :, 0], offset, out=planes[channel, :, :, 0])
+        np.add(luma[:, :, 1], offset, out=planes[channel, :, :, 1])
+
+    np.clip(out, 0.0, 1.0, out=out)
+    return out
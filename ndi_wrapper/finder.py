@@ -0,0 +1,247 @@
+"""
+Source discovery and the on-disk cache of last-known sources
+"""
+import os
+import json
+import time
+import threading
+
+from .structs import NDIlib_source_t, NDIlib_find_create_t
+from .backend import get_backend
+
+
+def make_source(name, url=None):
+    """
+    Build a source dict (as returned by NDIFinder.get_sources) from a name/URL
+
+    The NDIlib_source_t owns copies of the strings, so the dict stays valid
+    after the finder that reported it is destroyed. A source built from a
+    cached URL can be connected to without waiting for discovery.
+    """
+    ndi_source = NDIlib_source_t(
+        p_ndi_name=name.encode('utf-8') if name else None,
+        p_url_address=url.encode('utf-8') if url else None
+    )
+    return {
+        'name': name or "Unknown",
+        'url': url or "Unknown",
+        'ndi_source': ndi_source
+    }
+
+
+class NDISourceCache:
+    """
+    Last-known NDI sources and the last selected source, stored as JSON
+
+    File format: {"sources": {name: url}, "last_source": name}
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._sources = {}
+        self._last_source = None
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        try:
+            if not os.path.exists(self.path):
+                return
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+            with self._lock:
+                self._sources = dict(data.get('sources', {}))
+                self._last_source = data.get('last_source')
+        except Exception as e:
+            print(f"[WARNING] Failed to load NDI source cache: {e}")
+
+    def save(self):
+        with self._lock:
+            data = {'sources': dict(self._sources), 'last_source': self._last_source}
+        try:
+            with open(self.path, 'w') as f:
+                json.dump(data, f, indent=2)
+        except Exception as e:
+            print(f"[WARNING] Failed to save NDI source cache: {e}")
+
+    def update(self, sources):
+        """Record discovered sources (sources no longer on the network are kept)"""
+        changed = False
+        with self._lock:
+            for src in sources:
+                if src['url'] != "Unknown" and self._sources.get(src['name']) != src['url']:
+                    self._sources[src['name']] = src['url']
+                    changed = True
+        if changed:
+            self.save()
+
+    def remember_selection(self, source_info):
+        """Record the selected source as the one to reconnect to at startup"""
+        with self._lock:
+            self._last_source = source_info['name']
+            if source_info.get('url') not in (None, "Unknown"):
+                self._sources[source_info['name']] = source_info['url']
+        self.save()
+
+    def get(self, name):
+        """Source dict for a cached name, or None"""
+        with self._lock:
+            url = self._sources.get(name)
+        return make_source(name, url) if url else None
+
+    def last_source(self):
+        """Source dict for the last selected source, or None"""
+        with self._lock:
+            name = self._last_source
+        return self.get(name) if name else None
+
+    def sources(self):
+        with self._lock:
+            items = list(self._sources.items())
+        return [make_source(name, url) for name, url in items]
+
+
+class NDIFinder:
+    """NDI Source Finder"""
+
+    def __init__(self, cache=None):
+        """
+        Args:
+            cache: optional NDISourceCache updated with every discovered source
+        """
+        self._backend = get_backend()
+        self._finder = None
+        self._is_initialized = False
+        self.cache = cache
+
+        # Source registry kept up to date by start_discovery
+        self._registry = {}
+        self._registry_lock = threading.Lock()
+        self._listeners = []
+        self._discovery_thread = None
+        self._discovery_running = False
+
+    def initialize(self):
+        """Initialize NDI and create finder"""
+        if not self._backend.initialize():
+            raise RuntimeError("Failed to initialize NDI")
+
+        find_settings = NDIlib_find_create_t(
+            show_local_sources=True,
+            p_groups=None,
+            p_extra_ips=None
+        )
+
+        self._finder = self._backend.find_create(find_settings)
+        if not self._finder:
+            raise RuntimeError("Failed to create NDI Finder")
+
+        self._is_initialized = True
+
+    def get_sources(self):
+        """Get list of available NDI sources"""
+        if not self._is_initialized:
+            raise RuntimeError("Finder not initialized")
+
+        sources = []
+        for src in self._backend.find_get_current_sources(self._finder):
+            name = src.p_ndi_name.decode('utf-8') if src.p_ndi_name else None
+            url = src.p_url_address.decode('utf-8') if src.p_url_address else None
+            # Copy the strings: the SDK's array is only valid until the next call
+            sources.append(make_source(name, url))
+
+        return sources
+
+    def wait_for_sources(self, timeout_ms=1000):
+        """Block until the source list changes; returns False on timeout"""
+        if not self._is_initialized:
+            raise RuntimeError("Finder not initialized")
+        return self._backend.find_wait_for_sources(self._finder, timeout_ms)
+
+    def add_listener(self, on_added=None, on_removed=None):
+        """
+        Register callbacks for registry changes
+
+        Callbacks receive a source dict and run on the discovery thread;
+        GUI code must hand them over to its own thread (e.g. Tk's after()).
+        Sources already in the registry are reported to on_added immediately.
+        """
+        with self._registry_lock:
+            self._listeners.append((on_added, on_removed))
+            current = list(self._registry.values())
+        if on_added:
+            for src in current:
+                on_added(src)
+
+    def start_discovery(self, on_added=None, on_removed=None, timeout_ms=1000):
+        """
+        Track sources on a background thread with NDIlib_find_wait_for_sources
+
+        Args:
+            on_added / on_removed: optional callbacks (see add_listener)
+            timeout_ms: wait per iteration (bounds how fast stop_discovery returns)
+        """
+        if not self._is_initialized:
+            raise RuntimeError("Finder not initialized")
+        if on_added or on_removed:
+            self.add_listener(on_added, on_removed)
+        if self._discovery_thread:
+            return
+
+        self._discovery_running = True
+        self._discovery_thread = threading.Thread(
+            target=self._discovery_loop, args=(timeout_ms,), daemon=True
+        )
+        self._discovery_thread.start()
+
+    def stop_discovery(self):
+        self._discovery_running = False
+        if self._discovery_thread:
+            self._discovery_thread.join(timeout=2)
+            self._discovery_thread = None
+
+    @property
+    def sources(self):
+        """Snapshot of the source registry (no SDK call, never blocks)"""
+        with self._registry_lock:
+            return list(self._registry.values())
+
+    def _discovery_loop(self, timeout_ms):
+        while self._discovery_running:
+            try:
+                if self.wait_for_sources(timeout_ms):
+                    self._update_registry(self.get_sources())
+            except Exception as e:
+                print(f"[WARNING] NDI discovery error: {e}")
+                time.sleep(timeout_ms / 1000.0)
+
+    def _update_registry(self, sources):
+        current = {src['name']: src for src in sources}
+        with self._registry_lock:
+            added = [src for name, src in current.items()
+                     if name not in self._registry or self._registry[name]['url'] != src['url']]
+            removed = [src for name, src in self._registry.items() if name not in current]
+            for src in added:
+                self._registry[src['name']] = src
+            for src in removed:
+                del self._registry[src['name']]
+            listeners = list(self._listeners)
+
+        if self.cache is not None and added:
+            self.cache.update(added)
+
+        for on_added, on_removed in listeners:
+            for src in added:
+                if on_added:
+                    on_added(src)
+            for src in removed:
+                if on_removed:
+                    on_removed(src)
+
+    def close(self):
+        """Close finder and cleanup"""
+        self.stop_discovery()
+        if self._finder:
+            self._backend.find_destroy(self._finder)
+            self._finder = None
+        self._is_initialized = False
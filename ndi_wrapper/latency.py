@@ -0,0 +1,139 @@
+"""
+Closed-loop control of the inference resolution against a latency budget
+"""
+import collections
+
+
+class LatencyController:
+    """
+    Steps a resolution knob (RVM downsample_ratio, YOLO imgsz) so that the
+    per-frame inference time stays within a budget
+
+    levels are the allowed knob values, cheapest first. Every processed
+    frame is reported with record(); once a full window of frames has been
+    measured at the current level, a step is proposed:
+
+    - one level down when the window's percentile time exceeds budget_ms * high
+    - one level up when that time, scaled by cost(next) / cost(current),
+      would still be under budget_ms * low
+
+    The gap between high and low, the cost prediction and the fresh window
+    required after every change keep the knob from oscillating. The
+    proposal only takes effect when the caller accepts it with apply(), so
+    each model can switch resolution at a point where that is safe for it.
+    """
+
+    def __init__(self, levels, budget_ms=0.0, value=None, window=30, percentile=90,
+                 high=1.0, low=0.75, cost=lambda v: v * v):
+        """
+        Args:
+            levels: allowed knob values; a smaller value must be cheaper
+            budget_ms: per-frame budget (0 = not known yet, nothing is proposed;
+                see set_budget)
+            value: starting value (default: the largest level)
+            window: frames measured before a decision
+            percentile: percentile of the window compared with the budget
+            high, low: step down above budget_ms * high, up below budget_ms * low
+            cost: relative cost of a knob value (default: area, value ** 2)
+        """
+        self.budget_ms = budget_ms
+        self.window = window
+        self.percentile = percentile
+        self.high = high
+        self.low = low
+        self.cost = cost
+        self.steps_down = 0
+        self.steps_up = 0
+        self.pending = None
+        self._times = collections.deque(maxlen=window)
+        self.levels = []
+        self.value = None
+        self.set_levels(levels, value)
+
+    def set_levels(self, levels, value=None):
+        """Replace the allowed values, keeping the current one if it is still allowed"""
+        self.levels = sorted(set(levels))
+        if not self.levels:
+            raise ValueError("LatencyController needs at least one level")
+        if value is None:
+            value = self.value if self.value is not None else self.levels[-1]
+        # Nearest allowed value not above the requested one
+        allowed = [level for level in self.levels if level <= value]
+        value = allowed[-1] if allowed else self.levels[0]
+        if value != self.value:
+            self.value = value
+            self._times.clear()
+        self.pending = None
+
+    def set_budget(self, budget_ms):
+        """
+        Change the budget (e.g. the source frame rate changed)
+
+        The measured window stays valid; only a pending proposal made against
+        the old budget is dropped.
+
+        Returns:
+            True if the budget changed
+        """
+        if budget_ms == self.budget_ms:
+            return False
+        self.budget_ms = budget_ms
+        self.pending = None
+        return True
+
+    @property
+    def index(self):
+        return self.levels.index(self.value)
+
+    def record(self, elapsed_ms):
+        """
+        Report the inference time of one frame
+
+        Returns:
+            The proposed value (also kept in pending), or None to stay
+        """
+        self._times.append(elapsed_ms)
+        self.pending = None
+        if self.budget_ms <= 0 or len(self._times) < self.window:
+            return None
+
+        ordered = sorted(self._times)
+        measured = ordered[min(len(ordered) - 1, len(ordered) * self.percentile // 100)]
+        index = self.index
+        if measured > self.budget_ms * self.high and index > 0:
+            self.pending = self.levels[index - 1]
+        elif index < len(self.levels) - 1:
+            following = self.levels[index + 1]
+            predicted = measured * self.cost(following) / self.cost(self.value)
+            if predicted < self.budget_ms * self.low:
+                self.pending = following
+        return self.pending
+
+    @property
+    def stepping_up(self):
+        return self.pending is not None and self.pending > self.value
+
+    def apply(self):
+        """
+        Switch to the pending value; measurement starts over at the new level
+
+        Returns:
+            The new value, or None if nothing was pending
+        """
+        if self.pending is None:
+            return None
+        if self.pending > self.value:
+            self.steps_up += 1
+        else:
+            self.steps_down += 1
+        self.value, self.pending = self.pending, None
+        self._times.clear()
+        return self.value
+
+    def stats(self):
+        return {
+            'value': self.value,
+            'budget_ms': self.budget_ms,
+            'steps_down': self.steps_down,
+            'steps_up': self.steps_up,
+        }
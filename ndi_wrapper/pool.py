@@ -0,0 +1,245 @@
+"""
+Reference-counted frame buffers and the ring that queues them between threads
+"""
+import collections
+import threading
+import numpy as np
+
+
+class PooledFrame:
+    """
+    Reference-counted numpy buffer handed out by NDIFramePool
+
+    The buffer goes back to the pool when the last reference is released.
+    Call retain() before handing the frame to another thread and release()
+    once that thread is done with it.
+    """
+
+    def __init__(self, pool, array):
+        self._pool = pool
+        self._refs = 1
+        self.array = array
+        self.info = None  # NDIFrameInfo of the source frame (set by NDIReceiver)
+
+    def retain(self):
+        """Add a reference"""
+        with self._pool._lock:
+            if self._refs <= 0:
+                raise RuntimeError("PooledFrame already released")
+            self._refs += 1
+        return self
+
+    def release(self):
+        """Drop a reference (the buffer is recycled when none are left)"""
+        with self._pool._lock:
+            if self._refs <= 0:
+                return
+            self._refs -= 1
+            if self._refs > 0:
+                return
+        array = self.array
+        self.array = None
+        self._pool._recycle(array)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+        return False
+
+
+class NDIFramePool:
+    """
+    Pool of preallocated frame buffers, kept per (shape, dtype)
+
+    Input frames (receive_pooled) and output frames share the pool, also
+    across sources of different resolutions (RVMBatchEngine): every shape
+    has its own free list, so alternating resolutions reuse buffers too.
+    Free lists of the least recently used shapes are dropped once more than
+    max_shapes are kept, so a source that changes resolution does not leave
+    its old buffers behind for good.
+    """
+
+    def __init__(self, max_free=4, allocator=None, max_shapes=16):
+        """
+        Args:
+            max_free: max number of idle buffers kept per shape
+            allocator: callable(shape, dtype) returning a new C-contiguous
+                numpy array (np.empty if None; see pinned_allocator)
+            max_shapes: max number of shapes whose idle buffers are kept
+        """
+        self._lock = threading.Lock()
+        self._max_free = max_free
+        self._max_shapes = max_shapes
+        self._allocator = allocator if allocator is not None else np.empty
+        self._free = collections.OrderedDict()  # (shape, dtype) -> [np.ndarray], least recently used first
+        self.allocations = 0
+
+    def acquire(self, shape, dtype=np.uint8):
+        """
+        Get a buffer of the given shape
+
+        Returns:
+            PooledFrame with one reference (contents are undefined)
+        """
+        shape = tuple(shape)
+        key = (shape, np.dtype(dtype).str)
+
+        with self._lock:
+            free = self._free.get(key)
+            if free is not None:
+                self._free.move_to_end(key)
+            array = free.pop() if free else None
+
+            if array is None:
+                self.allocations += 1
+
+        if array is None:
+            array = self._allocator(shape, dtype)
+
+        return PooledFrame(self, array)
+
+    def _recycle(self, array):
+        """Return a buffer whose last reference was released"""
+        key = (array.shape, array.dtype.str)
+
+        with self._lock:
+            free = self._free.get(key)
+            if free is None:
+                free = self._free[key] = []
+                while len(self._free) > self._max_shapes:
+                    self._free.popitem(last=False)
+            if len(free) < self._max_free:
+                free.append(array)
+
+    def clear(self):
+        """Drop all idle buffers"""
+        with self._lock:
+            self._free.clear()
+
+
+def pinned_allocator(shape, dtype=np.uint8):
+    """
+    NDIFramePool allocator backed by page-locked (pinned) torch storage
+
+    torch.from_numpy() on these buffers yields pinned CPU tensors, so
+    .to('cuda', non_blocking=True) is a single asynchronous DMA copy
+    straight from the buffer the frame was received into. torch is only
+    imported when the first buffer is allocated.
+    """
+    import torch
+
+    torch_dtype = torch.from_numpy(np.empty(0, dtype=dtype)).dtype
+    # The array keeps the tensor (and its pinned allocation) alive
+    return torch.empty(tuple(shape), dtype=torch_dtype, pin_memory=True).numpy()
+
+
+class NDIFrameRing:
+    """
+    Small ring of PooledFrames between a capture thread and a consumer
+
+    Policies:
+        'latest': read() returns the newest frame and drops older ones
+                  (counted as dropped); a full ring overwrites its oldest
+                  frame (counted as overwritten).
+        'fifo':   frames are read strictly in arrival order; a full ring
+                  makes the producer wait, so the backlog stays in the SDK.
+    """
+
+    LATEST = 'latest'
+    FIFO = 'fifo'
+
+    def __init__(self, depth=3, policy=LATEST):
+        if policy not in (self.LATEST, self.FIFO):
+            raise ValueError(f"Unknown ring policy: {policy}")
+        self.depth = max(1, depth)
+        self.policy = policy
+        self._frames = collections.deque()
+        self._cond = threading.Condition()
+        self._closed = False
+
+        self.frames_pushed = 0
+        self.frames_read = 0
+        self.frames_dropped = 0
+        self.frames_overwritten = 0
+
+    def push(self, frame):
+        """
+        Queue a frame, taking over the caller's reference
+
+        Returns:
+            False if the ring was closed (the frame is released)
+        """
+        evicted = None
+        with self._cond:
+            if self.policy == self.FIFO:
+                while len(self._frames) >= self.depth and not self._closed:
+                    self._cond.wait()
+            elif len(self._frames) >= self.depth:
+                evicted = self._frames.popleft()
+                self.frames_overwritten += 1
+
+            if self._closed:
+                queued = False
+            else:
+                self._frames.append(frame)
+                self.frames_pushed += 1
+                self._cond.notify_all()
+                queued = True
+
+        if evicted is not None:
+            evicted.release()
+        if not queued:
+            frame.release()
+        return queued
+
+    def read(self, timeout=None):
+        """
+        Take the next frame (the newest one with the 'latest' policy)
+
+        Args:
+            timeout: seconds to wait for a frame (None waits forever)
+
+        Returns:
+            PooledFrame (caller must release()), or None on timeout/close
+        """
+        stale = []
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._frames or self._closed, timeout):
+                return None
+            if not self._frames:
+                return None
+
+            if self.policy == self.LATEST:
+                while len(self._frames) > 1:
+                    stale.append(self._frames.popleft())
+                self.frames_dropped += len(stale)
+
+            frame = self._frames.popleft()
+            self.frames_read += 1
+            self._cond.notify_all()
+
+        for old in stale:
+            old.release()
+        return frame
+
+    def close(self):
+        """Release queued frames and wake up waiting readers/writers"""
+        with self._cond:
+            self._closed = True
+            frames = list(self._frames)
+            self._frames.clear()
+            self._cond.notify_all()
+        for frame in frames:
+            frame.release()
+
+    def stats(self):
+        with self._cond:
+            return {
+                'pushed': self.frames_pushed,
+                'read': self.frames_read,
+                'dropped': self.frames_dropped,
+                'overwritten': self.frames_overwritten,
+                'queued': len(self._frames),
+            }
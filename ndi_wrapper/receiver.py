@@ -0,0 +1,825 @@
+"""
+NDI receiving: zero-copy leases, pooled/background capture, frame-synchronized
+capture and the shared receiver hub
+"""
+import time
+import threading
+import weakref
+import numpy as np
+
+from .structs import (
+    NDIlib_video_frame_v2_t, NDIlib_recv_create_v3_t, NDIlib_recv_performance_t, NDIlib_recv_queue_t,
+    NDIlib_recv_color_format_e, NDIlib_recv_bandwidth_e, NDIlib_frame_type_e, NDIlib_frame_format_type_e,
+    NDIFrameInfo, NDIlib_recv_timestamp_undefined, NDIlib_send_timecode_synthesize, _RECV_BYTES_PER_PIXEL,
+)
+from .backend import get_backend
+from .pool import NDIFramePool, NDIFrameRing
+
+
+class NDIVideoFrameLease:
+    """
+    Zero-copy video frame borrowed from an NDIReceiver
+
+    ``frame`` is a strided numpy view directly over the SDK buffer. It is only
+    valid until release() is called; copy anything that must outlive the lease.
+    """
+
+    def __init__(self, receiver, video_frame, frame):
+        self._receiver = receiver
+        self._video_frame = video_frame
+        self.frame = frame
+        self.fourcc = video_frame.FourCC
+        self.xres = video_frame.xres
+        self.yres = video_frame.yres
+        self.frame_rate_n = video_frame.frame_rate_N
+        self.frame_rate_d = video_frame.frame_rate_D
+        self.timecode = video_frame.timecode
+        self.timestamp = video_frame.timestamp
+        self.info = NDIFrameInfo.from_video_frame(video_frame)
+
+    @property
+    def released(self):
+        return self._video_frame is None
+
+    def release(self):
+        """Return the frame buffer to the SDK (safe to call more than once)"""
+        if self._video_frame is None:
+            return
+        video_frame = self._video_frame
+        self._video_frame = None
+        self.frame = None
+        self._receiver._leases.discard(self)
+        self._receiver._free_video(video_frame)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+        return False
+
+    def __del__(self):
+        # Leases dropped without release() would otherwise leak SDK buffers
+        try:
+            self.release()
+        except Exception:
+            pass
+
+
+class NDIReceiver:
+    """NDI Video Receiver"""
+
+    def __init__(self, source_info, color_format=NDIlib_recv_color_format_e.BGRX_BGRA):
+        """
+        Create receiver for given source
+
+        Args:
+            source_info: dict with 'name', 'url', 'ndi_source' (from Finder.get_sources())
+            color_format: NDIlib_recv_color_format_e. With UYVY_BGRA / UYVY_RGBA the
+                SDK delivers frames without alpha as UYVY (2 bytes per pixel)
+        """
+        self._backend = get_backend()
+        self._receiver = None
+        self._source_info = source_info
+        self._color_format = color_format
+        self._is_initialized = False
+        self.last_fourcc = None  # FourCC of the last received frame
+        self.last_info = None  # NDIFrameInfo of the last captured frame
+
+        # Timestamp gap detection (frames missing between two captures)
+        self.timestamp_gaps = 0
+        self.frames_missed = 0
+        self._leases = weakref.WeakSet()
+        self._video_frame = NDIlib_video_frame_v2_t()  # reused by the copying receive paths
+
+        # Background capture (start_capture)
+        self._capture_thread = None
+        self._capture_running = False
+        self._capture_pool = None
+        self._capture_ring = None  # ring read by read_frame()
+        self._capture_rings = []  # every ring fed by the capture thread
+        self._capture_lock = threading.Lock()
+        self._capture_errors = 0
+
+        self._framesync = None  # NDIFrameSync that owns capturing (create_framesync)
+
+    def initialize(self):
+        """Create NDI receiver"""
+        # Create receiver settings
+        ndi_source = self._source_info['ndi_source']
+
+        recv_settings = NDIlib_recv_create_v3_t(
+            source_to_connect_to=ndi_source,
+            color_format=self._color_format,
+            bandwidth=NDIlib_recv_bandwidth_e.highest,
+            allow_video_fields=True,
+            p_ndi_recv_name=b"Python NDI Receiver"
+        )
+
+        self._receiver = self._backend.recv_create(recv_settings)
+        if not self._receiver:
+            raise RuntimeError("Failed to create NDI Receiver")
+
+        self._is_initialized = True
+
+    def get_num_connections(self):
+        """Get number of active connections"""
+        if not self._is_initialized:
+            return 0
+        return self._backend.recv_get_no_connections(self._receiver)
+
+    def _capture_video(self, timeout_ms, video_frame=None):
+        """
+        Capture a video frame from the SDK
+
+        Args:
+            timeout_ms: timeout in milliseconds
+            video_frame: frame structure to fill (a new one if None)
+
+        Returns:
+            NDIlib_video_frame_v2_t owned by the SDK (must be freed with
+            backend.recv_free_video), or None if no video frame was received
+        """
+        if not self._is_initialized:
+            raise RuntimeError("Receiver not initialized")
+        if self._framesync is not None:
+            raise RuntimeError("Receiver is captured through its NDIFrameSync")
+
+        if video_frame is None:
+            video_frame = NDIlib_video_frame_v2_t()
+
+        frame_type = self._backend.recv_capture_video(self._receiver, video_frame, timeout_ms)
+
+        if frame_type != NDIlib_frame_type_e.video:
+            return None
+
+        if not video_frame.p_data:
+            # Free the video frame
+            self._backend.recv_free_video(self._receiver, video_frame)
+            return None
+
+        if video_frame.FourCC not in _RECV_BYTES_PER_PIXEL:
+            print(f"[WARNING] Unsupported NDI FourCC: 0x{video_frame.FourCC & 0xFFFFFFFF:08X}")
+            self._backend.recv_free_video(self._receiver, video_frame)
+            return None
+
+        info = NDIFrameInfo.from_video_frame(video_frame)
+        self._check_timestamp_gap(self.last_info, info)
+        self.last_fourcc = video_frame.FourCC
+        self.last_info = info
+        return video_frame
+
+    def _check_timestamp_gap(self, prev, info):
+        """Count frames missing between two captures from their timestamps"""
+        if prev is None or not info.frame_rate_n or not info.frame_rate_d:
+            return
+        if prev.timestamp in (0, NDIlib_recv_timestamp_undefined) or \
+                info.timestamp in (0, NDIlib_recv_timestamp_undefined):
+            return
+
+        interval = 10_000_000 * info.frame_rate_d / info.frame_rate_n  # 100ns units
+        delta = info.timestamp - prev.timestamp
+        if delta > 1.5 * interval:
+            self.timestamp_gaps += 1
+            self.frames_missed += int(round(delta / interval)) - 1
+
+    def get_performance(self):
+        """
+        Receive health counters
+
+        Returns:
+            dict with
+                total_video:   video frames received by the SDK since connecting
+                dropped_video: video frames the SDK dropped (capture too slow)
+                queued_video:  frames waiting in the SDK queue right now
+                timestamp_gaps / frames_missed: discontinuities seen by this
+                    receiver's captures (network drops upstream of the SDK, or
+                    frames dropped while nobody was capturing)
+        """
+        stats = {
+            'total_video': 0,
+            'dropped_video': 0,
+            'queued_video': 0,
+            'timestamp_gaps': self.timestamp_gaps,
+            'frames_missed': self.frames_missed,
+        }
+        if not self._is_initialized:
+            return stats
+
+        total = NDIlib_recv_performance_t()
+        dropped = NDIlib_recv_performance_t()
+        queue = NDIlib_recv_queue_t()
+        self._backend.recv_get_performance(self._receiver, total, dropped)
+        self._backend.recv_get_queue(self._receiver, queue)
+        stats['total_video'] = total.video_frames
+        stats['dropped_video'] = dropped.video_frames
+        stats['queued_video'] = queue.video_frames
+        return stats
+
+    @staticmethod
+    def _frame_view(video_frame):
+        """
+        Create a numpy view over the SDK frame buffer (no copy)
+
+        Returns:
+            numpy array (H, W, 4) for BGRA/BGRX/RGBA/RGBX or (H, W, 2) for UYVY,
+            strided by line_stride_in_bytes
+        """
+        width = video_frame.xres
+        height = video_frame.yres
+        stride = abs(video_frame.line_stride_in_bytes)
+        bpp = _RECV_BYTES_PER_PIXEL[video_frame.FourCC]
+
+        # Create numpy array from pointer
+        frame_array = np.ctypeslib.as_array(video_frame.p_data, shape=(stride * height,))
+
+        # Reshape to image and crop to actual width (still a view)
+        frame = frame_array.reshape((height, stride // bpp, bpp))
+        return frame[:, :width, :]
+
+    def receive_video(self, timeout_ms=5000):
+        """
+        Receive a video frame
+
+        Args:
+            timeout_ms: timeout in milliseconds
+
+        Returns:
+            numpy array (H, W, 4) in BGRA format (or (H, W, 2) UYVY when the
+            receiver was created with a UYVY color format), or None if no frame
+        """
+        video_frame = self._capture_video(timeout_ms, self._video_frame)
+        if video_frame is None:
+            return None
+
+        # Copy frame data before freeing
+        frame_copy = self._frame_view(video_frame).copy()
+
+        # Free the video frame
+        self._backend.recv_free_video(self._receiver, video_frame)
+
+        return frame_copy
+
+    def receive_into(self, buf, timeout_ms=5000):
+        """
+        Receive a video frame into a caller-supplied buffer
+
+        The SDK buffer is copied once, straight into buf. A CPU torch tensor
+        (e.g. pinned for asynchronous GPU upload) can be passed directly.
+
+        Args:
+            buf: numpy array or CPU torch tensor (H, W, 4) uint8 ((H, W, 2)
+                for UYVY) matching the source
+            timeout_ms: timeout in milliseconds
+
+        Returns:
+            True if a frame was written to buf, False if no frame
+
+        Raises:
+            ValueError: if the frame resolution does not match buf (the frame
+                is dropped; use receive_pooled to follow resolution changes)
+        """
+        if not isinstance(buf, np.ndarray):
+            buf = buf.numpy()  # shares the tensor's storage
+
+        video_frame = self._capture_video(timeout_ms, self._video_frame)
+        if video_frame is None:
+            return False
+
+        try:
+            frame = self._frame_view(video_frame)
+            if frame.shape != buf.shape:
+                raise ValueError(f"Frame shape {frame.shape} does not match buffer shape {buf.shape}")
+            np.copyto(buf, frame)
+        finally:
+            self._backend.recv_free_video(self._receiver, video_frame)
+
+        return True
+
+    def receive_pooled(self, pool, timeout_ms=5000):
+        """
+        Receive a video frame into a buffer taken from an NDIFramePool
+
+        Args:
+            pool: NDIFramePool
+            timeout_ms: timeout in milliseconds
+
+        Returns:
+            PooledFrame (caller must release()), or None if no frame
+        """
+        video_frame = self._capture_video(timeout_ms, self._video_frame)
+        if video_frame is None:
+            return None
+
+        try:
+            frame = self._frame_view(video_frame)
+            pooled = pool.acquire(frame.shape, frame.dtype)
+            np.copyto(pooled.array, frame)
+            pooled.info = self.last_info
+        finally:
+            self._backend.recv_free_video(self._receiver, video_frame)
+
+        return pooled
+
+    def receive_video_lease(self, timeout_ms=5000):
+        """
+        Receive a video frame without copying it
+
+        The returned lease holds the SDK buffer until it is released, either
+        explicitly with release() or by leaving a ``with`` block:
+
+            lease = receiver.receive_video_lease(timeout_ms=16)
+            if lease is not None:
+                with lease:
+                    process(lease.frame)
+
+        Args:
+            timeout_ms: timeout in milliseconds
+
+        Returns:
+            NDIVideoFrameLease, or None if no frame
+        """
+        video_frame = self._capture_video(timeout_ms)
+        if video_frame is None:
+            return None
+
+        lease = NDIVideoFrameLease(self, video_frame, self._frame_view(video_frame))
+        self._leases.add(lease)
+        return lease
+
+    def start_capture(self, pool=None, depth=3, policy=NDIFrameRing.LATEST):
+        """
+        Capture frames on a background thread into a ring buffer
+
+        While capturing, read frames with read_frame() instead of the receive_*
+        methods so a slow consumer never delays the next capture.
+
+        Args:
+            pool: NDIFramePool the frames are received into (a new one if None)
+            depth: ring size in frames
+            policy: NDIFrameRing.LATEST (drop stale frames) or NDIFrameRing.FIFO
+        """
+        if self._capture_ring is not None:
+            raise RuntimeError("Capture already running")
+
+        self._capture_ring = NDIFrameRing(depth, policy)
+        self.attach_ring(self._capture_ring, pool)
+
+    def attach_ring(self, ring, pool=None):
+        """
+        Feed an additional ring from the capture thread (starts it if needed)
+
+        Every attached ring receives a reference to each captured frame, so
+        several consumers share one connection without copying.
+        """
+        if not self._is_initialized:
+            raise RuntimeError("Receiver not initialized")
+        if self._framesync is not None:
+            raise RuntimeError("Receiver is captured through its NDIFrameSync")
+
+        with self._capture_lock:
+            self._capture_rings.append(ring)
+            if self._capture_thread is None:
+                self._capture_pool = pool if pool is not None else NDIFramePool()
+                self._capture_running = True
+                self._capture_thread = threading.Thread(target=self._capture_loop, daemon=True)
+                self._capture_thread.start()
+
+    def detach_ring(self, ring):
+        """Stop feeding a ring and release the frames still queued in it"""
+        with self._capture_lock:
+            if ring in self._capture_rings:
+                self._capture_rings.remove(ring)
+        ring.close()
+
+    def stop_capture(self):
+        """Stop the capture thread and release queued frames"""
+        if not self._capture_thread:
+            return
+        self._capture_running = False
+        with self._capture_lock:
+            rings, self._capture_rings = self._capture_rings, []
+        for ring in rings:
+            ring.close()
+        self._capture_thread.join(timeout=2)
+        self._capture_thread = None
+        self._capture_ring = None
+
+    @property
+    def is_capturing(self):
+        return self._capture_running
+
+    def read_frame(self, timeout_ms=100):
+        """
+        Read the next captured frame (see start_capture)
+
+        Returns:
+            PooledFrame (caller must release()), or None if no frame in time
+        """
+        if self._capture_ring is None:
+            raise RuntimeError("Capture not started")
+        return self._capture_ring.read(timeout_ms / 1000.0)
+
+    def capture_stats(self):
+        """Ring counters: pushed / read / dropped / overwritten / queued / errors"""
+        if self._capture_ring is None:
+            return {}
+        stats = self._capture_ring.stats()
+        stats['errors'] = self._capture_errors
+        return stats
+
+    def _capture_loop(self):
+        while self._capture_running:
+            try:
+                frame = self.receive_pooled(self._capture_pool, timeout_ms=100)
+            except Exception as e:
+                self._capture_errors += 1
+                print(f"[WARNING] NDI capture error: {e}")
+                time.sleep(0.1)
+                continue
+
+            if frame is None:
+                continue
+
+            with self._capture_lock:
+                rings = list(self._capture_rings)
+            for ring in rings:
+                ring.push(frame.retain())
+            frame.release()
+
+    def create_framesync(self, pool=None, frame_rate=None):
+        """
+        Capture through the SDK frame synchronizer instead of the receive queue
+
+        See NDIFrameSync. The receive_* / start_capture methods cannot be used
+        on this receiver afterwards.
+
+        Args:
+            pool: NDIFramePool the frames are copied into (a new one if None)
+            frame_rate: clock of NDIFrameSync.read() in frames per second
+                (None = follow the source frame rate)
+
+        Returns:
+            NDIFrameSync (closed together with the receiver)
+        """
+        if not self._is_initialized:
+            raise RuntimeError("Receiver not initialized")
+        if self._framesync is not None:
+            raise RuntimeError("Frame sync already created")
+        if self._capture_thread is not None:
+            raise RuntimeError("Capture running; stop_capture() first")
+
+        self._framesync = NDIFrameSync(self, pool, frame_rate)
+        return self._framesync
+
+    def _free_video(self, video_frame):
+        """Return a leased frame buffer to the SDK"""
+        if self._receiver:
+            self._backend.recv_free_video(self._receiver, video_frame)
+
+    def close(self):
+        """Close receiver and cleanup"""
+        self.stop_capture()
+
+        # Outstanding leases must be returned before the receiver is destroyed
+        for lease in list(self._leases):
+            lease.release()
+
+        # The synchronizer must go before the receiver it reads from
+        if self._framesync is not None:
+            self._framesync._destroy()
+            self._framesync = None
+
+        if self._receiver:
+            self._backend.recv_destroy(self._receiver)
+            self._receiver = None
+        self._is_initialized = False
+
+
+class NDIFrameSync:
+    """
+    Clocked capture through the SDK frame synchronizer (NDIlib_framesync_*)
+
+    The synchronizer drains the receive queue on the SDK side; capture_pooled()
+    never waits and always returns the newest frame, repeating the previous
+    one when nothing new has arrived. read() paces those captures on its own
+    clock, so a consumer sees one frame per tick with a steady cadence even
+    when the network delivers frames in bursts.
+
+    Has the read/stats/close interface of NDISubscription.
+    """
+
+    FRAMESYNC = 'framesync'  # NDIReceiverHub.subscribe() policy
+
+    def __init__(self, receiver, pool=None, frame_rate=None):
+        """
+        Args:
+            receiver: initialized NDIReceiver (see NDIReceiver.create_framesync)
+            pool: NDIFramePool the frames are copied into (a new one if None)
+            frame_rate: clock of read() in frames per second (None = source rate)
+        """
+        self.receiver = receiver
+        self.pool = pool if pool is not None else NDIFramePool()
+        self.frame_rate = frame_rate
+        self._backend = receiver._backend
+        self._framesync = self._backend.framesync_create(receiver._receiver)
+        if not self._framesync:
+            raise RuntimeError("Failed to create NDI frame sync")
+        self._video_frame = NDIlib_video_frame_v2_t()
+        self._lock = threading.Lock()
+        self._on_close = None  # set by NDIReceiverHub
+
+        self._next_tick = None
+        self.ticks = 0
+        self.new_frames = 0
+        self.repeated_frames = 0
+        self.unknown_frames = 0  # frames from a source without timestamps or timecodes
+        self.late_ticks = 0  # ticks skipped because the consumer was too slow
+        self._last_identity = None
+
+    @property
+    def closed(self):
+        return self._framesync is None
+
+    def capture_pooled(self, pool=None):
+        """
+        Copy the newest frame into a pooled buffer (never waits)
+
+        Returns:
+            PooledFrame (caller must release()), or None before the first frame
+        """
+        pool = pool if pool is not None else self.pool
+        with self._lock:
+            if self._framesync is None:
+                raise RuntimeError("Frame sync closed")
+
+            video_frame = self._video_frame
+            self._backend.framesync_capture_video(
+                self._framesync, video_frame, NDIlib_frame_format_type_e.progressive
+            )
+            # Every capture is paired with a free, also when nothing is returned
+            try:
+                if not video_frame.p_data:
+                    return None
+                if video_frame.FourCC not in _RECV_BYTES_PER_PIXEL:
+                    print(f"[WARNING] Unsupported NDI FourCC: 0x{video_frame.FourCC & 0xFFFFFFFF:08X}")
+                    return None
+
+                info = NDIFrameInfo.from_video_frame(video_frame)
+                receiver = self.receiver
+                identity = self._frame_identity(info)
+                if identity is None:
+                    # Neither timestamp nor timecode: a repeat cannot be told apart
+                    self.unknown_frames += 1
+                elif identity == self._last_identity:
+                    self.repeated_frames += 1
+                else:
+                    receiver._check_timestamp_gap(receiver.last_info, info)
+                    self.new_frames += 1
+                self._last_identity = identity
+                receiver.last_fourcc = video_frame.FourCC
+                receiver.last_info = info
+
+                frame = NDIReceiver._frame_view(video_frame)
+                pooled = pool.acquire(frame.shape, frame.dtype)
+                np.copyto(pooled.array, frame)
+                pooled.info = info
+            finally:
+                self._backend.framesync_free_video(self._framesync, video_frame)
+
+        return pooled
+
+    @staticmethod
+    def _frame_identity(info):
+        """
+        Value that changes from one source frame to the next
+
+        The receive timestamp when the sender provides one, else the timecode.
+        None when the source sets neither (both undefined), so repeats cannot
+        be detected.
+        """
+        if info.timestamp not in (0, NDIlib_recv_timestamp_undefined):
+            return ('timestamp', info.timestamp)
+        if info.timecode != NDIlib_send_timecode_synthesize:  # 0 is a valid timecode (midnight)
+            return ('timecode', info.timecode)
+        return None
+
+    def _period(self):
+        fps = self.frame_rate
+        if not fps and self.receiver.last_info is not None:
+            fps = self.receiver.last_info.frame_rate
+        return 1.0 / (fps or 60.0)
+
+    def read(self, timeout_ms=100):
+        """
+        Wait for the next clock tick and capture the newest frame
+
+        When the caller falls behind by more than a tick, the missed ticks are
+        skipped (counted in late_ticks) rather than returned back to back.
+
+        Returns:
+            PooledFrame (caller must release()), or None if the tick is more
+            than timeout_ms away or no frame has been received yet
+        """
+        period = self._period()
+        now = time.perf_counter()
+        if self._next_tick is None:
+            self._next_tick = now
+
+        wait = self._next_tick - now
+        if wait > timeout_ms / 1000.0:
+            time.sleep(timeout_ms / 1000.0)
+            return None
+        if wait > 0:
+            time.sleep(wait)
+        elif -wait >= period:
+            missed = int(-wait / period)
+            self.late_ticks += missed
+            self._next_tick += missed * period
+
+        self._next_tick += period
+        self.ticks += 1
+        return self.capture_pooled()
+
+    def stats(self):
+        """Clock counters: ticks / new / repeated / unknown (no timestamp or timecode) / late"""
+        return {
+            'ticks': self.ticks,
+            'new': self.new_frames,
+            'repeated': self.repeated_frames,
+            'unknown': self.unknown_frames,
+            'late': self.late_ticks,
+        }
+
+    def _destroy(self):
+        with self._lock:
+            if self._framesync is not None:
+                self._backend.framesync_destroy(self._framesync)
+                self._framesync = None
+
+    def close(self):
+        """Destroy the synchronizer (and its receiver when opened by NDIReceiverHub)"""
+        self._destroy()
+        if self.receiver._framesync is self:
+            self.receiver._framesync = None
+        if self._on_close is not None:
+            on_close, self._on_close = self._on_close, None
+            on_close(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class NDISubscription:
+    """
+    One consumer of an NDIReceiverHub source
+
+    Frames are read from the subscription's own ring, so each consumer picks
+    its policy independently (e.g. 'latest' for preview, 'fifo' for a recorder).
+    A 'fifo' subscriber that falls behind holds up the shared capture thread.
+    """
+
+    def __init__(self, hub, key, receiver, ring):
+        self._hub = hub
+        self._key = key
+        self.receiver = receiver
+        self._ring = ring
+
+    @property
+    def closed(self):
+        return self._hub is None
+
+    def read(self, timeout_ms=100):
+        """
+        Read the next frame
+
+        Returns:
+            PooledFrame (caller must release()), or None if no frame in time
+        """
+        if self._hub is None:
+            raise RuntimeError("Subscription closed")
+        return self._ring.read(timeout_ms / 1000.0)
+
+    def stats(self):
+        """Ring counters: pushed / read / dropped / overwritten / queued"""
+        return self._ring.stats()
+
+    def close(self):
+        """Unsubscribe (the connection closes with its last subscriber)"""
+        if self._hub is not None:
+            hub, self._hub = self._hub, None
+            hub._unsubscribe(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class NDIReceiverHub:
+    """
+    Shares one NDI connection per source between several consumers
+
+    The first subscribe() for a source opens an NDIReceiver and its capture
+    thread; later subscriptions attach a ring to the same receiver. Starting
+    or stopping a consumer therefore never reconnects the others.
+
+    Frame-synchronized subscriptions (policy 'framesync') take over capturing
+    from their receiver, so each one gets a connection of its own.
+    """
+
+    def __init__(self, pool=None):
+        self.pool = pool if pool is not None else NDIFramePool()
+        self._receivers = {}
+        self._subscriptions = {}
+        self._framesyncs = []
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(source_info, color_format):
+        return (source_info['name'], source_info.get('url'), int(color_format))
+
+    def subscribe(self, source_info, color_format=NDIlib_recv_color_format_e.BGRX_BGRA,
+                  policy=NDIFrameRing.LATEST, depth=3):
+        """
+        Subscribe to a source
+
+        Args:
+            source_info: Source dict from NDIFinder.get_sources()
+            color_format: Receive format (each format is a separate connection)
+            policy: NDIFrameRing.LATEST, NDIFrameRing.FIFO or NDIFrameSync.FRAMESYNC
+            depth: ring size in frames (ignored for 'framesync')
+
+        Returns:
+            NDISubscription, or NDIFrameSync for 'framesync' (close() it when done)
+        """
+        if policy == NDIFrameSync.FRAMESYNC:
+            return self._subscribe_framesync(source_info, color_format)
+
+        key = self._key(source_info, color_format)
+        with self._lock:
+            receiver = self._receivers.get(key)
+            if receiver is None:
+                receiver = NDIReceiver(source_info, color_format=color_format)
+                receiver.initialize()
+                self._receivers[key] = receiver
+
+            ring = NDIFrameRing(depth, policy)
+            receiver.attach_ring(ring, self.pool)
+            subscription = NDISubscription(self, key, receiver, ring)
+            self._subscriptions.setdefault(key, []).append(subscription)
+        return subscription
+
+    def _subscribe_framesync(self, source_info, color_format):
+        receiver = NDIReceiver(source_info, color_format=color_format)
+        receiver.initialize()
+        try:
+            framesync = receiver.create_framesync(self.pool)
+        except Exception:
+            receiver.close()
+            raise
+        framesync._on_close = self._close_framesync
+        with self._lock:
+            self._framesyncs.append(framesync)
+        return framesync
+
+    def _close_framesync(self, framesync):
+        with self._lock:
+            if framesync in self._framesyncs:
+                self._framesyncs.remove(framesync)
+        framesync.receiver.close()
+
+    def _unsubscribe(self, subscription):
+        receiver = None
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription._key, [])
+            if subscription in subscriptions:
+                subscriptions.remove(subscription)
+            subscription.receiver.detach_ring(subscription._ring)
+            if not subscriptions:
+                self._subscriptions.pop(subscription._key, None)
+                receiver = self._receivers.pop(subscription._key, None)
+
+        if receiver is not None:
+            receiver.close()
+
+    def stats(self):
+        """Per-source subscriber counts (frame-synchronized subscriptions included)"""
+        with self._lock:
+            counts = {key[0]: len(subs) for key, subs in self._subscriptions.items()}
+            for framesync in self._framesyncs:
+                name = framesync.receiver._source_info['name']
+                counts[name] = counts.get(name, 0) + 1
+            return counts
+
+    def close(self):
+        """Close all subscriptions and their connections"""
+        with self._lock:
+            subscriptions = [sub for subs in self._subscriptions.values() for sub in subs]
+            subscriptions += self._framesyncs
+        for subscription in subscriptions:
+            subscription.close()
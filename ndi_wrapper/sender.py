@@ -0,0 +1,351 @@
+"""
+NDI sending: async double-buffered output, compact key formats and output activity
+"""
+import time
+import collections
+from ctypes import POINTER, c_uint8
+import numpy as np
+
+from .structs import (
+    NDIlib_video_frame_v2_t, NDIlib_send_create_t, NDIlib_tally_t, NDIlib_FourCC_video_type_e,
+    NDIlib_send_timecode_synthesize,
+)
+from .backend import get_backend
+from .pool import PooledFrame
+
+
+# Key value (0-255) -> BT.709 video-range luma (16-235), so a white key stays
+# white after the receiver's YUV -> RGB conversion
+_KEY_TO_LUMA = np.round(16 + np.arange(256) * (219.0 / 255.0)).astype(np.uint8)
+
+
+class NDISender:
+    """NDI Video Sender"""
+
+    # send_mask() wire formats and their bytes per pixel
+    MASK_FORMATS = {'bgra': 4, 'uyva': 3, 'uyvy': 2}
+
+    def __init__(self, ndi_name="Python NDI Sender", async_send=False, clock_video=True):
+        """
+        Create NDI sender
+
+        Args:
+            ndi_name: Name of the NDI sender
+            async_send: Use NDIlib_send_send_video_async_v2 (send_video returns
+                immediately; the frame buffer is kept alive until the next submit)
+            clock_video: Let the SDK throttle sends to the declared frame rate.
+                Pass False when frames are already paced by a received source.
+        """
+        self._backend = get_backend()
+        self._sender = None
+        self._ndi_name = ndi_name
+        self._async_send = async_send
+        self._clock_video = clock_video
+        self._is_initialized = False
+
+        # Double-buffered frame structures: in async mode the SDK may still be
+        # reading the previous frame while the next one is being filled in
+        self._video_frames = [NDIlib_video_frame_v2_t(), NDIlib_video_frame_v2_t()]
+        self._frame_index = 0
+        self._inflight = None  # buffer owned by the SDK until the next async submit
+
+        # Preallocated wire buffers for send_mask (two, so one can be in flight)
+        self._wire_key = None
+        self._wire_buffers = []
+        self._wire_index = 0
+
+    @property
+    def async_send(self):
+        return self._async_send
+
+    def initialize(self):
+        """Create NDI sender"""
+        send_settings = NDIlib_send_create_t(
+            p_ndi_name=self._ndi_name.encode('utf-8'),
+            p_groups=None,
+            clock_video=self._clock_video,
+            clock_audio=False
+        )
+
+        self._sender = self._backend.send_create(send_settings)
+        if not self._sender:
+            raise RuntimeError("Failed to create NDI Sender")
+
+        self._is_initialized = True
+
+    def send_video(self, frame, frame_rate_n=None, frame_rate_d=None, info=None, alpha=True):
+        """
+        Send a video frame
+
+        Args:
+            frame: numpy array (H, W, 4) in BGRA format, or a PooledFrame holding one.
+                In async mode a PooledFrame is retained until the next submit, so
+                the caller may release it right away; a plain array must not be
+                modified until the next send_video/flush call.
+            frame_rate_n: Frame rate numerator (overrides info)
+            frame_rate_d: Frame rate denominator (overrides info)
+            info: NDIFrameInfo of the source frame; its frame rate, timecode and
+                timestamp are copied to the output (defaults to frame.info for a
+                PooledFrame, otherwise 30/1 with an SDK-synthesized timecode)
+            alpha: Send the fourth byte as alpha (BGRA). False sends BGRX, so
+                receivers treat the frame as opaque whatever the fourth byte holds
+                (e.g. a fill whose key goes out on another sender).
+        """
+        if not self._is_initialized:
+            raise RuntimeError("Sender not initialized")
+
+        owner = None
+        if isinstance(frame, PooledFrame):
+            if info is None:
+                info = frame.info
+            if self._async_send:
+                owner = frame.retain()
+            frame = frame.array
+
+        height, width = frame.shape[:2]
+
+        # Ensure frame is contiguous and in correct format
+        if not frame.flags['C_CONTIGUOUS']:
+            frame = np.ascontiguousarray(frame)
+            if owner is not None:
+                # The SDK reads the contiguous copy, not the pooled buffer
+                owner.release()
+                owner = None
+
+        fourcc = NDIlib_FourCC_video_type_e.BGRA if alpha else NDIlib_FourCC_video_type_e.BGRX
+        self._submit(frame, owner, width, height, fourcc, width * 4, info, frame_rate_n, frame_rate_d)
+
+    def send_mask(self, mask, fmt='uyvy', frame_rate_n=None, frame_rate_d=None, info=None):
+        """
+        Send a single-channel key without expanding it to BGRA in the caller
+
+        Formats:
+            'uyvy': luma = key (video range), chroma neutral - 2 bytes/pixel
+            'uyva': luma = key plus a full-range alpha plane - 3 bytes/pixel
+            'bgra': B = G = R = key, A = 255 (previous output) - 4 bytes/pixel
+
+        Args:
+            mask: numpy array (H, W) uint8 (0 = background, 255 = foreground),
+                a strided view such as the alpha channel of a BGRA frame,
+                or a PooledFrame holding one. It is converted into a sender-owned
+                wire buffer before returning, so the caller may reuse it at once.
+            fmt: Wire format (see MASK_FORMATS)
+            frame_rate_n: Frame rate numerator (overrides info)
+            frame_rate_d: Frame rate denominator (overrides info)
+            info: NDIFrameInfo of the source frame (see send_video)
+        """
+        if not self._is_initialized:
+            raise RuntimeError("Sender not initialized")
+        if fmt not in self.MASK_FORMATS:
+            raise ValueError(f"Unknown mask format: {fmt}")
+
+        if isinstance(mask, PooledFrame):
+            if info is None:
+                info = mask.info
+            mask = mask.array
+        if mask.ndim == 3:
+            mask = mask[:, :, 0]
+        height, width = mask.shape
+        if fmt != 'bgra' and width % 2:
+            raise ValueError(f"{fmt.upper()} needs an even width (got {width})")
+
+        buf = self._next_wire_buffer(fmt, height, width)
+        if fmt == 'bgra':
+            buf[:, :, :3] = mask[:, :, np.newaxis]
+            self._submit(buf, None, width, height, NDIlib_FourCC_video_type_e.BGRA,
+                         width * 4, info, frame_rate_n, frame_rate_d)
+            return
+
+        uyvy = buf[:height * width * 2].reshape(height, width, 2)
+        np.take(_KEY_TO_LUMA, mask, out=uyvy[:, :, 1], mode='clip')
+        if fmt == 'uyva':
+            buf[height * width * 2:].reshape(height, width)[:] = mask
+            fourcc = NDIlib_FourCC_video_type_e.UYVA
+        else:
+            fourcc = NDIlib_FourCC_video_type_e.UYVY
+        self._submit(buf, None, width, height, fourcc, width * 2, info, frame_rate_n, frame_rate_d)
+
+    def _next_wire_buffer(self, fmt, height, width):
+        """Alternate between two wire buffers; constant parts are filled once"""
+        key = (fmt, height, width)
+        if self._wire_key != key:
+            # An in-flight buffer stays referenced by self._inflight
+            self._wire_buffers = []
+            for _ in range(2):
+                if fmt == 'bgra':
+                    buf = np.empty((height, width, 4), dtype=np.uint8)
+                    buf[:, :, 3] = 255
+                else:
+                    buf = np.empty(height * width * self.MASK_FORMATS[fmt], dtype=np.uint8)
+                    buf[:height * width * 2].reshape(height, width, 2)[:, :, 0] = 128  # U/V
+                self._wire_buffers.append(buf)
+            self._wire_key = key
+            self._wire_index = 0
+
+        buf = self._wire_buffers[self._wire_index]
+        self._wire_index ^= 1
+        return buf
+
+    def _submit(self, data, owner, width, height, fourcc, stride, info, frame_rate_n, frame_rate_d):
+        # Timing follows the source frame unless overridden
+        if info is not None and info.frame_rate_d:
+            rate_n, rate_d = info.frame_rate_n, info.frame_rate_d
+            timecode, timestamp = info.timecode, info.timestamp
+        else:
+            rate_n, rate_d = 30, 1
+            timecode, timestamp = NDIlib_send_timecode_synthesize, 0
+        if frame_rate_n is not None:
+            rate_n, rate_d = frame_rate_n, frame_rate_d or 1
+
+        # Fill the frame structure that is not in flight
+        video_frame = self._video_frames[self._frame_index]
+        self._frame_index ^= 1
+        video_frame.xres = width
+        video_frame.yres = height
+        video_frame.FourCC = fourcc
+        video_frame.frame_rate_N = rate_n
+        video_frame.frame_rate_D = rate_d
+        video_frame.picture_aspect_ratio = width / height
+        video_frame.frame_format_type = 1  # Progressive
+        video_frame.timecode = timecode
+        video_frame.line_stride_in_bytes = stride
+        video_frame.p_metadata = None
+        video_frame.timestamp = timestamp
+
+        # Set data pointer
+        video_frame.p_data = data.ctypes.data_as(POINTER(c_uint8))
+
+        # Send frame
+        if not self._async_send:
+            self._backend.send_video(self._sender, video_frame)
+            return
+
+        self._backend.send_video_async(self._sender, video_frame)
+
+        # The SDK has now finished with the previous buffer
+        self._release_inflight()
+        self._inflight = owner if owner is not None else data
+
+    def get_num_connections(self, timeout_ms=0):
+        """Number of receivers connected to this output"""
+        if not self._is_initialized:
+            return 0
+        return self._backend.send_get_no_connections(self._sender, timeout_ms)
+
+    def get_tally(self, timeout_ms=0):
+        """
+        Tally state reported by downstream receivers
+
+        Returns:
+            NDITally(on_program, on_preview)
+        """
+        if not self._is_initialized:
+            return NDITally(False, False)
+        tally = NDIlib_tally_t()
+        self._backend.send_get_tally(self._sender, tally, timeout_ms)
+        return NDITally(bool(tally.on_program), bool(tally.on_preview))
+
+    def flush(self):
+        """Wait until the SDK has finished with the last async frame"""
+        if self._sender and self._inflight is not None:
+            self._backend.send_video_async(self._sender, None)
+        self._release_inflight()
+
+    def _release_inflight(self):
+        if isinstance(self._inflight, PooledFrame):
+            self._inflight.release()
+        self._inflight = None
+
+    def close(self):
+        """Close sender and cleanup"""
+        self.flush()
+        if self._sender:
+            self._backend.send_destroy(self._sender)
+            self._sender = None
+        self._is_initialized = False
+
+
+NDITally = collections.namedtuple('NDITally', ['on_program', 'on_preview'])
+
+
+class NDIOutputActivity:
+    """
+    Decides whether an NDISender's output is worth rendering
+
+    Modes:
+        'always':      always active
+        'connections': idle while no receiver is connected
+        'tally':       idle unless a receiver has the output on program or preview
+
+    While idle, should_process() lets through at most idle_fps frames per
+    second (0 = none); downstream receivers keep showing the last frame sent.
+    The SDK is polled at most every poll_interval seconds.
+    """
+
+    MODES = ('always', 'connections', 'tally')
+
+    def __init__(self, sender, mode='connections', idle_fps=1.0, poll_interval=0.5):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown activity mode: {mode}")
+        self.sender = sender
+        self.mode = mode
+        self.idle_fps = idle_fps
+        self.poll_interval = poll_interval
+
+        self.idle = False
+        self.connections = 0
+        self.tally = NDITally(False, False)
+        self.frames_skipped = 0
+        self._next_poll = 0.0
+        self._next_idle_frame = 0.0
+
+    def poll(self, now=None):
+        """
+        Refresh the idle state from the SDK (rate-limited)
+
+        Returns:
+            True if the idle state changed
+        """
+        now = time.perf_counter() if now is None else now
+        if now < self._next_poll:
+            return False
+        self._next_poll = now + self.poll_interval
+
+        if self.mode == 'always':
+            idle = False
+        else:
+            self.connections = self.sender.get_num_connections()
+            if self.mode == 'connections':
+                idle = self.connections == 0
+            else:
+                self.tally = self.sender.get_tally()
+                idle = not (self.tally.on_program or self.tally.on_preview)
+
+        changed = idle != self.idle
+        self.idle = idle
+        if changed and idle:
+            self._next_idle_frame = now
+        return changed
+
+    def should_process(self, now=None):
+        """True if the current frame should be rendered and sent"""
+        now = time.perf_counter() if now is None else now
+        self.poll(now)
+        if not self.idle:
+            return True
+
+        if self.idle_fps > 0 and now >= self._next_idle_frame:
+            self._next_idle_frame = now + 1.0 / self.idle_fps
+            return True
+
+        self.frames_skipped += 1
+        return False
+
+    @property
+    def reason(self):
+        """Short description of why the output is idle ('' when active)"""
+        if not self.idle:
+            return ""
+        if self.mode == 'connections' or self.connections == 0:
+            return "no receivers"
+        return "off tally"
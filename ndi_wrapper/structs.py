@@ -0,0 +1,158 @@
+"""
+ctypes declarations of the NDI SDK 5 structures, enums and constants
+"""
+import collections
+import ctypes
+from ctypes import c_char_p, c_bool, c_int, c_float, c_uint8, POINTER, Structure
+
+
+# ============================================================================
+# NDI Structures
+# ============================================================================
+
+class NDIlib_source_t(Structure):
+    _fields_ = [
+        ("p_ndi_name", c_char_p),
+        ("p_url_address", c_char_p),
+    ]
+
+class NDIlib_find_create_t(Structure):
+    _fields_ = [
+        ("show_local_sources", c_bool),
+        ("p_groups", c_char_p),
+        ("p_extra_ips", c_char_p),
+    ]
+
+class NDIlib_video_frame_v2_t(Structure):
+    _fields_ = [
+        ("xres", c_int),
+        ("yres", c_int),
+        ("FourCC", c_int),  # NDIlib_FourCC_video_type_e
+        ("frame_rate_N", c_int),
+        ("frame_rate_D", c_int),
+        ("picture_aspect_ratio", c_float),
+        ("frame_format_type", c_int),  # NDIlib_frame_format_type_e
+        ("timecode", ctypes.c_int64),
+        ("p_data", POINTER(c_uint8)),
+        ("line_stride_in_bytes", c_int),
+        ("p_metadata", c_char_p),
+        ("timestamp", ctypes.c_int64),
+    ]
+
+class NDIlib_recv_create_v3_t(Structure):
+    _fields_ = [
+        ("source_to_connect_to", NDIlib_source_t),
+        ("color_format", c_int),  # NDIlib_recv_color_format_e
+        ("bandwidth", c_int),  # NDIlib_recv_bandwidth_e
+        ("allow_video_fields", c_bool),
+        ("p_ndi_recv_name", c_char_p),
+    ]
+
+class NDIlib_recv_performance_t(Structure):
+    _fields_ = [
+        ("video_frames", ctypes.c_int64),
+        ("audio_frames", ctypes.c_int64),
+        ("metadata_frames", ctypes.c_int64),
+    ]
+
+class NDIlib_recv_queue_t(Structure):
+    _fields_ = [
+        ("video_frames", c_int),
+        ("audio_frames", c_int),
+        ("metadata_frames", c_int),
+    ]
+
+class NDIlib_send_create_t(Structure):
+    _fields_ = [
+        ("p_ndi_name", c_char_p),
+        ("p_groups", c_char_p),
+        ("clock_video", c_bool),
+        ("clock_audio", c_bool),
+    ]
+
+class NDIlib_tally_t(Structure):
+    _fields_ = [
+        ("on_program", c_bool),
+        ("on_preview", c_bool),
+    ]
+
+# ============================================================================
+# NDI Enums
+# ============================================================================
+
+class NDIlib_recv_color_format_e:
+    BGRX_BGRA = 0
+    UYVY_BGRA = 1
+    RGBX_RGBA = 2
+    UYVY_RGBA = 3
+
+class NDIlib_recv_bandwidth_e:
+    metadata_only = -10
+    audio_only = 10
+    lowest = 0
+    highest = 100
+
+class NDIlib_frame_type_e:
+    none = 0
+    video = 1
+    audio = 2
+    metadata = 3
+    error = 4
+    status_change = 100
+
+class NDIlib_frame_format_type_e:
+    interleaved = 0
+    progressive = 1
+    field_0 = 2
+    field_1 = 3
+
+class NDIlib_FourCC_video_type_e:
+    """NDI FourCC video format types"""
+    UYVY = 0x59565955  # 'UYVY' - YUV 4:2:2
+    UYVA = 0x41565955  # 'UYVA' - YUV 4:2:2:4
+    P216 = 0x36313250  # 'P216' - 16bpp
+    PA16 = 0x36314150  # 'PA16' - 16bpp with alpha
+    YV12 = 0x32315659  # 'YV12' - Planar 4:2:0
+    I420 = 0x30323449  # 'I420' - Planar 4:2:0
+    NV12 = 0x3231564E  # 'NV12' - Planar 4:2:0
+    BGRA = 0x41524742  # 'BGRA' - 8bit BGRA
+    BGRX = 0x58524742  # 'BGRX' - 8bit BGRX
+    RGBA = 0x41424752  # 'RGBA' - 8bit RGBA
+    RGBX = 0x58424752  # 'RGBX' - 8bit RGBX
+
+
+# Bytes per pixel of the packed FourCCs the receiver can deliver
+# (UYVY frames are exposed as (H, W, 2): [U|V, Y] per pixel)
+_RECV_BYTES_PER_PIXEL = {
+    NDIlib_FourCC_video_type_e.UYVY: 2,
+    NDIlib_FourCC_video_type_e.BGRA: 4,
+    NDIlib_FourCC_video_type_e.BGRX: 4,
+    NDIlib_FourCC_video_type_e.RGBA: 4,
+    NDIlib_FourCC_video_type_e.RGBX: 4,
+}
+
+# Let the SDK fill in the timecode of a sent frame
+NDIlib_send_timecode_synthesize = 0x7FFFFFFFFFFFFFFF
+
+# Received frame carries no timestamp (sender uses an old SDK)
+NDIlib_recv_timestamp_undefined = 0x7FFFFFFFFFFFFFFF
+
+
+class NDIFrameInfo(collections.namedtuple('NDIFrameInfo', [
+        'xres', 'yres', 'fourcc', 'frame_rate_n', 'frame_rate_d', 'timecode', 'timestamp'])):
+    """Timing/format fields of a received NDIlib_video_frame_v2_t"""
+
+    __slots__ = ()
+
+    @classmethod
+    def from_video_frame(cls, video_frame):
+        return cls(
+            video_frame.xres, video_frame.yres, video_frame.FourCC,
+            video_frame.frame_rate_N, video_frame.frame_rate_D,
+            video_frame.timecode, video_frame.timestamp,
+        )
+
+    @property
+    def frame_rate(self):
+        """Frames per second (0.0 if unknown)"""
+        return self.frame_rate_n / self.frame_rate_d if self.frame_rate_d else 0.0
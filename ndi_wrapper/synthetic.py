@@ -0,0 +1,435 @@
+"""
+In-process NDI backend that generates frames without the NDI runtime
+"""
+import os
+import time
+import collections
+import threading
+import ctypes
+from ctypes import POINTER, c_uint8, c_void_p
+import numpy as np
+
+from .structs import (
+    NDIlib_source_t, NDIlib_recv_color_format_e, NDIlib_frame_type_e, NDIlib_FourCC_video_type_e,
+)
+from .backend import NDIBackend
+
+
+SentFrame = collections.namedtuple('SentFrame', [
+    'sender', 'time', 'xres', 'yres', 'fourcc',
+    'frame_rate_n', 'frame_rate_d', 'timecode', 'timestamp', 'data',
+])
+
+
+def _bgra_to_uyvy(bgra):
+    """BGRA/BGRX (H, W, 4) -> UYVY (H, W, 2), BT.709 video range (test patterns only)"""
+    rgb = bgra[:, :, 2::-1].astype(np.float32) / 255.0
+    luma = rgb @ np.array([0.2126, 0.7152, 0.0722], dtype=np.float32)
+    cb = (rgb[:, :, 2] - luma) / 1.8556
+    cr = (rgb[:, :, 0] - luma) / 1.5748
+
+    height, width = luma.shape
+    uyvy = np.empty((height, width, 2), dtype=np.uint8)
+    uyvy[:, :, 1] = np.clip(16.0 + 219.0 * luma + 0.5, 0, 255)
+    # One chroma sample per pixel pair (average of both pixels)
+    cb = cb.reshape(height, width // 2, 2).mean(axis=2)
+    cr = cr.reshape(height, width // 2, 2).mean(axis=2)
+    uyvy[:, 0::2, 0] = np.clip(128.0 + 224.0 * cb + 0.5, 0, 255)
+    uyvy[:, 1::2, 0] = np.clip(128.0 + 224.0 * cr + 0.5, 0, 255)
+    return uyvy
+
+
+def _test_pattern(width, height):
+    """75% colour bars over a horizontal grey ramp, as BGRX"""
+    pattern = np.empty((height, width, 4), dtype=np.uint8)
+    pattern[:, :, 3] = 255
+
+    # White, yellow, cyan, green, magenta, red, blue (BGR)
+    bars = np.array([
+        (191, 191, 191), (0, 191, 191), (191, 191, 0), (0, 191, 0),
+        (191, 0, 191), (0, 0, 191), (191, 0, 0),
+    ], dtype=np.uint8)
+    bars_h = height * 2 // 3
+    columns = np.arange(width) * len(bars) // width
+    pattern[:bars_h, :, :3] = bars[columns][np.newaxis, :, :]
+
+    ramp = (np.arange(width) * 255 // max(width - 1, 1)).astype(np.uint8)
+    pattern[bars_h:, :, :3] = ramp[np.newaxis, :, np.newaxis]
+    return pattern
+
+
+class _SyntheticFinder:
+    def __init__(self):
+        self.reported = False  # the source list "changes" once, right after creation
+
+
+class _SyntheticReceiver:
+    def __init__(self, source_name, color_format):
+        self.source_name = source_name
+        self.color_format = color_format
+        self.start_time = time.perf_counter()
+        self.start_timestamp = int(time.time() * 10_000_000)  # 100ns units like the SDK
+        self.next_index = 0
+        self.idle_buffers = []  # (image, bar_x) not held by the caller
+        self.outstanding = {}  # p_data address -> (image, bar_x)
+        self.frames_received = 0
+        self.frames_dropped = 0
+
+
+class _SyntheticFrameSync:
+    def __init__(self, recv):
+        self.recv = recv
+
+
+class _SyntheticSender:
+    def __init__(self, name, clock_video):
+        self.name = name
+        self.clock_video = clock_video
+        self.next_due = None
+        self.frames_sent = 0
+
+        # Downstream state reported by send_get_no_connections / send_get_tally
+        self.connections = 1
+        self.on_program = False
+        self.on_preview = False
+
+
+class SyntheticNDIBackend(NDIBackend):
+    """
+    In-process NDI stand-in for benchmarking without NDI hardware or runtime
+
+    Every source delivers a test pattern with a moving bar (or a loop of
+    recorded frames) at a fixed resolution and frame rate, honouring the
+    receiver's color format. If the caller falls behind by more than
+    ``max_queue`` frames the oldest frames are dropped, like the SDK queue.
+    Senders record every frame they are given (SentFrame) with a
+    time.perf_counter() timestamp; read them back with sent_frames().
+    """
+
+    name = "synthetic"
+
+    def __init__(self, width=1920, height=1080, frame_rate=(60000, 1001), frames=None,
+                 source_names=("SYNTHETIC (Test Pattern)",), max_queue=4,
+                 keep_sent_frames=False, max_sent_records=10000):
+        """
+        Args:
+            width, height: source resolution (ignored when frames are given)
+            frame_rate: (numerator, denominator)
+            frames: optional sequence of recorded BGRA frames (H, W, 4) to loop
+            source_names: names of the sources the finder reports
+            max_queue: frames buffered per receiver before the oldest are dropped
+            keep_sent_frames: keep a copy of every sent frame's pixel data
+            max_sent_records: number of SentFrame records kept
+        """
+        if frames is not None and len(frames) > 0:
+            frames = [np.ascontiguousarray(f) for f in frames]
+            height, width = frames[0].shape[:2]
+        else:
+            frames = None
+
+        self.width = width - (width % 2)  # UYVY needs an even width
+        self.height = height
+        self.frame_rate = frame_rate
+        self._frames = frames
+        self._max_queue = max_queue
+        self._keep_sent_frames = keep_sent_frames
+
+        self._sources = [
+            NDIlib_source_t(name.encode('utf-8'), f"synthetic://{i}".encode('utf-8'))
+            for i, name in enumerate(source_names)
+        ]
+        self._patterns = {}  # FourCC -> base image (or list of recorded frames)
+        self._lock = threading.Lock()
+        self._sent = collections.deque(maxlen=max_sent_records)
+        self._senders = []
+
+    @classmethod
+    def from_env(cls):
+        """
+        Build from environment variables:
+            NDI_SYNTHETIC_RESOLUTION  e.g. 1920x1080 (default), 3840x2160
+            NDI_SYNTHETIC_FPS         e.g. 60000/1001 (default), 50, 29.97
+            NDI_SYNTHETIC_FRAMES      video/image file to loop instead of the test pattern
+        """
+        width, height = (int(v) for v in os.environ.get('NDI_SYNTHETIC_RESOLUTION', '1920x1080').lower().split('x'))
+
+        fps = os.environ.get('NDI_SYNTHETIC_FPS', '60000/1001')
+        if '/' in fps:
+            frame_rate = tuple(int(v) for v in fps.split('/'))
+        else:
+            frame_rate = (int(round(float(fps) * 1000)), 1000)
+
+        frames = None
+        frames_path = os.environ.get('NDI_SYNTHETIC_FRAMES')
+        if frames_path:
+            frames = cls.load_frames(frames_path, width, height)
+
+        return cls(width=width, height=height, frame_rate=frame_rate, frames=frames)
+
+    @staticmethod
+    def load_frames(path, width=None, height=None, max_frames=300):
+        """Load up to max_frames frames from a video or image file as BGRA"""
+        import cv2
+
+        frames = []
+        capture = cv2.VideoCapture(path)
+        try:
+            while len(frames) < max_frames:
+                ok, frame = capture.read()
+                if not ok:
+                    break
+                if width and height and frame.shape[:2] != (height, width):
+                    frame = cv2.resize(frame, (width, height), interpolation=cv2.INTER_AREA)
+                frames.append(cv2.cvtColor(frame, cv2.COLOR_BGR2BGRA))
+        finally:
+            capture.release()
+
+        if not frames:
+            raise RuntimeError(f"No frames could be read from: {path}")
+        return frames
+
+    def sent_frames(self, sender_name=None):
+        """SentFrame records (oldest first), optionally for one sender"""
+        with self._lock:
+            records = list(self._sent)
+        if sender_name is not None:
+            records = [r for r in records if r.sender == sender_name]
+        return records
+
+    def clear_sent_frames(self):
+        with self._lock:
+            self._sent.clear()
+
+    # --- NDIBackend -------------------------------------------------------
+
+    def initialize(self):
+        return True
+
+    def find_create(self, find_settings):
+        return _SyntheticFinder()
+
+    def find_wait_for_sources(self, finder, timeout_ms):
+        if not finder.reported:
+            finder.reported = True
+            return True
+        time.sleep(timeout_ms / 1000.0)
+        return False
+
+    def find_get_current_sources(self, finder):
+        return list(self._sources)
+
+    def find_destroy(self, finder):
+        pass
+
+    def recv_create(self, recv_settings):
+        source = recv_settings.source_to_connect_to
+        name = source.p_ndi_name.decode('utf-8') if source.p_ndi_name else ""
+        return _SyntheticReceiver(name, recv_settings.color_format)
+
+    def recv_destroy(self, recv):
+        recv.outstanding.clear()
+        recv.idle_buffers.clear()
+
+    def recv_capture_video(self, recv, video_frame, timeout_ms):
+        period = self.frame_rate[1] / self.frame_rate[0]
+        now = time.perf_counter()
+        latest = int((now - recv.start_time) / period)  # newest frame already "on the wire"
+
+        if recv.next_index > latest:
+            wait = recv.start_time + recv.next_index * period - now
+            if wait > timeout_ms / 1000.0:
+                time.sleep(timeout_ms / 1000.0)
+                return NDIlib_frame_type_e.none
+            time.sleep(wait)
+        elif latest - recv.next_index >= self._max_queue:
+            # The receive queue overflowed: the oldest frames are gone
+            dropped = latest - recv.next_index - self._max_queue + 1
+            recv.frames_dropped += dropped
+            recv.next_index += dropped
+
+        index = recv.next_index
+        recv.next_index += 1
+        recv.frames_received += 1
+
+        self._render(recv, index, video_frame)
+        return NDIlib_frame_type_e.video
+
+    def recv_free_video(self, recv, video_frame):
+        address = ctypes.cast(video_frame.p_data, c_void_p).value
+        buffer = recv.outstanding.pop(address, None)
+        if buffer is not None:
+            recv.idle_buffers.append(buffer)
+
+    def recv_get_no_connections(self, recv):
+        return 1
+
+    def recv_get_performance(self, recv, total, dropped):
+        total.video_frames = recv.frames_received + recv.frames_dropped
+        dropped.video_frames = recv.frames_dropped
+
+    def recv_get_queue(self, recv, queue):
+        period = self.frame_rate[1] / self.frame_rate[0]
+        latest = int((time.perf_counter() - recv.start_time) / period)
+        queue.video_frames = max(0, min(latest - recv.next_index + 1, self._max_queue))
+
+    def framesync_create(self, recv):
+        return _SyntheticFrameSync(recv)
+
+    def framesync_destroy(self, framesync):
+        framesync.recv = None
+
+    def framesync_capture_video(self, framesync, video_frame, field_type):
+        # The synchronizer drains the receive queue itself and hands out the
+        # newest frame, repeating it until the next one is on the wire
+        recv = framesync.recv
+        period = self.frame_rate[1] / self.frame_rate[0]
+        latest = int((time.perf_counter() - recv.start_time) / period)
+        if latest >= recv.next_index:
+            recv.frames_received += latest + 1 - recv.next_index
+            recv.next_index = latest + 1
+        self._render(recv, latest, video_frame)
+
+    def framesync_free_video(self, framesync, video_frame):
+        self.recv_free_video(framesync.recv, video_frame)
+
+    def send_create(self, send_settings):
+        name = send_settings.p_ndi_name.decode('utf-8') if send_settings.p_ndi_name else ""
+        sender = _SyntheticSender(name, bool(send_settings.clock_video))
+        with self._lock:
+            self._senders.append(sender)
+        return sender
+
+    def send_destroy(self, sender):
+        with self._lock:
+            if sender in self._senders:
+                self._senders.remove(sender)
+
+    def send_video(self, sender, video_frame):
+        if sender.clock_video and video_frame.frame_rate_N > 0:
+            # Emulate SDK clocking: block until the frame's slot at the declared rate
+            period = video_frame.frame_rate_D / video_frame.frame_rate_N
+            now = time.perf_counter()
+            if sender.next_due is not None and sender.next_due > now:
+                time.sleep(sender.next_due - now)
+                now = sender.next_due
+            sender.next_due = now + period
+
+        data = None
+        if self._keep_sent_frames:
+            size = abs(video_frame.line_stride_in_bytes) * video_frame.yres
+            if video_frame.FourCC == NDIlib_FourCC_video_type_e.UYVA:
+                size += video_frame.xres * video_frame.yres  # alpha plane follows the UYVY plane
+            data = np.ctypeslib.as_array(video_frame.p_data, shape=(size,)).copy()
+
+        record = SentFrame(
+            sender.name, time.perf_counter(), video_frame.xres, video_frame.yres,
+            video_frame.FourCC, video_frame.frame_rate_N, video_frame.frame_rate_D,
+            video_frame.timecode, video_frame.timestamp, data,
+        )
+        sender.frames_sent += 1
+        with self._lock:
+            self._sent.append(record)
+
+    def send_video_async(self, sender, video_frame):
+        if video_frame is not None:
+            self.send_video(sender, video_frame)
+
+    def send_get_no_connections(self, sender, timeout_ms):
+        return sender.connections
+
+    def send_get_tally(self, sender, tally, timeout_ms):
+        tally.on_program = sender.on_program
+        tally.on_preview = sender.on_preview
+        return False
+
+    def set_sender_state(self, sender_name, connections=None, on_program=None, on_preview=None):
+        """Simulate downstream receivers / tally for the senders with this name"""
+        with self._lock:
+            senders = [s for s in self._senders if s.name == sender_name]
+        for sender in senders:
+            if connections is not None:
+                sender.connections = connections
+            if on_program is not None:
+                sender.on_program = on_program
+            if on_preview is not None:
+                sender.on_preview = on_preview
+
+    # --- Frame rendering --------------------------------------------------
+
+    def _fourcc_for(self, color_format):
+        if color_format in (NDIlib_recv_color_format_e.UYVY_BGRA, NDIlib_recv_color_format_e.UYVY_RGBA):
+            return NDIlib_FourCC_video_type_e.UYVY
+        if color_format == NDIlib_recv_color_format_e.RGBX_RGBA:
+            return NDIlib_FourCC_video_type_e.RGBX
+        return NDIlib_FourCC_video_type_e.BGRX
+
+    def _pattern(self, fourcc):
+        """Base image(s) for a FourCC, converted once and cached"""
+        with self._lock:
+            pattern = self._patterns.get(fourcc)
+            if pattern is not None:
+                return pattern
+
+            if self._frames is not None:
+                bgra = self._frames
+            else:
+                bgra = [_test_pattern(self.width, self.height)]
+
+            if fourcc == NDIlib_FourCC_video_type_e.UYVY:
+                pattern = [_bgra_to_uyvy(f[:, :self.width]) for f in bgra]
+            elif fourcc == NDIlib_FourCC_video_type_e.RGBX:
+                pattern = [np.ascontiguousarray(f[:, :, [2, 1, 0, 3]]) for f in bgra]
+            else:
+                pattern = bgra
+
+            self._patterns[fourcc] = pattern
+            return pattern
+
+    def _render(self, recv, index, video_frame):
+        fourcc = self._fourcc_for(recv.color_format)
+        pattern = self._pattern(fourcc)
+
+        if self._frames is not None:
+            # Recorded frames are handed out directly (receivers never write to SDK buffers)
+            image = pattern[index % len(pattern)]
+        else:
+            image, bar_x = self._draw_bar(recv, pattern[0], index)
+            recv.outstanding[image.ctypes.data] = (image, bar_x)
+
+        height, width, bpp = image.shape
+        ticks = index * 10_000_000 * self.frame_rate[1] // self.frame_rate[0]
+
+        video_frame.xres = width
+        video_frame.yres = height
+        video_frame.FourCC = fourcc
+        video_frame.frame_rate_N = self.frame_rate[0]
+        video_frame.frame_rate_D = self.frame_rate[1]
+        video_frame.picture_aspect_ratio = width / height
+        video_frame.frame_format_type = 1  # Progressive
+        video_frame.timecode = ticks
+        video_frame.p_data = image.ctypes.data_as(POINTER(c_uint8))
+        video_frame.line_stride_in_bytes = width * bpp
+        video_frame.p_metadata = None
+        video_frame.timestamp = recv.start_timestamp + ticks
+
+    def _draw_bar(self, recv, base, index):
+        """Test pattern with a vertical bar that crosses the picture every 2 seconds"""
+        height, width, bpp = base.shape
+        bar_w = max(2, width // 48) & ~1
+        travel = width - bar_w
+        fps = self.frame_rate[0] / self.frame_rate[1]
+        bar_x = int(index * travel / (2.0 * fps)) % max(travel, 1) & ~1
+
+        # Reuse a buffer the caller has handed back: only the old bar needs restoring
+        if recv.idle_buffers:
+            image, old_x = recv.idle_buffers.pop()
+            image[:, old_x:old_x + bar_w] = base[:, old_x:old_x + bar_w]
+        else:
+            image = base.copy()
+
+        if bpp == 2:
+            image[:, bar_x:bar_x + bar_w, 0] = 128  # neutral chroma
+            image[:, bar_x:bar_x + bar_w, 1] = 235  # white
+        else:
+            image[:, bar_x:bar_x + bar_w, :3] = 255
+        return image, bar_x
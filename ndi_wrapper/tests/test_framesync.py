@@ -0,0 +1,100 @@
+"""NDIFrameSync: new vs repeated frames with and without source timestamps"""
+import time
+
+import pytest
+
+from ndi_wrapper import backend as backend_module
+from ndi_wrapper.finder import make_source
+from ndi_wrapper.receiver import NDIReceiver
+from ndi_wrapper.structs import NDIlib_recv_timestamp_undefined, NDIlib_send_timecode_synthesize
+from ndi_wrapper.synthetic import SyntheticNDIBackend
+
+
+class UntimedBackend(SyntheticNDIBackend):
+    """Synthetic source that leaves the timestamp (and optionally the timecode) undefined"""
+
+    def __init__(self, keep_timecode, **kwargs):
+        super().__init__(**kwargs)
+        self.keep_timecode = keep_timecode
+
+    def _render(self, recv, index, video_frame):
+        super()._render(recv, index, video_frame)
+        video_frame.timestamp = NDIlib_recv_timestamp_undefined
+        if not self.keep_timecode:
+            video_frame.timecode = NDIlib_send_timecode_synthesize
+
+
+def capture_twice_per_frame(backend, monkeypatch, frames=3):
+    monkeypatch.setattr(backend_module, '_backend', backend)
+    receiver = NDIReceiver(make_source("SYNTHETIC (Test Pattern)", "synthetic://0"))
+    receiver.initialize()
+    framesync = receiver.create_framesync()
+    try:
+        period = backend.frame_rate[1] / backend.frame_rate[0]
+        for _ in range(frames):
+            # Both captures fall within one source frame, the sleep moves to the next one
+            for _ in range(2):
+                framesync.capture_pooled().release()
+            time.sleep(period * 1.5)
+        return framesync.stats()
+    finally:
+        framesync.close()
+        receiver.close()
+
+
+@pytest.mark.parametrize('backend', [
+    SyntheticNDIBackend(width=64, height=32, frame_rate=(10, 1)),
+    UntimedBackend(keep_timecode=True, width=64, height=32, frame_rate=(10, 1)),
+], ids=['timestamp', 'timecode'])
+def test_repeats_detected(backend, monkeypatch):
+    stats = capture_twice_per_frame(backend, monkeypatch)
+    assert stats['new'] == 3
+    assert stats['repeated'] == 3
+    assert stats['unknown'] == 0
+
+
+def test_undefined_timestamp_and_timecode_not_counted_as_repeats(monkeypatch):
+    backend = UntimedBackend(keep_timecode=False, width=64, height=32, frame_rate=(10, 1))
+    stats = capture_twice_per_frame(backend, monkeypatch)
+    assert stats['repeated'] == 0
+    assert stats['new'] == 0
+    assert stats['unknown'] == 6
+
+
+class CountingBackend(SyntheticNDIBackend):
+    """Synthetic source that counts frame-sync captures and frees"""
+
+    def __init__(self, deliver=True, **kwargs):
+        super().__init__(**kwargs)
+        self.deliver = deliver
+        self.captures = 0
+        self.frees = 0
+
+    def framesync_capture_video(self, framesync, video_frame, field_type):
+        self.captures += 1
+        if self.deliver:
+            return super().framesync_capture_video(framesync, video_frame, field_type)
+        video_frame.p_data = None  # no frame received yet
+
+    def framesync_free_video(self, framesync, video_frame):
+        self.frees += 1
+        return super().framesync_free_video(framesync, video_frame)
+
+
+@pytest.mark.parametrize('deliver', [True, False], ids=['frame', 'no-frame'])
+def test_every_capture_is_freed(deliver, monkeypatch):
+    backend = CountingBackend(deliver=deliver, width=64, height=32, frame_rate=(10, 1))
+    monkeypatch.setattr(backend_module, '_backend', backend)
+    receiver = NDIReceiver(make_source("SYNTHETIC (Test Pattern)", "synthetic://0"))
+    receiver.initialize()
+    framesync = receiver.create_framesync()
+    try:
+        for _ in range(3):
+            frame = framesync.capture_pooled()
+            if frame is not None:
+                frame.release()
+            assert (frame is not None) == deliver
+    finally:
+        framesync.close()
+        receiver.close()
+    assert backend.captures == backend.frees == 3
@@ -0,0 +1,39 @@
+"""LatencyController: the budget follows the source frame rate after construction"""
+from ndi_wrapper.latency import LatencyController
+
+
+def fill(controller, elapsed_ms):
+    proposal = None
+    for _ in range(controller.window):
+        proposal = controller.record(elapsed_ms)
+    return proposal
+
+
+def test_no_budget_proposes_nothing():
+    controller = LatencyController([0.125, 0.25], window=4)
+    assert fill(controller, 100.0) is None
+
+
+def test_budget_set_after_construction_takes_effect():
+    # The controller is created before the first frame's rate is known
+    controller = LatencyController([0.125, 0.25], window=4)
+    assert controller.set_budget(1000.0 / 60)
+    assert fill(controller, 30.0) == 0.125
+
+
+def test_lower_source_rate_raises_the_budget():
+    # 60 fps -> 30 fps: 25ms is over the 60 fps budget but fits the 30 fps one
+    controller = LatencyController([0.125, 0.25], budget_ms=1000.0 / 60, window=4)
+    assert fill(controller, 25.0) == 0.125
+    assert controller.set_budget(1000.0 / 30)
+    assert controller.pending is None
+    assert controller.record(25.0) is None
+    assert controller.value == 0.25
+    assert controller.stats()['budget_ms'] == 1000.0 / 30
+
+
+def test_unchanged_budget_keeps_the_proposal():
+    controller = LatencyController([0.125, 0.25], budget_ms=10.0, window=4)
+    fill(controller, 25.0)
+    assert not controller.set_budget(10.0)
+    assert controller.pending == 0.125
@@ -0,0 +1,53 @@
+"""NDIFramePool: buffers are reused per shape, also when resolutions alternate"""
+import numpy as np
+
+from ndi_wrapper.pool import NDIFramePool
+
+
+def test_alternating_resolutions_reuse_buffers():
+    pool = NDIFramePool()
+    for _ in range(4):
+        for shape in ((1080, 1920, 4), (720, 1280, 4)):
+            pool.acquire(shape).release()
+    assert pool.allocations == 2
+
+
+def test_mixed_shapes_in_flight_reuse_buffers():
+    # RVMBatchEngine: two sources of different sizes, input frames and output masks held together
+    pool = NDIFramePool()
+    shapes = ((1080, 1920, 4), (1080, 1920), (720, 1280, 4), (720, 1280))
+    for _ in range(5):
+        frames = [pool.acquire(shape) for shape in shapes]
+        for frame in frames:
+            frame.release()
+    assert pool.allocations == len(shapes)
+
+
+def test_dtype_is_part_of_the_key():
+    pool = NDIFramePool()
+    pool.acquire((4, 4)).release()
+    frame = pool.acquire((4, 4), dtype=np.float32)
+    assert frame.array.dtype == np.float32
+    assert pool.allocations == 2
+
+
+def test_free_buffers_capped_per_shape():
+    pool = NDIFramePool(max_free=2)
+    frames = [pool.acquire((8, 8)) for _ in range(4)]
+    for frame in frames:
+        frame.release()
+    for _ in range(4):
+        pool.acquire((8, 8))
+    assert pool.allocations == 4 + 2
+
+
+def test_least_recently_used_shapes_dropped():
+    pool = NDIFramePool(max_shapes=2)
+    for size in (8, 16, 32):
+        pool.acquire((size, size)).release()
+    allocations = pool.allocations
+    pool.acquire((32, 32)).release()  # kept
+    pool.acquire((16, 16)).release()  # kept
+    assert pool.allocations == allocations
+    pool.acquire((8, 8)).release()  # dropped when the third shape came back
+    assert pool.allocations == allocations + 1
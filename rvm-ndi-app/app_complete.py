@@ -1,58 +1,31 @@
 """
 RobustVideoMatting NDI Application - Complete Version
 人物のアルファマスクをNDI出力
+
+処理はrvm_ndi.RVMEngineが行い、このウィンドウはその操作とプレビューのみ
+（GUIなしで動かす場合は python -m rvm_ndi）
 """
-import sys
-import os
 import time
 import threading
-import json
-import numpy as np
-import torch
 import cv2
 from PIL import Image
 import customtkinter as ctk
 from concurrent.futures import ThreadPoolExecutor
 
-# スレッド数制限（CPU使用率制御）
-torch.set_num_threads(4)  # PyTorchのスレッド数を4に制限
-cv2.setNumThreads(4)  # OpenCVのスレッド数を4に制限
-os.environ['OMP_NUM_THREADS'] = '4'  # OpenMPのスレッド数を4に制限
-os.environ['MKL_NUM_THREADS'] = '4'  # Intel MKLのスレッド数を4に制限
-
-# Get base path (works for both script and PyInstaller exe)
-if getattr(sys, 'frozen', False):
-    # Running as compiled executable
-    BASE_PATH = sys._MEIPASS
-else:
-    # Running as script
-    BASE_PATH = os.path.dirname(os.path.abspath(__file__))
-
-# Add RobustVideoMatting to path
-sys.path.insert(0, os.path.join(BASE_PATH, 'RobustVideoMatting'))
-
-from model import MattingNetwork
-from ndi_wrapper import NDIFinder, NDIReceiver, NDISender
+from rvm_ndi.engine import RVMEngine, DEVICE
 
-# GPU設定（詳細ログ付き）
-print("[INFO] Checking CUDA availability...")
-print(f"[INFO] torch.cuda.is_available() = {torch.cuda.is_available()}")
-if torch.cuda.is_available():
-    print(f"[INFO] CUDA device count: {torch.cuda.device_count()}")
-    print(f"[INFO] CUDA device name: {torch.cuda.get_device_name(0)}")
-    print(f"[INFO] CUDA version: {torch.version.cuda}")
-    DEVICE = 'cuda'
-else:
-    print("[WARNING] CUDA not available - will use CPU (slower)")
-    DEVICE = 'cpu'
 
-print(f"[INFO] Selected device: {DEVICE}")
-
-MODEL_PATH = os.path.join(BASE_PATH, 'RobustVideoMatting', 'rvm_mobilenetv3.pth')
-SETTINGS_FILE = 'rvm_settings.json'
+def frame_to_rgb(frame):
+    """受信フレーム（BGRA or UYVY）をRGB uint8に変換（プレビュー用）"""
+    if frame.shape[2] == 2:
+        return cv2.cvtColor(frame, cv2.COLOR_YUV2RGB_UYVY)
+    return cv2.cvtColor(frame[:, :, :3], cv2.COLOR_BGR2RGB)
 
 
 class RVMNDIApp(ctk.CTk):
+    # 出力モード（RVMEngine.output_mode）の表示名
+    OUTPUT_MODE_LABELS = {'key': "Key", 'fill_alpha': "Fill+Alpha", 'fill_key': "Fill / Key"}
+
     def __init__(self):
         super().__init__()
 
@@ -63,52 +36,31 @@ class RVMNDIApp(ctk.CTk):
         self.title("RobustVideoMatting NDI Application")
         self.geometry("1920x1080")
 
-        # NDI関連
-        self.finder = None
-        self.receiver = None
-        self.sender = None
-        self.preview_receiver = None  # プレビュー専用レシーバー
+        # 処理エンジン（モデル・NDI・処理ループ）
+        self.engine = RVMEngine()
+        self.engine.on_status = self.on_engine_status
+        self.engine.on_fps = self.on_engine_fps
+        self.engine.on_output = self.on_engine_output
+        self.engine.on_metrics = self.on_engine_metrics
+
+        # NDI関連（プレビューとソース選択）
+        self.preview_sub = None  # プレビュー用サブスクリプション
         self.ndi_sources = []
         self.selected_source = None
 
-        # AI Model
-        self.model = None
-        self.rec = [None] * 4  # Recurrent states
-
-        # RVM Parameters
-        self.downsample_ratio = 0.2  # 0.25→0.2に変更 (高速化のため解像度をさらに下げる)
-        self.prev_downsample_ratio = 0.2  # 前回の値を保存
-        self.alpha_threshold = 0.5
-        self.use_soft_alpha = False  # ソフトアルファ（グラデーション）を使用
-        self.alpha_contrast = 1.0  # アルファコントラスト調整
-        self.smoothing_enabled = False
-        self.smoothing_alpha = 0.3
-        self.edge_refinement = False
-        self.edge_kernel_size = 3
-        self.use_fp16 = True  # FP16 (半精度) モード - GPU演算を2倍高速化
-
-        # Processing
-        self.is_processing = False
-        self.processing_thread = None
-
-        # Stats
-        self.fps_counter = 0
-        self.fps_time = time.time()
-        self.current_fps = 0
-
         # Preview control
         self.preview_thread = None
         self.preview_running = False
         self.preview_lock = threading.Lock()  # プレビュー操作の排他制御
 
         # Load settings
-        self.load_settings()
+        self.engine.load_settings()
 
         # Build UI
         self.create_ui()
 
-        # Initialize NDI
-        self.initialize_ndi()
+        # Initialize NDI（ウィンドウ表示後にランタイムを読み込む）
+        self.after(100, self.initialize_ndi)
 
     def create_ui(self):
         # メインフレーム
@@ -145,6 +97,19 @@ class RVMNDIApp(ctk.CTk):
         )
         self.refresh_btn.pack(side="left", padx=10)
 
+        self.uyvy_check = ctk.CTkCheckBox(
+            source_frame,
+            text="UYVY Receive (Low Bandwidth)",
+            command=self.on_receive_format_toggle
+        )
+        self.uyvy_check.pack(side="left", padx=10)
+        if self.engine.receive_format == 'uyvy':
+            self.uyvy_check.select()
+        self.create_tooltip(
+            self.uyvy_check,
+            "NDIをUYVY (4:2:2) で受信\n受信データ量が半分になり、色変換をモデル入力作成時に1回で行う\nアルファ付きソースはBGRAのまま受信\n変更するとプレビューを再接続します"
+        )
+
         # モデル設定フレーム
         model_frame = ctk.CTkFrame(self.main_frame)
         model_frame.pack(fill="x", padx=20, pady=10)
@@ -180,6 +145,36 @@ class RVMNDIApp(ctk.CTk):
         self.output_name_entry.insert(0, "RVM Alpha Mask")
         self.output_name_entry.pack(side="left", padx=10)
 
+        ctk.CTkLabel(output_frame, text="Format:", font=("Arial", 14)).pack(side="left", padx=10)
+
+        self.output_format_menu = ctk.CTkOptionMenu(
+            output_frame,
+            values=["UYVY", "UYVA", "BGRA"],
+            command=self.on_output_format_change,
+            width=100
+        )
+        self.output_format_menu.set(self.engine.output_format.upper())
+        self.output_format_menu.pack(side="left", padx=10)
+        self.create_tooltip(
+            self.output_format_menu,
+            "NDI出力フォーマット\nUYVY = 輝度にマスク（2バイト/画素、最軽量）\nUYVA = UYVY + アルファプレーン（3バイト/画素）\nBGRA = 従来の白黒BGRA（4バイト/画素）"
+        )
+
+        ctk.CTkLabel(output_frame, text="Mode:", font=("Arial", 14)).pack(side="left", padx=10)
+
+        self.output_mode_menu = ctk.CTkOptionMenu(
+            output_frame,
+            values=list(self.OUTPUT_MODE_LABELS.values()),
+            command=self.on_output_mode_change,
+            width=120
+        )
+        self.output_mode_menu.set(self.OUTPUT_MODE_LABELS.get(self.engine.output_mode, "Key"))
+        self.output_mode_menu.pack(side="left", padx=10)
+        self.create_tooltip(
+            self.output_mode_menu,
+            "出力モード（次回のStart Processingから反映）\nKey = アルファマスクのみ（Formatで送信）\nFill+Alpha = 乗算済みフィル（前景×アルファ）とアルファのBGRA 1本\nFill / Key = フィル（BGRX）と\"<出力名> Key\"（Formatで送信）の2本\nフィルはRVMの前景から作るので、vMix側のキーイングが不要"
+        )
+
         # 処理開始/停止ボタン
         control_frame = ctk.CTkFrame(self.main_frame)
         control_frame.pack(fill="x", padx=20, pady=10)
@@ -223,6 +218,14 @@ class RVMNDIApp(ctk.CTk):
         )
         self.fps_label.pack(pady=5)
 
+        # 処理時間の分布（metrics_interval_sごとに更新）
+        self.latency_label = ctk.CTkLabel(
+            self.main_frame,
+            text="Latency: -",
+            font=("Arial", 12)
+        )
+        self.latency_label.pack(pady=5)
+
         # プレビューフレーム
         preview_frame = ctk.CTkFrame(self.main_frame)
         preview_frame.pack(fill="both", expand=True, padx=20, pady=10)
@@ -270,6 +273,23 @@ class RVMNDIApp(ctk.CTk):
             self.on_downsample_change
         )
 
+        # 1b. Auto Resolution
+        auto_resolution_frame = ctk.CTkFrame(scroll_frame)
+        auto_resolution_frame.pack(fill="x", pady=5)
+
+        self.auto_resolution_check = ctk.CTkCheckBox(
+            auto_resolution_frame,
+            text="Auto Resolution (Latency Budget)",
+            command=self.on_auto_resolution_toggle
+        )
+        if self.engine.auto_resolution:
+            self.auto_resolution_check.select()
+        self.auto_resolution_check.pack(side="left", padx=10)
+        self.create_tooltip(
+            self.auto_resolution_check,
+            "推論時間がフレーム間隔（予算）を超えたらDownsample Ratioを自動で下げる\n余裕ができたら上のスライダーの値まで戻す\n上げる時は被写体がいないフレームなどで切り替え\n推奨: GPUのない・負荷が変動するマシンでON"
+        )
+
         # 2. Soft Alpha (Gradient Alpha)
         soft_alpha_frame = ctk.CTkFrame(scroll_frame)
         soft_alpha_frame.pack(fill="x", pady=5)
@@ -291,7 +311,7 @@ class RVMNDIApp(ctk.CTk):
             "Alpha Threshold (Binary)",
             0.0, 1.0, 0.5,
             "人物と背景の境界閾値（二値化モード時のみ）\n小さい値 = より多くを人物として検出\n大きい値 = より厳密に人物を検出\n推奨: 0.3-0.7\n※ Soft Alpha使用時は無効",
-            lambda v: setattr(self, 'alpha_threshold', v)
+            lambda v: setattr(self.engine, 'alpha_threshold', v)
         )
 
         # 4. Alpha Contrast (ソフトアルファモード時)
@@ -300,7 +320,7 @@ class RVMNDIApp(ctk.CTk):
             "Alpha Contrast (Soft)",
             0.1, 3.0, 1.0,
             "アルファのコントラスト調整（ソフトアルファ時）\n小さい値 = ふわふわ（境界が広い）\n1.0 = 標準\n大きい値 = シャープ（境界が狭い）\n推奨: 0.8-1.5\n※ Soft Alpha使用時のみ有効",
-            lambda v: setattr(self, 'alpha_contrast', v)
+            lambda v: setattr(self.engine, 'alpha_contrast', v)
         )
 
         # 3. Temporal Smoothing
@@ -320,7 +340,7 @@ class RVMNDIApp(ctk.CTk):
             "Smoothing Alpha",
             0.0, 1.0, 0.3,
             "平滑化の強度\n小さい値 = 強い平滑化（遅延大）\n大きい値 = 弱い平滑化（遅延小）\n推奨: 0.2-0.5",
-            lambda v: setattr(self, 'smoothing_alpha', v)
+            lambda v: setattr(self.engine, 'smoothing_alpha', v)
         )
 
         # 4. Edge Refinement
@@ -333,14 +353,14 @@ class RVMNDIApp(ctk.CTk):
             command=self.on_edge_toggle
         )
         self.edge_check.pack(side="left", padx=10)
-        self.create_tooltip(self.edge_check, "エッジ精緻化処理\nマスクの境界をより滑らかに\n処理負荷が増加します")
+        self.create_tooltip(self.edge_check, "エッジ精緻化処理\nマスクの境界をより滑らかに\nモデルと同じデバイス上（アップサンプル前の解像度）で処理\nソフトアルファではコントラスト調整の後にぼかす")
 
         self.create_slider_with_tooltip(
             scroll_frame,
             "Edge Kernel Size",
             1, 9, 3,
-            "エッジ処理のカーネルサイズ（奇数のみ）\n小さい値 = 細かいエッジ処理\n大きい値 = 広範囲のエッジ処理\n推奨: 3-5",
-            lambda v: setattr(self, 'edge_kernel_size', int(v) if int(v) % 2 == 1 else int(v) + 1)
+            "エッジ処理のカーネルサイズ（奇数のみ、出力解像度の画素数）\nモデル解像度では最小3画素で処理\n小さい値 = 細かいエッジ処理\n大きい値 = 広範囲のエッジ処理\n推奨: 3-5",
+            lambda v: setattr(self.engine, 'edge_kernel_size', int(v) if int(v) % 2 == 1 else int(v) + 1)
         )
 
         # ボタンフレーム
@@ -405,21 +425,49 @@ class RVMNDIApp(ctk.CTk):
     def on_downsample_change(self, value):
         """Downsample ratio変更時の処理"""
         # 値のみ更新（recurrent statesのリセットはprocess_frameで行う）
-        self.downsample_ratio = value
+        self.engine.downsample_ratio = value
+
+    def on_auto_resolution_toggle(self):
+        """自動解像度の有効/無効切替"""
+        self.engine.auto_resolution = bool(self.auto_resolution_check.get())
+        print(f"[INFO] Auto resolution: {'ON' if self.engine.auto_resolution else 'OFF'}")
+
+    def on_receive_format_toggle(self):
+        """受信カラーフォーマット切替（BGRA / UYVY）"""
+        self.engine.receive_format = 'uyvy' if self.uyvy_check.get() else 'bgra'
+        print(f"[INFO] Receive format changed to: {self.engine.receive_format.upper()}")
+
+        # プレビューを新しいフォーマットで再接続（処理中のレシーバーは次回開始時に反映）
+        with self.preview_lock:
+            self.stop_preview()
+            if self.selected_source:
+                self.start_preview()
+
+    def on_output_format_change(self, value):
+        """NDI出力フォーマット変更（次のフレームから反映）"""
+        self.engine.output_format = value.lower()
+        print(f"[INFO] Output format changed to: {value}")
+
+    def on_output_mode_change(self, value):
+        """出力モード変更（送信先の作成が変わるので次回開始時に反映）"""
+        for mode, label in self.OUTPUT_MODE_LABELS.items():
+            if label == value:
+                self.engine.output_mode = mode
+        print(f"[INFO] Output mode changed to: {self.engine.output_mode}")
 
     def on_soft_alpha_toggle(self):
         """Soft Alpha有効/無効切替"""
-        self.use_soft_alpha = bool(self.soft_alpha_check.get())
-        mode = "Soft Alpha (Gradient)" if self.use_soft_alpha else "Binary (Hard Edge)"
+        self.engine.use_soft_alpha = bool(self.soft_alpha_check.get())
+        mode = "Soft Alpha (Gradient)" if self.engine.use_soft_alpha else "Binary (Hard Edge)"
         print(f"[INFO] Alpha mode changed to: {mode}")
 
     def on_smoothing_toggle(self):
         """Smoothing有効/無効切替"""
-        self.smoothing_enabled = bool(self.smooth_check.get())
+        self.engine.smoothing_enabled = bool(self.smooth_check.get())
 
     def on_edge_toggle(self):
         """Edge refinement有効/無効切替"""
-        self.edge_refinement = bool(self.edge_check.get())
+        self.engine.edge_refinement = bool(self.edge_check.get())
 
     def create_tooltip(self, widget, text):
         """ツールチップを作成（ホバー時に表示）"""
@@ -469,87 +517,50 @@ class RVMNDIApp(ctk.CTk):
     def save_settings(self):
         """設定をJSONファイルに保存"""
         try:
-            settings = {
-                'downsample_ratio': self.downsample_ratio,
-                'alpha_threshold': self.alpha_threshold,
-                'use_soft_alpha': self.use_soft_alpha,
-                'alpha_contrast': self.alpha_contrast,
-                'smoothing_enabled': self.smoothing_enabled,
-                'smoothing_alpha': self.smoothing_alpha,
-                'edge_refinement': self.edge_refinement,
-                'edge_kernel_size': self.edge_kernel_size
-            }
-
-            with open(SETTINGS_FILE, 'w') as f:
-                json.dump(settings, f, indent=2)
-
-            print(f"[INFO] Settings saved to {SETTINGS_FILE}")
+            self.engine.save_settings()
             self.status_label.configure(text="Settings saved successfully")
         except Exception as e:
             print(f"[ERROR] Failed to save settings: {e}")
             self.status_label.configure(text=f"Save failed: {e}")
 
-    def load_settings(self):
-        """設定をJSONファイルから読み込み"""
-        try:
-            if not os.path.exists(SETTINGS_FILE):
-                print(f"[INFO] Settings file not found, using defaults")
-                return
-
-            with open(SETTINGS_FILE, 'r') as f:
-                settings = json.load(f)
-
-            # パラメータを復元
-            self.downsample_ratio = settings.get('downsample_ratio', 0.25)
-            self.prev_downsample_ratio = self.downsample_ratio
-            self.alpha_threshold = settings.get('alpha_threshold', 0.5)
-            self.use_soft_alpha = settings.get('use_soft_alpha', False)
-            self.alpha_contrast = settings.get('alpha_contrast', 1.0)
-            self.smoothing_enabled = settings.get('smoothing_enabled', False)
-            self.smoothing_alpha = settings.get('smoothing_alpha', 0.3)
-            self.edge_refinement = settings.get('edge_refinement', False)
-            self.edge_kernel_size = settings.get('edge_kernel_size', 3)
-
-            print(f"[INFO] Settings loaded from {SETTINGS_FILE}")
-        except Exception as e:
-            print(f"[ERROR] Failed to load settings: {e}")
-
     def load_settings_btn(self):
         """設定読み込みボタン用（UIも更新）"""
-        self.load_settings()
+        self.engine.load_settings()
 
         # UIコンポーネントの更新
         if hasattr(self, 'soft_alpha_check'):
-            if self.use_soft_alpha:
+            if self.engine.use_soft_alpha:
                 self.soft_alpha_check.select()
             else:
                 self.soft_alpha_check.deselect()
 
         if hasattr(self, 'smooth_check'):
-            if self.smoothing_enabled:
+            if self.engine.smoothing_enabled:
                 self.smooth_check.select()
             else:
                 self.smooth_check.deselect()
 
         if hasattr(self, 'edge_check'):
-            if self.edge_refinement:
+            if self.engine.edge_refinement:
                 self.edge_check.select()
             else:
                 self.edge_check.deselect()
 
+        if hasattr(self, 'auto_resolution_check'):
+            if self.engine.auto_resolution:
+                self.auto_resolution_check.select()
+            else:
+                self.auto_resolution_check.deselect()
+
+        if hasattr(self, 'output_mode_menu'):
+            self.output_mode_menu.set(self.OUTPUT_MODE_LABELS.get(self.engine.output_mode, "Key"))
+
         self.status_label.configure(text="Settings loaded successfully")
         print("[INFO] Settings loaded and UI updated")
 
     def reset_parameters(self):
         """パラメータをデフォルト値にリセット"""
-        self.downsample_ratio = 0.25
-        self.alpha_threshold = 0.5
-        self.use_soft_alpha = False
-        self.alpha_contrast = 1.0
-        self.smoothing_enabled = False
-        self.smoothing_alpha = 0.3
-        self.edge_refinement = False
-        self.edge_kernel_size = 3
+        self.engine.reset_parameters()
 
         # チェックボックスの状態を更新
         if hasattr(self, 'soft_alpha_check'):
@@ -582,6 +593,7 @@ class RVMNDIApp(ctk.CTk):
 
             if selected_source:
                 self.selected_source = selected_source
+                self.engine.finder.cache.remember_selection(selected_source)
                 self.start_preview()
             else:
                 print(f"[WARNING] Source '{source_name}' not found in sources list")
@@ -595,22 +607,13 @@ class RVMNDIApp(ctk.CTk):
         try:
             print(f"[INFO] Starting preview for source: {self.selected_source['name']}")
 
-            # プレビュー用レシーバー作成
-            self.preview_receiver = NDIReceiver(self.selected_source)
-            self.preview_receiver.initialize()
-            print("[INFO] Preview receiver initialized")
-
-            # 接続確認（最大3秒待機）
-            print("[INFO] Waiting for connection...")
-            for i in range(30):  # 30 x 100ms = 3秒
-                time.sleep(0.1)
-                num_conn = self.preview_receiver.get_num_connections()
-                if num_conn > 0:
-                    print(f"[INFO] Connected to source (took {(i+1)*100}ms)")
-                    break
-            else:
-                print("[WARNING] No connection established yet, but starting preview anyway")
+            # プレビュー用に購読（処理中なら同じ接続を共有）
+            self.preview_sub = self.engine.receiver_hub.subscribe(
+                self.selected_source, color_format=self.engine.recv_color_format(), depth=1
+            )
+            print("[INFO] Preview subscription created")
 
+            # 接続待ちはしない（最初のフレームはキャプチャスレッドが届け次第表示）
             # プレビュースレッド開始
             self.preview_running = True
             self.preview_thread = threading.Thread(target=self.preview_loop, daemon=True)
@@ -624,7 +627,7 @@ class RVMNDIApp(ctk.CTk):
 
     def stop_preview(self):
         """プレビュー停止（lockの中で呼び出される前提）"""
-        if not self.preview_running and not self.preview_receiver:
+        if not self.preview_running and not self.preview_sub:
             return  # 既に停止済み
 
         print("[INFO] Stopping preview...")
@@ -637,18 +640,14 @@ class RVMNDIApp(ctk.CTk):
             self.preview_thread = None
             print("[DEBUG] Preview thread stopped")
 
-        # レシーバーをクローズ
-        if self.preview_receiver:
+        # 購読を解除（最後の購読者ならハブが接続を閉じる）
+        if self.preview_sub:
             try:
-                print("[DEBUG] Closing preview receiver...")
-                self.preview_receiver.close()
-                print("[DEBUG] Preview receiver closed")
+                self.preview_sub.close()
             except Exception as e:
-                print(f"[WARNING] Error closing preview receiver: {e}")
-            self.preview_receiver = None
+                print(f"[WARNING] Error closing preview subscription: {e}")
+            self.preview_sub = None
 
-        # NDIリソースが完全に解放されるまで待機
-        time.sleep(0.3)
         print("[INFO] Preview stopped")
 
     def preview_loop(self):
@@ -663,22 +662,25 @@ class RVMNDIApp(ctk.CTk):
             start_time = time.time()
 
             try:
-                # レシーバーの状態確認
-                if not self.preview_receiver or not self.preview_receiver._is_initialized:
-                    print("[ERROR] Preview receiver not initialized in loop")
+                # 購読の状態確認
+                if not self.preview_sub or self.preview_sub.closed:
+                    print("[ERROR] Preview subscription closed in loop")
                     break
 
-                # フレーム受信（短いタイムアウト）
-                frame = self.preview_receiver.receive_video(timeout_ms=16)
+                # 最新フレームを取得（古いフレームはハブ側で破棄される）
+                frame_buf = self.preview_sub.read(timeout_ms=100)
 
-                if frame is not None:
-                    if not first_frame_received:
-                        print(f"[INFO] First preview frame received: {frame.shape}")
-                        first_frame_received = True
+                if frame_buf is not None:
+                    try:
+                        if not first_frame_received:
+                            print(f"[INFO] First preview frame received: {frame_buf.array.shape}")
+                            first_frame_received = True
 
-                    frame_count += 1
-                    # 入力プレビューのみ更新
-                    self.update_input_preview(frame)
+                        frame_count += 1
+                        # 入力プレビューのみ更新（縮小コピーを作るので解放後も安全）
+                        self.update_input_preview(frame_buf.array)
+                    finally:
+                        frame_buf.release()
 
                     # 1秒ごとにフレーム数を表示
                     if frame_count % 60 == 0:
@@ -708,7 +710,7 @@ class RVMNDIApp(ctk.CTk):
             preview_h = int(h * preview_w / w)
 
             # RGB変換とリサイズ
-            input_rgb = cv2.cvtColor(input_frame[:, :, :3], cv2.COLOR_BGR2RGB)
+            input_rgb = frame_to_rgb(input_frame)
             input_small = cv2.resize(input_rgb, (preview_w, preview_h), interpolation=cv2.INTER_LINEAR)
             input_img = Image.fromarray(input_small)
             input_photo = ctk.CTkImage(light_image=input_img, dark_image=input_img, size=(preview_w, preview_h))
@@ -726,15 +728,20 @@ class RVMNDIApp(ctk.CTk):
     def initialize_ndi(self):
         """NDI初期化"""
         try:
-            print("[INFO] Initializing NDI...")
-            self.finder = NDIFinder()
-            self.finder.initialize()
+            # 探索スレッドからの追加・削除通知はUIスレッドで反映
+            self.engine.initialize_ndi(on_sources_changed=lambda: self.after(0, self.refresh_sources))
             self.status_label.configure(text="NDI Initialized")
-            print("[INFO] NDI initialized successfully")
 
-            # ソースリスト更新
-            print("[INFO] Scheduling source refresh in 1 second...")
-            self.after(1000, self.refresh_sources)
+            # 前回のソースにURLで直接接続（探索の完了を待たない）
+            last_source = self.engine.finder.cache.last_source()
+            if last_source:
+                print(f"[INFO] Connecting to last source: {last_source['name']} ({last_source['url']})")
+                self.ndi_sources = [last_source]
+                self.source_menu.configure(values=[last_source['name']])
+                self.source_menu.set(last_source['name'])
+                with self.preview_lock:
+                    self.selected_source = last_source
+                    self.start_preview()
         except Exception as e:
             import traceback
             print(f"[ERROR] NDI initialization failed: {e}")
@@ -742,24 +749,30 @@ class RVMNDIApp(ctk.CTk):
             self.status_label.configure(text=f"NDI Error: {e}")
 
     def refresh_sources(self):
-        """NDIソースリスト更新"""
-        print("[INFO] refresh_sources called")
-        if not self.finder:
+        """NDIソースリスト更新（探索スレッドのレジストリを参照するので待機なし）"""
+        if not self.engine.finder:
             print("[WARNING] Finder not initialized")
             return
 
         try:
-            print("[INFO] Waiting 0.5s for source discovery...")
-            time.sleep(0.5)  # Wait for source discovery
-
-            print("[INFO] Getting NDI sources...")
-            self.ndi_sources = self.finder.get_sources()
-            print(f"[INFO] Found {len(self.ndi_sources)} source(s)")
+            # 選択中のソースは同じdictを使い続ける（ハブの接続を共有するため）
+            selected = self.selected_source
+            self.ndi_sources = [
+                selected if selected and src['name'] == selected['name'] else src
+                for src in self.engine.finder.sources
+            ]
+            # 探索でまだ見つかっていない選択中ソース（キャッシュから接続）も残す
+            if selected and selected not in self.ndi_sources:
+                self.ndi_sources.append(selected)
 
             if self.ndi_sources:
                 source_names = [src['name'] for src in self.ndi_sources]
                 print(f"[INFO] Sources: {source_names}")
                 self.source_menu.configure(values=source_names)
+                self.status_label.configure(text=f"Found {len(self.ndi_sources)} source(s)")
+
+                if selected:
+                    return  # 選択中のソースはそのまま（再接続しない）
 
                 # 映像があるソースを優先的に選択（Test Pattern, vMix Outputなど）
                 preferred_source = None
@@ -773,13 +786,12 @@ class RVMNDIApp(ctk.CTk):
                     preferred_source = self.ndi_sources[0]
 
                 self.source_menu.set(preferred_source['name'])
-                self.status_label.configure(text=f"Found {len(self.ndi_sources)} source(s)")
 
                 # 選択されたソースでプレビュー開始（排他制御）
                 print(f"[INFO] Auto-selecting source: {preferred_source['name']}")
                 with self.preview_lock:
                     self.selected_source = preferred_source
-                    print(f"[INFO] Starting preview for: {self.selected_source['name']}")
+                    self.engine.finder.cache.remember_selection(preferred_source)
                     self.start_preview()
             else:
                 print("[WARNING] No NDI sources found")
@@ -797,26 +809,9 @@ class RVMNDIApp(ctk.CTk):
             self.model_status_label.configure(text="Loading...")
             self.load_model_btn.configure(state="disabled")
 
-            # GPU情報を表示
-            if DEVICE == 'cuda':
-                gpu_name = torch.cuda.get_device_name(0)
-                print(f"[INFO] Using GPU: {gpu_name}")
-                print(f"[INFO] CUDA Version: {torch.version.cuda}")
-                # CUDAの最適化設定
-                torch.backends.cudnn.benchmark = True  # 自動最適化
-            else:
-                print(f"[WARNING] CUDA not available, using CPU (will be slower)")
-
-            # Load model
-            self.model = MattingNetwork('mobilenetv3').eval().to(DEVICE)
-            self.model.load_state_dict(torch.load(MODEL_PATH, map_location=DEVICE))
-
-            # FP16モード (半精度) で高速化
-            if DEVICE == 'cuda' and self.use_fp16:
-                self.model = self.model.half()
-                print("[INFO] Model converted to FP16 (half precision) for faster inference")
+            self.engine.load_model()
 
-            self.model_status_label.configure(text=f"Loaded (Device: {DEVICE}, FP16: {self.use_fp16})")
+            self.model_status_label.configure(text=f"Loaded (Device: {DEVICE}, FP16: {self.engine.use_fp16}, Backend: {self.engine.backend.name})")
             self.status_label.configure(text="Model loaded successfully")
         except Exception as e:
             self.model_status_label.configure(text="Error")
@@ -825,7 +820,7 @@ class RVMNDIApp(ctk.CTk):
 
     def start_processing(self):
         """処理開始"""
-        if not self.model:
+        if not self.engine.model:
             self.status_label.configure(text="Please load model first")
             return
 
@@ -846,27 +841,13 @@ class RVMNDIApp(ctk.CTk):
             return
 
         try:
-            # プレビューを停止（処理専用のレシーバーを使用）
-            with self.preview_lock:
-                self.stop_preview()
-
-            # Create receiver
-            self.receiver = NDIReceiver(selected_source)
-            self.receiver.initialize()
-
-            # Create sender
             output_name = self.output_name_entry.get() or "RVM Alpha Mask"
-            self.sender = NDISender(output_name)
-            self.sender.initialize()
-
-            # Start processing thread immediately
-            self.is_processing = True
-            self.processing_thread = threading.Thread(target=self.processing_loop, daemon=True)
-            self.processing_thread.start()
+            self.engine.start(selected_source, output_name)
 
             # Update UI
             self.start_btn.configure(state="disabled")
             self.stop_btn.configure(state="normal")
+            self.output_mode_menu.configure(state="disabled")
             self.status_label.configure(text="Waiting for video frames...")
 
         except Exception as e:
@@ -874,389 +855,68 @@ class RVMNDIApp(ctk.CTk):
 
     def stop_processing(self):
         """処理停止"""
-        self.is_processing = False
-
-        if self.processing_thread:
-            self.processing_thread.join(timeout=2)
-            self.processing_thread = None
-
-        if self.receiver:
-            self.receiver.close()
-            self.receiver = None
-
-        if self.sender:
-            self.sender.close()
-            self.sender = None
-
-        # Reset recurrent states
-        self.rec = [None] * 4
-
-        # Reset smoothing history
-        if hasattr(self, '_prev_alpha'):
-            delattr(self, '_prev_alpha')
-        if hasattr(self, '_debug_printed'):
-            delattr(self, '_debug_printed')
-
-        # プレビューを再開
-        if self.selected_source:
-            self.start_preview()
+        self.engine.stop()
 
         # Update UI
         self.start_btn.configure(state="normal")
         self.stop_btn.configure(state="disabled")
+        self.output_mode_menu.configure(state="normal")
         self.status_label.configure(text="Stopped")
         self.fps_label.configure(text="FPS: 0")
 
-    def processing_loop(self):
-        """メイン処理ループ（60fps目標）"""
-        first_frame_received = False
-        connection_check_time = time.time()
-        frame_wait_timeout = 10.0
-        frame_time = 1.0 / 60.0  # 60fps目標
-
-        # パフォーマンス計測用
-        timing_log_interval = 100  # 100フレームごとにログ出力
-        timing_counter = 0
-        timing_stats = {
-            'ndi_receive': [],
-            'rvm_process': [],
-            'ndi_send': [],
-            'preview_update': [],
-            'total': []
-        }
-
-        while self.is_processing:
-            loop_start = time.time()
-
-            try:
-                # Receive video frame
-                t0 = time.time()
-                frame = self.receiver.receive_video(timeout_ms=16)
-                t1 = time.time()
-                timing_stats['ndi_receive'].append((t1 - t0) * 1000)
-
-                if frame is None:
-                    if not first_frame_received:
-                        elapsed = time.time() - connection_check_time
-                        if elapsed > frame_wait_timeout:
-                            print(f"[WARNING] No frames received after {frame_wait_timeout} seconds")
-                            self.after(0, lambda: self.status_label.configure(text="No video frames (check NDI source)"))
-                            connection_check_time = time.time()
-                    continue
-
-                # 最初のフレーム受信時の通知
-                if not first_frame_received:
-                    first_frame_received = True
-                    print("[INFO] First frame received, processing started")
-                    self.after(0, lambda: self.status_label.configure(text="Processing..."))
-
-                # Process with RVM
-                t2 = time.time()
-                alpha_mask = self.process_frame(frame)
-                t3 = time.time()
-                timing_stats['rvm_process'].append((t3 - t2) * 1000)
-
-                if alpha_mask is not None:
-                    # Send alpha mask via NDI
-                    t4 = time.time()
-                    self.sender.send_video(alpha_mask)
-                    t5 = time.time()
-                    timing_stats['ndi_send'].append((t5 - t4) * 1000)
-
-                    # Update FPS
-                    self.fps_counter += 1
-                    current_time = time.time()
-                    if current_time - self.fps_time >= 1.0:
-                        self.current_fps = self.fps_counter
-                        self.fps_counter = 0
-                        self.fps_time = current_time
-                        self.after(0, lambda fps=self.current_fps: self.fps_label.configure(text=f"FPS: {fps}"))
-
-                    # Update preview (5フレームに1回 - カクついてもOK) - 並列処理
-                    t6 = time.time()
-                    if self.fps_counter % 5 == 0:
-                        # 並列処理: プレビュー更新をメインループをブロックせずに実行
-                        if not hasattr(self, '_preview_executor'):
-                            self._preview_executor = ThreadPoolExecutor(max_workers=1)
-                        # 前のフレームをコピーして渡す (参照を切る)
-                        frame_copy = frame.copy()
-                        alpha_copy = alpha_mask.copy()
-                        self._preview_executor.submit(self.update_both_previews, frame_copy, alpha_copy)
-                    t7 = time.time()
-                    if self.fps_counter % 5 == 0:
-                        timing_stats['preview_update'].append((t7 - t6) * 1000)
-
-                # Total timing
-                loop_end = time.time()
-                timing_stats['total'].append((loop_end - loop_start) * 1000)
-
-                # ログ出力
-                timing_counter += 1
-                if timing_counter >= timing_log_interval:
-                    import statistics
-                    print(f"\n[PERFORMANCE] Average timing over {timing_log_interval} frames (ms):")
-                    for key, values in timing_stats.items():
-                        if values:
-                            avg = statistics.mean(values)
-                            max_val = max(values)
-                            min_val = min(values)
-                            print(f"  {key:15s}: avg={avg:6.2f}ms, min={min_val:6.2f}ms, max={max_val:6.2f}ms")
-
-                    total_avg = statistics.mean(timing_stats['total']) if timing_stats['total'] else 0
-                    theoretical_fps = 1000.0 / total_avg if total_avg > 0 else 0
-                    print(f"  Target: 16.67ms (60fps), Actual: {total_avg:.2f}ms ({theoretical_fps:.1f}fps)")
-
-                    if DEVICE == 'cuda':
-                        print(f"  GPU Memory: {torch.cuda.memory_allocated(0) / 1024**2:.1f}MB / {torch.cuda.max_memory_allocated(0) / 1024**2:.1f}MB (max)")
-                        torch.cuda.reset_peak_memory_stats()
-
-                    # Reset stats
-                    timing_counter = 0
-                    timing_stats = {k: [] for k in timing_stats.keys()}
-
-                # フレームレート制御
-                elapsed = loop_end - loop_start
-                sleep_time = frame_time - elapsed
-                if sleep_time > 0:
-                    time.sleep(sleep_time)
-
-            except Exception as e:
-                print(f"Processing error: {e}")
-                import traceback
-                traceback.print_exc()
-                time.sleep(0.1)  # エラー時は100msスリープしてCPU負荷を軽減
-
-    def process_frame(self, frame):
-        """フレーム処理 - RVMでアルファマスク生成"""
+    def on_engine_status(self, text):
+        """エンジンからのステータス通知（処理スレッドから呼ばれる）"""
+        self.after(0, lambda: self.status_label.configure(text=text))
+
+    def on_engine_fps(self, fps):
+        """エンジンからのFPS通知（処理スレッドから呼ばれる）"""
+        self.after(0, lambda: self.fps_label.configure(text=f"FPS: {fps}"))
+
+    def on_engine_metrics(self, report):
+        """エンジンの定期レポート（MetricsExporterのスレッドから呼ばれる）"""
+        histograms = report['histograms']
+        # パイプライン時は投入から送信完了まで、逐次処理時はループ1周
+        name = 'pipeline.latency' if 'pipeline.latency' in histograms else 'total'
+        h = histograms.get(name)
+        if h is None:
+            return
+        text = (f"Latency: p50 {h['p50_ms']:.1f}ms / p95 {h['p95_ms']:.1f}ms / "
+                f"p99 {h['p99_ms']:.1f}ms / max {h['max_ms']:.1f}ms")
+        self.after(0, lambda: self.latency_label.configure(text=text))
+
+    def on_engine_output(self, alpha_buf):
+        """送信したマスクで出力プレビューを更新（処理スレッドから5フレームに1回呼ばれる）"""
+        # 並列処理: プレビュー更新をメインループをブロックせずに実行
+        if not hasattr(self, '_preview_executor'):
+            self._preview_executor = ThreadPoolExecutor(max_workers=1)
+        # コピーせず参照カウントを増やして渡す（プレビュー完了までバッファは再利用されない）
+        self._preview_executor.submit(self.update_output_preview_pooled, alpha_buf.retain())
+
+    def update_output_preview_pooled(self, alpha_buf):
+        """プールのバッファで出力プレビュー更新（完了後に参照を解放）"""
         try:
-            # 詳細タイミング計測
-            if not hasattr(self, '_rvm_timing_counter'):
-                self._rvm_timing_counter = 0
-                self._rvm_timings = {
-                    'prepare': [],
-                    'cpu_to_gpu': [],
-                    'model_inference': [],
-                    'gpu_postprocess': [],
-                    'gpu_to_cpu': [],
-                    'cpu_postprocess': []
-                }
-
-            t_start = time.time()
-
-            # Check if model is loaded
-            if self.model is None:
-                print("[ERROR] Model is not loaded!")
-                return None
-
-            # BGR to RGB - 最速化
-            h, w = frame.shape[:2]
-
-            # Check if downsample_ratio changed
-            if abs(self.downsample_ratio - self.prev_downsample_ratio) > 0.01:
-                print(f"[INFO] Downsample ratio changed from {self.prev_downsample_ratio:.2f} to {self.downsample_ratio:.2f}, resetting states")
-                self.rec = [None] * 4
-                if hasattr(self, '_prev_alpha_gpu'):
-                    delattr(self, '_prev_alpha_gpu')
-                self.prev_downsample_ratio = self.downsample_ratio
-
-            t1 = time.time()
-            self._rvm_timings['prepare'].append((t1 - t_start) * 1000)
-
-            # 最速変換: BGR→RGB、numpy→tensor、CPU→GPU
-            # 高速化: 連続メモリ配列を作成してからGPU転送 (non_blockingの効果を最大化)
-            src_bgr = np.ascontiguousarray(frame[:, :, :3])
-
-            # CPU側でBGR→RGB変換 (メモリレイアウトを最適化)
-            # RGB順に並び替え: [..., 0] = B, [..., 1] = G, [..., 2] = R
-            src_rgb = src_bgr[:, :, ::-1].copy()  # コピーして連続メモリにする
-
-            # PyTorch tensor作成とGPU転送を1ステップで
-            src_tensor = torch.from_numpy(src_rgb).permute(2, 0, 1).unsqueeze(0).float()
-
-            # GPU転送とスケーリングを分離
-            if DEVICE == 'cuda':
-                src_tensor = src_tensor.cuda(non_blocking=False).div_(255.0)  # 同期転送で確実に
-                # FP16モード (半精度) で高速化
-                if self.use_fp16:
-                    src_tensor = src_tensor.half()
-            else:
-                src_tensor = src_tensor.div_(255.0)
-
-            # GPU上でダウンサンプル (cv2.resizeをGPU処理に置き換え)
-            if self.downsample_ratio != 1.0:
-                new_h = max(16, int(h * self.downsample_ratio))
-                new_w = max(16, int(w * self.downsample_ratio))
-                src_tensor = torch.nn.functional.interpolate(
-                    src_tensor,
-                    size=(new_h, new_w),
-                    mode='bilinear',
-                    align_corners=False
-                )
-
-            t2 = time.time()
-            self._rvm_timings['cpu_to_gpu'].append((t2 - t1) * 1000)
-
-            # First frame GPU check
-            if not hasattr(self, '_gpu_check_printed'):
-                print(f"[GPU CHECK] Input tensor device: {src_tensor.device}")
-                print(f"[GPU CHECK] Input tensor dtype: {src_tensor.dtype}")
-                print(f"[GPU CHECK] Input tensor shape: {src_tensor.shape}")
-                print(f"[GPU CHECK] Model device: {next(self.model.parameters()).device}")
-                if DEVICE == 'cuda':
-                    print(f"[GPU CHECK] CUDA memory allocated: {torch.cuda.memory_allocated(0) / 1024**2:.1f} MB")
-                    print(f"[GPU CHECK] CUDA memory reserved: {torch.cuda.memory_reserved(0) / 1024**2:.1f} MB")
-                self._gpu_check_printed = True
-
-            # Run model
-            # Reset recurrent states if they contain invalid data
-            if any(r is not None and not isinstance(r, torch.Tensor) for r in self.rec):
-                self.rec = [None] * 4
-
-            # Ensure recurrent states are on the same device as input
-            rec_on_device = []
-            for r in self.rec:
-                if r is not None:
-                    if r.device != src_tensor.device:
-                        print(f"[WARNING] Moving recurrent state from {r.device} to {src_tensor.device}")
-                        r = r.to(src_tensor.device)
-                rec_on_device.append(r)
-
-            t3 = time.time()
-
-            # CUDAストリームを明示的に同期 (モデル推論前に転送完了を保証)
-            if DEVICE == 'cuda':
-                torch.cuda.synchronize()
-
-            with torch.no_grad():
-                _, pha, *self.rec = self.model(src_tensor, *rec_on_device, self.downsample_ratio)
-
-                # GPU上でリサイズ (CPU転送を最小化)
-                if pha.shape[-2:] != (h, w):
-                    pha = torch.nn.functional.interpolate(
-                        pha,
-                        size=(h, w),
-                        mode='bilinear',
-                        align_corners=False
-                    )
-
-            # モデル推論完了を待つ
-            if DEVICE == 'cuda':
-                torch.cuda.synchronize()
-
-            t4 = time.time()
-            self._rvm_timings['model_inference'].append((t4 - t3) * 1000)
-
-            # Get alpha (GPU→CPU転送は最後の1回のみ)
-            pha = pha.squeeze(0).squeeze(0)  # (1, 1, H, W) -> (H, W) - まだGPU上
-
-            # Temporal Smoothing（時間的平滑化） - GPU上で実行
-            if self.smoothing_enabled:
-                if not hasattr(self, '_prev_alpha_gpu'):
-                    self._prev_alpha_gpu = pha
-                else:
-                    # EMA (Exponential Moving Average) - GPU演算
-                    pha = self.smoothing_alpha * pha + (1 - self.smoothing_alpha) * self._prev_alpha_gpu
-                    self._prev_alpha_gpu = pha
-
-            t5 = time.time()
-            self._rvm_timings['gpu_postprocess'].append((t5 - t4) * 1000)
-
-            # アルファ処理をGPU上で実行 (CPU転送を最小化)
-            if self.use_soft_alpha:
-                # ソフトアルファモード（グラデーション） - GPU上で処理
-                if self.alpha_contrast != 1.0:
-                    # GPU上でコントラスト調整
-                    pha = torch.clamp((pha - 0.5) * self.alpha_contrast + 0.5, 0.0, 1.0)
-
-                # GPU上で0-255に変換してからCPU転送
-                pha_uint8 = (pha * 255.0).to(torch.uint8)
-                alpha_final = pha_uint8.cpu().numpy()
-
-                # Debug: Print alpha value range (first frame only)
-                if not hasattr(self, '_debug_printed'):
-                    print(f"[DEBUG] Alpha shape: {alpha_final.shape}")
-                    print(f"[DEBUG] Alpha mode: Soft (Gradient)")
-                    self._debug_printed = True
-            else:
-                # 二値化モード - GPU上で処理してからCPU転送
-                pha_binary = (pha > self.alpha_threshold).to(torch.uint8) * 255
-                alpha_final = pha_binary.cpu().numpy()
-
-                # Debug (first frame only)
-                if not hasattr(self, '_debug_printed'):
-                    print(f"[DEBUG] Alpha shape: {alpha_final.shape}")
-                    print(f"[DEBUG] Alpha mode: Binary (Hard)")
-                    self._debug_printed = True
-
-            t6 = time.time()
-            self._rvm_timings['gpu_to_cpu'].append((t6 - t5) * 1000)
-
-            # Edge Refinement（CPU側で実行）
-            if self.edge_refinement:
-                if self.use_soft_alpha:
-                    # ソフトアルファのエッジ精緻化
-                    alpha_final = cv2.GaussianBlur(alpha_final, (self.edge_kernel_size, self.edge_kernel_size), 0)
-                else:
-                    # 二値化モードのエッジ精緻化
-                    kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (self.edge_kernel_size, self.edge_kernel_size))
-                    alpha_final = cv2.morphologyEx(alpha_final, cv2.MORPH_OPEN, kernel)  # ノイズ除去
-                    alpha_final = cv2.morphologyEx(alpha_final, cv2.MORPH_CLOSE, kernel)  # 穴埋め
-                    alpha_final = cv2.GaussianBlur(alpha_final, (self.edge_kernel_size, self.edge_kernel_size), 0)
-                    alpha_final = (alpha_final > 127).astype(np.uint8) * 255
-
-            # Create BGRA output - 高速化: numpy broadcasting
-            alpha_mask = np.empty((h, w, 4), dtype=np.uint8)
-            alpha_mask[:, :, :3] = alpha_final[:, :, np.newaxis]  # BGR全チャンネルに一括設定
-            alpha_mask[:, :, 3] = 255  # A
-
-            t7 = time.time()
-            self._rvm_timings['cpu_postprocess'].append((t7 - t6) * 1000)
-
-            # 100フレームごとに詳細ログを出力
-            self._rvm_timing_counter += 1
-            if self._rvm_timing_counter >= 100:
-                import statistics
-                print(f"\n[RVM DETAILED TIMING] Average over 100 frames:")
-                for key, values in self._rvm_timings.items():
-                    if values:
-                        avg = statistics.mean(values)
-                        print(f"  {key:18s}: {avg:6.2f}ms")
-
-                # Reset
-                self._rvm_timing_counter = 0
-                self._rvm_timings = {k: [] for k in self._rvm_timings.keys()}
-
-            return alpha_mask
-
-        except Exception as e:
-            import traceback
-            print(f"[ERROR] Frame processing error: {e}")
-            print(traceback.format_exc())
-            return None
+            self.update_output_preview(alpha_buf.array)
+        finally:
+            alpha_buf.release()
 
-    def update_both_previews(self, input_frame, output_frame):
-        """両方のプレビューを更新（60fps目標）"""
+    def update_output_preview(self, output_frame):
+        """出力プレビューを更新（入力プレビューはプレビュー購読側で更新）"""
         try:
-            preview_w = 800  # 320から800に拡大
-            h, w = input_frame.shape[:2]
+            preview_w = 800
+            h, w = output_frame.shape[:2]
             preview_h = int(h * preview_w / w)
 
-            # Input preview
-            input_rgb = cv2.cvtColor(input_frame[:, :, :3], cv2.COLOR_BGR2RGB)
-            input_small = cv2.resize(input_rgb, (preview_w, preview_h), interpolation=cv2.INTER_LINEAR)
-            input_img = Image.fromarray(input_small)
-            input_photo = ctk.CTkImage(light_image=input_img, dark_image=input_img, size=(preview_w, preview_h))
-
-            # Output preview
-            output_rgb = cv2.cvtColor(output_frame[:, :, :3], cv2.COLOR_BGR2RGB)
-            output_small = cv2.resize(output_rgb, (preview_w, preview_h), interpolation=cv2.INTER_LINEAR)
+            # 1チャンネルのマスクを縮小してからRGBに展開（フィル+キーは乗算済みフィルを黒背景で表示）
+            output_small = cv2.resize(output_frame, (preview_w, preview_h), interpolation=cv2.INTER_LINEAR)
+            if output_small.ndim == 3:
+                output_small = cv2.cvtColor(output_small, cv2.COLOR_BGRA2RGB)
+            else:
+                output_small = cv2.cvtColor(output_small, cv2.COLOR_GRAY2RGB)
             output_img = Image.fromarray(output_small)
             output_photo = ctk.CTkImage(light_image=output_img, dark_image=output_img, size=(preview_w, preview_h))
 
             # UIスレッドで更新
             def update():
-                self.input_preview.configure(image=input_photo, text="")
-                self.input_preview.image = input_photo
                 self.output_preview.configure(image=output_photo, text="")
                 self.output_preview.image = output_photo
 
@@ -1268,15 +928,14 @@ class RVMNDIApp(ctk.CTk):
     def on_closing(self):
         """ウィンドウクローズ処理"""
         self.stop_processing()
-        self.stop_preview()
+        with self.preview_lock:
+            self.stop_preview()
+        self.engine.close()
 
         # プレビューExecutorのシャットダウン
         if hasattr(self, '_preview_executor'):
             self._preview_executor.shutdown(wait=False)
 
-        if self.finder:
-            self.finder.close()
-
         self.destroy()
 
 
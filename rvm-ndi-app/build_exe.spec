@@ -18,13 +18,19 @@ ctk_datas, ctk_binaries, ctk_hiddenimports = collect_all('customtkinter')
 
 a = Analysis(
     ['app_complete.py'],
-    pathex=[],
+    pathex=[os.path.join(SPECPATH, '..')],  # 共有ndi_wrapperパッケージ
     binaries=rvm_binaries + ctk_binaries,
-    datas=[
-        ('ndi_wrapper.py', '.'),
-    ] + rvm_datas + ctk_datas,
+    datas=rvm_datas + ctk_datas,
     hiddenimports=[
         'ndi_wrapper',
+        'ndi_wrapper.synthetic',
+        'rvm_ndi',
+        'rvm_ndi.engine',
+        'rvm_ndi.pipeline',
+        'rvm_ndi.backends',
+        'rvm_ndi.quantize',
+        'rvm_ndi.batch',
+        'rvm_ndi.refine',
         'model',
         'inference',
         'torch',
@@ -0,0 +1,19 @@
+"""
+RobustVideoMatting NDI - ヘッドレスエンジン
+
+GUIは app_complete.py、GUIなしの実行は python -m rvm_ndi（rvm-ndi-appで実行）
+複数ソースのバッチ推論は RVMBatchEngine（CLIで --source を複数指定）
+NDIなしのオフラインベンチマークは python -m rvm_ndi.benchmark
+"""
+from .engine import (
+    RVMEngine, DEVICE, MODEL_PATH, SETTINGS_FILE, SOURCES_CACHE_FILE, MODEL_CACHE_DIR, OUTPUT_MODES,
+)
+from .batch import RVMBatchEngine
+from .pipeline import PipelineExecutor
+from .backends import BACKENDS, create_backend
+
+__all__ = [
+    'RVMEngine', 'RVMBatchEngine', 'PipelineExecutor', 'BACKENDS', 'create_backend',
+    'DEVICE', 'MODEL_PATH', 'SETTINGS_FILE', 'SOURCES_CACHE_FILE', 'MODEL_CACHE_DIR',
+    'OUTPUT_MODES',
+]
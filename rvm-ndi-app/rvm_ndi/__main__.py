@@ -0,0 +1,126 @@
+"""
+RobustVideoMatting NDI - GUIなしで実行（ラックサーバーなど表示のない環境用）
+
+    python -m rvm_ndi --source "PC (vMix - Output 1)" --output "RVM Alpha Mask" --settings rvm_settings.json
+
+--sourceを複数指定すると1つのモデルでバッチ推論する（RVMBatchEngine）。出力名は
+--outputを同じ数だけ指定するか、省略時は "RVM Alpha Mask 1", "RVM Alpha Mask 2", ...
+
+    python -m rvm_ndi --source "CAM 1" --source "CAM 2" --source "CAM 3" --source "CAM 4"
+
+--output-mode fill_key ではフィルを出力名、キーを "<出力名> Key" で送る。
+
+--cpu-precision int8_dynamic / int8_static には onnxruntime と onnx が必要
+（pip install -r requirements-cpu.txt）。ない場合はFP32で代わりに動かさず終了する。
+
+設定ファイルはGUIの"Save Settings"で保存したものをそのまま使える。
+Ctrl+C (SIGINT) / SIGTERM で停止する。
+"""
+import argparse
+import signal
+import sys
+import threading
+import time
+
+from .engine import RVMEngine, SETTINGS_FILE, SOURCES_CACHE_FILE, OUTPUT_MODES
+from .batch import RVMBatchEngine
+from .backends import BACKENDS
+from .quantize import PRECISIONS
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m rvm_ndi", description="RobustVideoMatting NDI (headless)")
+    parser.add_argument('--source', action='append', help="NDIソース名（部分一致可、複数指定でバッチ推論）。省略時は前回接続したソース")
+    parser.add_argument('--output', action='append', help="NDI出力名（--sourceと同じ順番）")
+    parser.add_argument('--settings', default=SETTINGS_FILE, help="設定ファイル")
+    parser.add_argument('--sources-cache', default=SOURCES_CACHE_FILE, help="NDIソースのキャッシュファイル")
+    parser.add_argument('--discovery-timeout', type=float, default=5.0, help="ソース探索の待ち時間（秒）")
+    parser.add_argument('--duration', type=float, default=0.0, help="指定秒数で終了（0 = 停止されるまで）")
+    parser.add_argument('--backend', choices=list(BACKENDS), help="推論バックエンド（省略時は設定ファイルの値）")
+    parser.add_argument('--cpu-precision', choices=PRECISIONS, help="CPU時の精度（INT8はonnxruntimeで実行）")
+    parser.add_argument('--latency-budget', type=float, help="自動解像度を有効にし、1フレームの推論時間の予算（ミリ秒、0 = ソースのフレーム間隔）を指定")
+    parser.add_argument('--output-mode', choices=OUTPUT_MODES,
+                        help="出力モード（key = マスクのみ, fill_alpha = 乗算済みフィル+アルファのBGRA, fill_key = フィルとキーを別出力）")
+    parser.add_argument('--metrics-port', type=int, help="処理時間の分布をJSONで公開するポート（http://127.0.0.1:<port>/metrics）")
+    parser.add_argument('--metrics-file', help="処理時間の分布を1行1JSONで追記するファイル")
+    parser.add_argument('--list-sources', action='store_true', help="見つかったソースを表示して終了")
+    args = parser.parse_args(argv)
+
+    names = args.source or []
+    outputs = args.output or []
+    if len(outputs) > max(1, len(names)):
+        parser.error("more --output than --source")
+    if len(names) > 1:
+        outputs += [f"RVM Alpha Mask {i + 1}" for i in range(len(outputs), len(names))]
+        engine_class = RVMBatchEngine
+    else:
+        outputs = outputs or ["RVM Alpha Mask"]
+        engine_class = RVMEngine
+
+    engine = engine_class(settings_file=args.settings, sources_cache_file=args.sources_cache)
+    engine.load_settings()
+    if args.backend:
+        engine.inference_backend = args.backend
+    if args.cpu_precision:
+        engine.cpu_precision = args.cpu_precision
+    if args.output_mode:
+        engine.output_mode = args.output_mode
+    if args.metrics_port is not None:
+        engine.metrics_port = args.metrics_port
+    if args.metrics_file is not None:
+        engine.metrics_file = args.metrics_file
+    if args.latency_budget is not None:
+        engine.auto_resolution = True
+        engine.latency_budget_ms = args.latency_budget
+    engine.on_status = lambda text: print(f"[STATUS] {text}")
+
+    try:
+        engine.initialize_ndi()
+
+        if args.list_sources:
+            time.sleep(args.discovery_timeout)
+            for src in engine.finder.sources:
+                print(f"{src['name']}  ({src['url']})")
+            return 0
+
+        sources = []
+        for name in names or [None]:
+            if name:
+                source = engine.find_source(name, timeout=args.discovery_timeout)
+            else:
+                source = engine.finder.cache.last_source()
+            if source is None:
+                print(f"[ERROR] NDI source not found: {name or '(no previous source)'}")
+                return 1
+            sources.append(source)
+        engine.finder.cache.remember_selection(sources[0])
+
+        try:
+            engine.load_model()
+        except RuntimeError as e:
+            # INT8の依存パッケージがないなど（FP32で代わりに動かさない）
+            print(f"[ERROR] {e}")
+            return 1
+        if engine_class is RVMBatchEngine:
+            engine.start(list(zip(sources, outputs)))
+        else:
+            engine.start(sources[0], outputs[0])
+        for source, output in zip(sources, outputs):
+            print(f"[INFO] Processing {source['name']} -> {output}")
+
+        # メインスレッドはシグナル待ちのみ
+        stop = threading.Event()
+        signal.signal(signal.SIGINT, lambda signum, frame: stop.set())
+        signal.signal(signal.SIGTERM, lambda signum, frame: stop.set())
+        deadline = time.time() + args.duration if args.duration > 0 else None
+        while not stop.is_set() and engine.is_processing:
+            if deadline is not None and time.time() >= deadline:
+                break
+            stop.wait(0.5)
+        return 0
+    finally:
+        engine.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
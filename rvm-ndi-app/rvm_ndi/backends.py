@@ -0,0 +1,316 @@
+"""
+RVM推論バックエンド
+
+設定の inference_backend で切り替える:
+    'eager'       PyTorchのまま実行（従来の動作）
+    'torchscript' torch.jit.trace + freeze したモジュール
+    'compile'     torch.compile（Inductor）
+    'onnxruntime' ONNX Runtime（CPU実行プロバイダ、グラフ最適化あり）。GPUのないノード向け
+                  precisionでINT8量子化モデルも使える（quantize.py）
+
+eager以外は入力解像度（バッチ数を含む）とdownsample_ratioを固定して作るため、最初の
+フレームで（解像度・比率が変わったらその都度）作成する。TorchScript/ONNXのファイルは
+キャッシュディレクトリに「モデルのハッシュ・入力解像度・downsample_ratio」を
+キーにして保存し、再起動時はエクスポートを省く。torch.compileの結果は
+Inductorのキャッシュを同じディレクトリに置く。cache_dirがNoneならディスクの
+キャッシュは使わず、エクスポートはプロセス内の一時ディレクトリで行う。
+"""
+import copy
+import hashlib
+import os
+import tempfile
+import time
+
+import torch
+
+from .quantize import PRECISIONS, Int8Calibrator, format_report, load_report
+
+
+def model_file_hash(path, chunk_size=1 << 20):
+    """モデルファイルのSHA-256（キャッシュキー用に先頭16桁）"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()[:16]
+
+
+class FixedRatioRVM(torch.nn.Module):
+    """
+    downsample_ratioを定数にしたRVM: (src, r1..r4) → (pha, r1..r4)
+
+    with_fgr=Trueなら前景も出力する: (fgr, pha, r1..r4)。キーだけの出力では
+    fgrを使わないので、出力しないグラフとは別にエクスポートする
+    """
+
+    def __init__(self, model, downsample_ratio, with_fgr=False):
+        super().__init__()
+        self.model = model
+        self.downsample_ratio = downsample_ratio
+        self.with_fgr = with_fgr
+
+    def forward(self, src, r1, r2, r3, r4):
+        fgr, pha, r1, r2, r3, r4 = self.model(src, r1, r2, r3, r4, self.downsample_ratio)
+        if self.with_fgr:
+            return fgr, pha, r1, r2, r3, r4
+        return pha, r1, r2, r3, r4
+
+
+class EagerBackend:
+    """PyTorchのeager実行"""
+
+    name = 'eager'
+    precision = 'fp32'
+
+    def __init__(self, model, model_path, device, fp16=False, cache_dir=None):
+        """
+        Args:
+            model: 読み込み済みのMattingNetwork（eval・デバイス転送・half()済み）
+            model_path: モデルファイル（キャッシュキーのハッシュ用）
+            device: 'cuda' or 'cpu'
+            fp16: モデルが半精度か
+            cache_dir: エクスポート結果のキャッシュディレクトリ（None = キャッシュしない）
+        """
+        self.model = model
+        self.model_path = model_path
+        self.device = device
+        self.fp16 = fp16
+        self.cache_dir = cache_dir
+
+    def infer(self, src, rec, downsample_ratio, with_fgr=False):
+        """
+        1フレーム推論（torch.no_grad()の中で呼ぶ）
+
+        Args:
+            src: 入力テンソル (N, 3, H, W)。Nはストリーム数（RVMBatchEngine）
+            rec: 再帰状態 [r1, r2, r3, r4]（バッチ次元はsrcと同じ、リセット時は [None] * 4）
+            downsample_ratio: RVMのダウンサンプル比
+            with_fgr: 前景も返すか（フィル+キー出力）
+
+        Returns:
+            (fgr, pha, rec): 前景 (N, 3, H, W)（with_fgr=FalseならNone）、
+            アルファ (N, 1, H, W)、次フレームの再帰状態
+        """
+        fgr, pha, *rec = self.model(src, *rec, downsample_ratio)
+        return (fgr if with_fgr else None), pha, rec
+
+
+class ExportedBackend(EagerBackend):
+    """入力解像度とdownsample_ratioを固定して作るバックエンドの共通部分"""
+
+    def __init__(self, model, model_path, device, fp16=False, cache_dir=None):
+        super().__init__(model, model_path, device, fp16, cache_dir)
+        self.model_hash = model_file_hash(model_path)
+        self._runners = {}  # (N, H, W, downsample_ratio, with_fgr) -> (runner, 初期再帰状態)
+        self._scratch_dir = None  # cache_dir = None の時のエクスポート先（バックエンドと一緒に削除）
+
+    def artifact_dir(self):
+        """エクスポート先（cache_dir、Noneなら一時ディレクトリ）"""
+        if self.cache_dir is not None:
+            return self.cache_dir
+        if self._scratch_dir is None:
+            self._scratch_dir = tempfile.TemporaryDirectory(prefix='rvm_export_')
+        return self._scratch_dir.name
+
+    def infer(self, src, rec, downsample_ratio, with_fgr=False):
+        key = (src.shape[0], src.shape[-2], src.shape[-1], round(float(downsample_ratio), 4), with_fgr)
+        entry = self._runners.get(key)
+        if entry is None:
+            entry = self._runners[key] = self.prepare(src, key[3], with_fgr)
+        runner, initial_rec = entry
+
+        # 固定形状なのでNoneは渡せない（RVMはNoneをゼロ初期化として扱うので同じ結果になる）
+        if rec[0] is None or rec[0].shape != initial_rec[0].shape:
+            rec = initial_rec
+        fgr, pha, rec = self.run(runner, src, rec, with_fgr)
+        return fgr, pha, rec
+
+    def prepare(self, src, downsample_ratio, with_fgr=False):
+        """この解像度・比率用のrunnerを作成"""
+        # 再帰状態の形状は解像度と比率で決まるので、eagerで1回推論して求める
+        _, _, *rec = self.model(src, None, None, None, None, downsample_ratio)
+        initial_rec = [torch.zeros_like(r) for r in rec]
+        module = FixedRatioRVM(self.model, downsample_ratio, with_fgr).eval()
+        return self.build(module, (src, *initial_rec)), initial_rec
+
+    def artifact_path(self, src, downsample_ratio, suffix, with_fgr=False):
+        """キャッシュファイルのパス（モデルのハッシュ・入力解像度・比率・精度・デバイス・前景出力の有無）"""
+        n, h, w = src.shape[0], src.shape[-2], src.shape[-1]
+        batch = f"b{n}_" if n > 1 else ''
+        precision = 'fp16' if src.dtype == torch.float16 else 'fp32'
+        outputs = '_fgr' if with_fgr else ''
+        name = (f"rvm_{self.model_hash}_{batch}{w}x{h}_r{downsample_ratio:.4f}_{precision}_"
+                f"{src.device.type}{outputs}{suffix}")
+        return os.path.join(self.artifact_dir(), name)
+
+    def cached_artifact(self, module, example, suffix, export):
+        """キャッシュにあればそのパスを返し、なければexport(module, example, path)で作成"""
+        path = self.artifact_path(example[0], module.downsample_ratio, suffix, module.with_fgr)
+        if os.path.exists(path):
+            print(f"[INFO] {self.name}: using cached {path}")
+            return path
+
+        os.makedirs(self.artifact_dir(), exist_ok=True)
+        print(f"[INFO] {self.name}: exporting for {tuple(example[0].shape)}, "
+              f"downsample_ratio={module.downsample_ratio} (first run only)...")
+        t0 = time.time()
+        # 途中で止まっても壊れたファイルをキャッシュとして使わないように、書き終えてから置き換える
+        tmp_path = path + '.tmp'
+        export(module, example, tmp_path)
+        os.replace(tmp_path, path)
+        print(f"[INFO] {self.name}: saved {path} ({time.time() - t0:.1f}s)")
+        return path
+
+    def build(self, module, example):
+        raise NotImplementedError
+
+    def run(self, runner, src, rec, with_fgr=False):
+        outputs = runner(src, *rec)
+        if with_fgr:
+            fgr, pha, *rec = outputs
+            return fgr, pha, rec
+        pha, *rec = outputs
+        return None, pha, rec
+
+
+class TorchScriptBackend(ExportedBackend):
+    """torch.jit.trace + freeze（Pythonのオーバーヘッドなし、Conv-BNなどを融合）"""
+
+    name = 'torchscript'
+
+    def build(self, module, example):
+        path = self.cached_artifact(module, example, '.pt', self.export)
+        return torch.jit.load(path, map_location=self.device)
+
+    @staticmethod
+    def export(module, example, path):
+        traced = torch.jit.trace(module, example, check_trace=False)
+        torch.jit.save(torch.jit.freeze(traced), path)
+
+
+class CompileBackend(ExportedBackend):
+    """torch.compile（Inductor）。コンパイル結果はInductorのキャッシュとしてcache_dirに残る（NoneならInductorの既定の場所）"""
+
+    name = 'compile'
+
+    def __init__(self, model, model_path, device, fp16=False, cache_dir=None):
+        super().__init__(model, model_path, device, fp16, cache_dir)
+        if not hasattr(torch, 'compile'):
+            raise RuntimeError("torch.compile requires PyTorch 2.0 or later")
+        # 最初のコンパイル前に設定する（環境変数で指定されていればそちらを使う）
+        if cache_dir is not None:
+            os.environ.setdefault('TORCHINDUCTOR_CACHE_DIR', os.path.join(cache_dir, 'inductor', self.model_hash))
+            os.environ.setdefault('TORCHINDUCTOR_FX_GRAPH_CACHE', '1')
+
+    def build(self, module, example):
+        print(f"[INFO] compile: compiling for {tuple(example[0].shape)}, "
+              f"downsample_ratio={module.downsample_ratio}...")
+        t0 = time.time()
+        compiled = torch.compile(module, dynamic=False)
+        compiled(*example)  # ここでコンパイルさせる（キャッシュがあれば短時間で終わる）
+        print(f"[INFO] compile: ready ({time.time() - t0:.1f}s)")
+        return compiled
+
+
+class OnnxRuntimeBackend(ExportedBackend):
+    """ONNX Runtime（CPU実行プロバイダ）。入出力はCPUのfloat32で、結果は入力と同じデバイス・型に戻す"""
+
+    name = 'onnxruntime'
+
+    def __init__(self, model, model_path, device, fp16=False, cache_dir=None,
+                 precision='fp32', calibration_frames=30):
+        """
+        Args:
+            precision: 'fp32', 'int8_dynamic', 'int8_static'
+            calibration_frames: INT8化の前にFP32で記録するフレーム数（キャリブレーションと品質比較用）
+        """
+        if precision not in PRECISIONS:
+            raise ValueError(f"Unknown precision: {precision!r} (choose from {', '.join(PRECISIONS)})")
+        self.precision = precision
+        self.calibration_frames = calibration_frames
+        self.on_report = None  # on_report(report) INT8の速度・品質比較の結果
+        try:
+            import onnxruntime
+        except ImportError:
+            raise RuntimeError("onnxruntime is not installed (pip install onnxruntime)")
+        self.ort = onnxruntime
+
+        # CPU実行プロバイダ用にCPU・float32でエクスポートする
+        if device != 'cpu' or fp16:
+            print("[WARNING] onnxruntime uses the CPU execution provider; frames are copied to the CPU")
+            model = copy.deepcopy(model).float().cpu()
+        super().__init__(model, model_path, 'cpu', False, cache_dir)
+
+    def infer(self, src, rec, downsample_ratio, with_fgr=False):
+        device, dtype = src.device, src.dtype
+        src = src.to('cpu', torch.float32)
+        rec = [r if r is None else r.to('cpu', torch.float32) for r in rec]
+        fgr, pha, rec = super().infer(src, rec, downsample_ratio, with_fgr)
+        if fgr is not None:
+            fgr = fgr.to(device, dtype)
+        return fgr, pha.to(device, dtype), [r.to(device, dtype) for r in rec]
+
+    def build(self, module, example):
+        path = self.cached_artifact(module, example, '.onnx', self.export)
+        session = self.open_session(path)
+        if self.precision == 'fp32':
+            return session
+
+        # INT8モデルもFP32と同じキーでキャッシュ（'int8_static'は最初にキャプチャしたフレームで校正したもの）
+        int8_path = f"{path[:-len('.onnx')]}_{self.precision}.onnx"
+        if os.path.exists(int8_path):
+            print(f"[INFO] {self.name}: using cached {int8_path}")
+            report = load_report(int8_path)
+            if report is not None:
+                print(f"[INFO] {format_report(report)}")
+                if self.on_report is not None:
+                    self.on_report(report)
+            return self.open_session(int8_path)
+
+        # 記録が揃うまではFP32で推論する
+        return Int8Calibrator(self.precision, session, path, int8_path, self.open_session,
+                              frames=self.calibration_frames, on_report=self.on_report)
+
+    def open_session(self, path):
+        options = self.ort.SessionOptions()
+        options.graph_optimization_level = self.ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.intra_op_num_threads = torch.get_num_threads()
+        return self.ort.InferenceSession(path, sess_options=options, providers=['CPUExecutionProvider'])
+
+    @staticmethod
+    def export(module, example, path):
+        torch.onnx.export(
+            module, example, path,
+            input_names=['src', 'r1i', 'r2i', 'r3i', 'r4i'],
+            output_names=(['fgr'] if module.with_fgr else []) + ['pha', 'r1o', 'r2o', 'r3o', 'r4o'],
+            opset_version=17,
+            do_constant_folding=True,
+        )
+
+    def run(self, session, src, rec, with_fgr=False):
+        feeds = {'src': src.numpy()}
+        for i, r in enumerate(rec):
+            feeds[f'r{i + 1}i'] = r.numpy()
+        outputs = [torch.from_numpy(output) for output in session.run(None, feeds)]
+        fgr = outputs.pop(0) if with_fgr else None
+        pha, *rec = outputs
+        return fgr, pha, rec
+
+
+BACKENDS = {
+    backend.name: backend
+    for backend in (EagerBackend, TorchScriptBackend, CompileBackend, OnnxRuntimeBackend)
+}
+
+
+def create_backend(name, model, model_path, device, fp16=False, cache_dir=None,
+                   precision='fp32', calibration_frames=30):
+    """設定名からバックエンドを作成（未知の名前・依存パッケージがない場合は例外）"""
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown inference backend: {name!r} (choose from {', '.join(BACKENDS)})")
+    if precision != 'fp32':
+        if name != OnnxRuntimeBackend.name:
+            raise ValueError(f"Precision {precision!r} requires the {OnnxRuntimeBackend.name} backend")
+        return OnnxRuntimeBackend(model, model_path, device, fp16=fp16, cache_dir=cache_dir,
+                                  precision=precision, calibration_frames=calibration_frames)
+    return BACKENDS[name](model, model_path, device, fp16=fp16, cache_dir=cache_dir)
@@ -0,0 +1,418 @@
+"""
+複数NDIソースのバッチ推論
+
+1つのモデルでN台のカメラを処理する。各ソースのフレームを集めて1回の推論に
+まとめ（バッチ次元に積む）、アルファはそれぞれのソースのNDISenderへ送る。
+再帰状態 [r1..r4] と平滑化の履歴はソース（ストリーム）ごとに持つ。
+"""
+import time
+import threading
+
+import numpy as np
+import torch
+
+from ndi_wrapper import NDISender, NDIOutputActivity, uyvy_to_chw_float
+from .engine import (
+    RVMEngine, DEVICE, EMPTY_FRAME_COVERAGE, OUTPUT_MODES, uyvy_to_chw_tensor, bgra_to_chw_tensor, release_payload,
+)
+from .pipeline import PipelineExecutor
+
+
+def release_batch(payload):
+    """パイプラインで捨てたバッチのバッファをプールに返却"""
+    for item in payload:
+        release_payload(item)
+
+
+class RVMStream:
+    """1ソース分の接続と状態"""
+
+    def __init__(self, source, output_name):
+        self.source = source
+        self.output_name = output_name
+        self.sub = None
+        self.sender = None
+        self.key_sender = None  # output_mode = 'fill_key' のキー出力
+        self.output_activity = None
+        self.rec = [None] * 4  # このソースの再帰状態（バッチ次元1）
+        self.input_shape = None  # 再帰状態を作ったフレームの形状（解像度・フォーマット）
+        self.reset_requested = False  # 次の推論の前にreset_state()する（受信スレッドから要求）
+        self.prev_alpha = None  # 時間的平滑化の履歴
+        self.alpha_coverage = 1.0  # 前フレームのアルファの平均（自動解像度の安全な切り替え判定）
+        self.frames_sent = 0
+
+    @property
+    def name(self):
+        return self.source['name']
+
+    def reset_state(self):
+        self.reset_requested = False
+        self.rec = [None] * 4
+        self.prev_alpha = None
+
+
+class RVMBatchEngine(RVMEngine):
+    """
+    複数ソースを1つのモデルでバッチ推論するヘッドレスエンジン
+
+    設定・モデル読み込み・NDI探索はRVMEngineと共通。start()にソースと出力名の
+    組を渡す。各ソースからフレームを1枚ずつ集め（最初の1枚からbatch_wait_ms
+    まで他のソースを待つ）、同じ解像度のフレームを1回の推論にまとめる。
+    on_fpsはバッチ（推論）の回数、on_outputはバッチの最初のストリームのアルファ。
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.streams = []
+        self._batch_inputs = {}  # (N, H, W, C, dtype) -> 再利用する入力テンソル
+
+    def reset_state(self):
+        """全ストリームの状態をリセット"""
+        super().reset_state()
+        for stream in self.streams:
+            stream.reset_state()
+
+    def start(self, streams):
+        """
+        処理開始
+
+        Args:
+            streams: [(ソースのdict, NDI出力名), ...]
+        """
+        if self.model is None:
+            raise RuntimeError("Model is not loaded")
+        if self.is_processing:
+            raise RuntimeError("Already processing")
+        if self.output_mode not in OUTPUT_MODES:
+            raise ValueError(f"Unknown output mode: {self.output_mode!r} (choose from {', '.join(OUTPUT_MODES)})")
+
+        self.streams = [RVMStream(source, output_name) for source, output_name in streams]
+        try:
+            for stream in self.streams:
+                stream.sub = self.receiver_hub.subscribe(
+                    stream.source, color_format=self.recv_color_format(),
+                    policy=self.capture_policy, depth=self.capture_depth
+                )
+                stream.sender = NDISender(stream.output_name, async_send=True, clock_video=False)
+                stream.sender.initialize()
+                if self.output_mode == 'fill_key':
+                    stream.key_sender = NDISender(f"{stream.output_name} Key", async_send=True, clock_video=False)
+                    stream.key_sender.initialize()
+                stream.output_activity = NDIOutputActivity(stream.sender, mode=self.idle_mode, idle_fps=self.idle_fps)
+        except Exception:
+            self.close_streams()
+            raise
+        self.start_metrics()
+
+        self.is_processing = True
+        self.processing_thread = threading.Thread(target=self.processing_loop, daemon=True)
+        self.processing_thread.start()
+
+    def stop(self):
+        """処理停止"""
+        self.is_processing = False
+        if self.processing_thread:
+            self.processing_thread.join(timeout=2)
+            self.processing_thread = None
+        # レポートがストリームの統計を読むので、先に止める
+        self.stop_metrics()
+        self.close_streams()
+        super().stop()
+
+    def close_streams(self):
+        for stream in self.streams:
+            if stream.sub:
+                print(f"[INFO] {stream.name}: sent {stream.frames_sent} frames, capture stats: {stream.sub.stats()}")
+                stream.sub.close()
+            if stream.output_activity:
+                print(f"[INFO] {stream.name}: frames skipped while idle: {stream.output_activity.frames_skipped}")
+            if stream.sender:
+                stream.sender.close()
+            if stream.key_sender:
+                stream.key_sender.close()
+        self.streams = []
+        self._batch_inputs = {}
+
+    def gather_frames(self, timeout_ms=100):
+        """
+        各ストリームから1フレームずつ集める
+
+        Returns:
+            [(stream, frame_buf), ...]（フレームが届いたストリームのみ、ストリーム順）
+        """
+        frames = {}
+        start = time.perf_counter()
+        deadline = None
+        while self.is_processing:
+            for stream in self.streams:
+                if stream not in frames:
+                    frame_buf = stream.sub.read(timeout_ms=0)
+                    if frame_buf is not None:
+                        frames[stream] = frame_buf
+            if len(frames) == len(self.streams):
+                break
+
+            now = time.perf_counter()
+            if frames:
+                if deadline is None:
+                    deadline = now + self.batch_wait_ms / 1000.0
+                if now >= deadline:
+                    break
+            elif now - start >= timeout_ms / 1000.0:
+                break
+            time.sleep(0.001)
+        return [(stream, frames[stream]) for stream in self.streams if stream in frames]
+
+    def processing_loop(self):
+        """メイン処理ループ（届いたフレームをまとめて推論）"""
+        first_frame_received = False
+        metrics = self.metrics
+
+        pipeline = None
+        if self.pipeline_enabled:
+            pipeline = PipelineExecutor([
+                ('inference', self.infer_batch),
+                ('postprocess', self.refine_batch),
+                ('send', self.send_batch),
+            ], depth=self.pipeline_depth,
+                policy=PipelineExecutor.BLOCK if self.capture_policy == 'fifo' else PipelineExecutor.DROP_OLDEST,
+                on_drop=release_batch, metrics=metrics)
+            pipeline.start()
+            self.pipeline = pipeline
+
+        while self.is_processing:
+            try:
+                frames = self.gather_frames()
+                if not frames:
+                    continue
+
+                if not first_frame_received:
+                    first_frame_received = True
+                    print(f"[INFO] First frame received ({len(frames)}/{len(self.streams)} sources), processing started")
+                    self.notify_status("Processing...")
+                # 自動解像度の予算（latency_budget_ms = 0の場合）。ソースのフレームレートが変わったら追従する
+                info = frames[0][1].info
+                if info is not None and info.frame_rate > 0:
+                    self.source_frame_rate = info.frame_rate
+
+                # 出力が使われていないストリームは間引く（再帰状態はアイドル明けにリセット）
+                batch = []
+                for stream, frame_buf in frames:
+                    activity = stream.output_activity
+                    was_idle = activity.idle
+                    process_now = activity.should_process()
+                    if activity.idle != was_idle:
+                        print(f"[INFO] {stream.name}: output {'idle (' + activity.reason + ')' if activity.idle else 'active'}")
+                        if not activity.idle:
+                            stream.reset_requested = True  # 推論ステージが使用中なので、次の推論の前に行う
+                    if process_now:
+                        batch.append((stream, frame_buf))
+                    else:
+                        frame_buf.release()
+                if not batch:
+                    continue
+
+                if pipeline is not None:
+                    pipeline.submit(batch)
+                else:
+                    t0 = time.time()
+                    self.send_batch(self.refine_batch(self.infer_batch(batch)))
+                    metrics.record('batch_total', (time.time() - t0) * 1000)
+
+            except Exception as e:
+                print(f"Processing error: {e}")
+                import traceback
+                traceback.print_exc()
+                time.sleep(0.1)
+
+        if pipeline is not None:
+            pipeline.stop()
+            self.pipeline = None
+
+    def metrics_info(self):
+        """レポートに含める現在の状態（ストリームごとの送信数・キャプチャ統計を追加）"""
+        info = super().metrics_info()
+        info['streams'] = {
+            stream.name: dict(stream.sub.stats(), sent=stream.frames_sent)
+            for stream in list(self.streams) if stream.sub is not None
+        }
+        return info
+
+    def print_source_stats(self):
+        self.print_stream_stats()
+
+    def print_stream_stats(self):
+        for stream in self.streams:
+            capture = stream.sub.stats()
+            print(f"  {stream.name}: sent={stream.frames_sent}, dropped={capture.get('dropped', 0)}, "
+                  f"overwritten={capture.get('overwritten', 0)}")
+
+    def batch_input_tensor(self, frames):
+        """同じ形状のフレームを1つの入力テンソル (N, 3, H, W) にまとめる"""
+        n = len(frames)
+        h, w, c = frames[0].shape
+        dtype = torch.float16 if DEVICE == 'cuda' and self.use_fp16 else torch.float32
+        key = (n, h, w, c, dtype)
+        batch = self._batch_inputs.get(key)
+        if batch is None:
+            batch = self._batch_inputs[key] = torch.empty((n, 3, h, w), dtype=dtype, device=DEVICE)
+
+        for i, frame in enumerate(frames):
+            if c == 2:
+                if DEVICE == 'cuda':
+                    uyvy = torch.from_numpy(np.ascontiguousarray(frame)).cuda(non_blocking=True)
+                    batch[i].copy_(uyvy_to_chw_tensor(uyvy))
+                else:
+                    # CPU: バッチのバッファに直接変換
+                    uyvy_to_chw_float(frame, out=batch[i].numpy())
+            else:
+                bgra = torch.from_numpy(frame)
+                if DEVICE == 'cuda':
+                    bgra = bgra.cuda(non_blocking=True)
+                bgra_to_chw_tensor(bgra, batch[i])
+        return batch
+
+    @staticmethod
+    def batch_rec(streams):
+        """ストリームの再帰状態をバッチ次元で連結（リセット済みのストリームはゼロ = RVMのNoneと同じ）"""
+        states = [stream.rec for stream in streams]
+        reference = next((rec for rec in states if rec[0] is not None), None)
+        if reference is None:
+            return [None] * 4
+        return [
+            torch.cat([rec[k] if rec[k] is not None else torch.zeros_like(reference[k]) for rec in states])
+            for k in range(4)
+        ]
+
+    def infer_batch(self, batch):
+        """
+        パイプライン: 推論ステージ（入力バッファはここで返却）
+
+        Args:
+            batch: [(stream, frame_buf), ...]
+        Returns:
+            [(stream, info, アルファ uint8 (H, W)), ...]、失敗時はNone
+            （フィル+キー出力ではアルファの代わりにBGRA (H, W, 4)）
+        """
+        try:
+            t_start = time.time()
+
+            downsample_ratio = self.current_downsample_ratio()
+            if abs(downsample_ratio - self.prev_downsample_ratio) > 0.01:
+                print(f"[INFO] Downsample ratio changed from {self.prev_downsample_ratio:.2f} to {downsample_ratio:.2f}, resetting states")
+                self.reset_state()
+                self.prev_downsample_ratio = downsample_ratio
+
+            # 解像度・フォーマットが同じフレームごとに1回推論
+            groups = {}
+            for stream, frame_buf in batch:
+                shape = frame_buf.array.shape
+                if stream.reset_requested:
+                    stream.reset_state()
+                if shape != stream.input_shape:
+                    # 前の形状の再帰状態は新しいグループと連結できない
+                    if stream.input_shape is not None:
+                        print(f"[INFO] {stream.name}: input changed from {stream.input_shape} to {shape}, resetting states")
+                    stream.reset_state()
+                    stream.input_shape = shape
+                groups.setdefault(shape, []).append((stream, frame_buf))
+
+            results = []
+            for items in groups.values():
+                results.extend(self.infer_group(items, downsample_ratio))
+
+            if self.latency_controller is not None:
+                self.latency_controller.record((time.time() - t_start) * 1000)
+            return results
+        except Exception as e:
+            import traceback
+            print(f"[ERROR] Batch processing error: {e}")
+            print(traceback.format_exc())
+            return None
+        finally:
+            release_batch(batch)
+
+    def infer_group(self, items, downsample_ratio):
+        """同じ形状のフレームをまとめて推論"""
+        streams = [stream for stream, _ in items]
+        h, w = items[0][1].array.shape[:2]
+
+        t1 = time.time()
+        src_tensor = self.batch_input_tensor([frame_buf.array for _, frame_buf in items])
+        src_full = src_tensor  # フィル+キー出力: 前景を入力解像度に戻すときに使う
+        if downsample_ratio != 1.0:
+            src_tensor = torch.nn.functional.interpolate(
+                src_tensor,
+                size=(max(16, int(h * downsample_ratio)), max(16, int(w * downsample_ratio))),
+                mode='bilinear',
+                align_corners=False
+            )
+        t2 = time.time()
+        self.metrics.record('cpu_to_gpu', (t2 - t1) * 1000)
+
+        if DEVICE == 'cuda':
+            torch.cuda.synchronize()
+
+        with torch.no_grad():
+            fgr, pha, rec = self.backend.infer(src_tensor, self.batch_rec(streams), downsample_ratio,
+                                               with_fgr=self.output_mode != 'key')
+
+            # 自動解像度: ストリームごとの被写体の有無（低解像度のアルファの平均）
+            if self.latency_controller is not None:
+                coverage = pha.mean(dim=(1, 2, 3)).tolist()
+                for stream, value in zip(streams, coverage):
+                    stream.alpha_coverage = value
+
+            # ストリームごとに状態を戻し、時間的平滑化もストリームごとの履歴で行う（モデル解像度のまま）
+            for i, stream in enumerate(streams):
+                stream.rec = [r[i:i + 1] for r in rec]
+                if self.smoothing_enabled:
+                    if stream.prev_alpha is not None and stream.prev_alpha.shape == pha[i].shape:
+                        pha[i] = self.smoothing_alpha * pha[i] + (1 - self.smoothing_alpha) * stream.prev_alpha
+                    stream.prev_alpha = pha[i].clone()
+                else:
+                    stream.prev_alpha = None
+
+            # エッジ精緻化とリサイズもバッチのままGPU上で実行
+            pha, threshold = self.refine_and_upsample(pha, h, w)
+            pha = pha[:, 0]  # (N, H, W)
+            if fgr is not None:
+                fgr = self.upsample_foreground(fgr, src_full, src_tensor)  # (N, 3, H, W)
+
+        if DEVICE == 'cuda':
+            torch.cuda.synchronize()
+        t3 = time.time()
+        self.metrics.record('model_inference', (t3 - t2) * 1000)
+
+        # CPUへの転送はバッチでまとめて1回
+        alpha = self.alpha_to_uint8(pha, threshold, fgr)
+        self.metrics.record('gpu_to_cpu', (time.time() - t3) * 1000)
+        return [(stream, frame_buf.info, alpha[i]) for i, (stream, frame_buf) in enumerate(items)]
+
+    def refine_batch(self, results):
+        """パイプライン: 後処理ステージ（プールのバッファへの格納）"""
+        if not results:
+            return None
+        refined = []
+        for stream, info, alpha_final in results:
+            alpha_buf = self.refine_alpha(alpha_final)
+            if alpha_buf is not None:
+                refined.append((stream, info, alpha_buf))
+        return refined or None
+
+    def send_batch(self, refined):
+        """パイプライン: 送信ステージ（各ソースの出力へ）"""
+        if not refined:
+            return
+        try:
+            for stream, info, alpha_buf in refined:
+                self.send_output(stream.sender, stream.key_sender, alpha_buf, info)
+                stream.frames_sent += 1
+            self.count_output_frame(refined[0][2])
+        finally:
+            release_batch(refined)
+
+    def resolution_step_safe(self):
+        """全ストリームで解像度を上げても目立たない時点か"""
+        return all(stream.rec[0] is None or stream.alpha_coverage < EMPTY_FRAME_COVERAGE
+                   for stream in self.streams)
@@ -0,0 +1,207 @@
+"""
+RVM process_frame のオフラインベンチマーク（NDI・GUIなし）
+
+合成フレーム（カラーバー＋移動バー）または録画ファイルのフレームで
+RVMEngine.process_frame を繰り返し呼び、ステージごとの処理時間の分布を
+表示してJSONに保存する。rvm-ndi-appで実行:
+
+    python -m rvm_ndi.benchmark --output rvm_baseline.json
+    python -m rvm_ndi.benchmark --baseline rvm_baseline.json   # 10%以上遅くなったケースがあれば終了コード1
+
+各軸は複数の値を指定でき、先頭の値が基準。既定では基準のケースと、1つの軸だけを
+変えたケースを計測する（--full で全組み合わせ）:
+
+    python -m rvm_ndi.benchmark --resolution 1080p 720p 2160p --downsample 0.25 0.125 0.5 \\
+        --alpha binary soft --smoothing off on --edge off on --precision fp16 fp32 cpu
+
+精度のcpuは CUDA_VISIBLE_DEVICES を空にした子プロセスで計測する（DEVICEは
+インポート時に決まるため）。CUDAのない環境ではcpuだけを計測する。
+--settings の設定ファイル（推論バックエンド、CPU時の精度、出力モードなど）は
+全ケースに適用し、自動解像度は使わない。
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+import torch
+
+from .engine import RVMEngine, DEVICE, MODEL_PATH
+from ndi_wrapper.benchmark import (
+    RESOLUTIONS, COMPARE_METRICS, parse_resolution, benchmark_frames, sweep, case_name, run_case, print_case,
+    environment_info, write_baseline, load_baseline, compare_to_baseline,
+)
+
+PRECISIONS = ('fp16', 'fp32', 'cpu')
+
+
+def apply_case(engine, settings):
+    """ケースのパラメータを設定し、前のケースの状態（再帰状態・平滑化）をリセット"""
+    engine.downsample_ratio = settings['downsample_ratio']
+    engine.prev_downsample_ratio = engine.downsample_ratio
+    engine.use_soft_alpha = settings['alpha'] == 'soft'
+    engine.smoothing_enabled = settings['smoothing'] == 'on'
+    engine.edge_refinement = settings['edge'] == 'on'
+    engine.auto_resolution = False
+    engine.latency_controller = None
+    engine.reset_state()
+
+
+def run_cases(engine, cases, args):
+    """このプロセスのDEVICEでケースを計測（モデルは精度が変わる時だけ読み込み直す）"""
+    results = []
+    loaded = None
+    for settings in cases:
+        precision = settings['precision']
+        if loaded != precision:
+            engine.use_fp16 = precision == 'fp16'
+            engine.load_model()
+            loaded = precision
+
+        apply_case(engine, settings)
+        width, height = parse_resolution(settings['resolution'])
+        frames = []
+        try:
+            # 受信と同じくプールのバッファ（CUDA時はピン留めメモリ）に入れて渡す
+            for image in benchmark_frames(width, height, args.distinct_frames, args.input, args.receive_format):
+                frame = engine.frame_pool.acquire(image.shape)
+                frame.array[:] = image
+                frames.append(frame)
+
+            result = run_case(engine.process_frame, [f.array for f in frames], args.frames, args.warmup,
+                              metrics=engine.metrics)
+        finally:
+            for frame in frames:
+                frame.release()
+
+        name = case_name(settings)
+        print_case(name, result)
+        results.append(dict(name=name, settings=settings, **result))
+    return results
+
+
+def run_cpu_subprocess(cases, args):
+    """CPUのケースをCUDAを隠した子プロセスで計測し、結果を返す"""
+    fd, path = tempfile.mkstemp(suffix='.json', prefix='rvm_benchmark_')
+    os.close(fd)
+    command = [
+        sys.executable, '-m', 'rvm_ndi.benchmark', '--cases', json.dumps(cases), '--precision', 'cpu', '--output', path,
+        '--frames', str(args.frames), '--warmup', str(args.warmup), '--distinct-frames', str(args.distinct_frames),
+        '--receive-format', args.receive_format, '--settings', args.settings,
+    ]
+    if args.input:
+        command += ['--input', args.input]
+
+    # rvm_ndiのあるディレクトリ（rvm-ndi-app）をパスに追加
+    app_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, CUDA_VISIBLE_DEVICES='')
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [app_dir, env.get('PYTHONPATH')]))
+    print(f"\n[BENCHMARK] Running {len(cases)} CPU case(s) in a subprocess")
+    try:
+        completed = subprocess.run(command, env=env)
+        if completed.returncode != 0:
+            print(f"[ERROR] CPU benchmark failed (exit code {completed.returncode})")
+            return []
+        return load_baseline(path)['cases']
+    finally:
+        os.remove(path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m rvm_ndi.benchmark",
+                                     description="RVM process_frame offline benchmark")
+    parser.add_argument('--resolution', nargs='+', default=['1080p', '720p', '2160p'],
+                        help=f"入力解像度（{', '.join(RESOLUTIONS)} または WIDTHxHEIGHT）")
+    parser.add_argument('--downsample', nargs='+', type=float, default=[0.25, 0.125, 0.5], help="downsample_ratio")
+    parser.add_argument('--alpha', nargs='+', choices=('binary', 'soft'), default=['binary', 'soft'], help="アルファモード")
+    parser.add_argument('--smoothing', nargs='+', choices=('off', 'on'), default=['off', 'on'], help="時間的平滑化")
+    parser.add_argument('--edge', nargs='+', choices=('off', 'on'), default=['off', 'on'], help="エッジ精緻化")
+    parser.add_argument('--precision', nargs='+', choices=PRECISIONS, default=list(PRECISIONS),
+                        help="fp16/fp32 (CUDA) または cpu")
+    parser.add_argument('--full', action='store_true', help="全組み合わせを計測（既定は1軸ずつ）")
+    parser.add_argument('--frames', type=int, default=100, help="計測するフレーム数（ケースごと）")
+    parser.add_argument('--warmup', type=int, default=10, help="計測前に処理するフレーム数")
+    parser.add_argument('--distinct-frames', type=int, default=8, help="繰り返し使う入力フレームの枚数")
+    parser.add_argument('--input', help="合成フレームの代わりに使う動画/画像ファイル")
+    parser.add_argument('--receive-format', choices=('bgra', 'uyvy'), default='bgra', help="入力フレームの形式")
+    parser.add_argument('--settings', default='', help="全ケースに適用する設定ファイル")
+    parser.add_argument('--output', help="結果を保存するJSONファイル（ベースライン）")
+    parser.add_argument('--baseline', help="比較するベースラインのJSONファイル")
+    parser.add_argument('--tolerance', type=float, default=10.0, help="ベースラインより遅くてよい割合（%%）")
+    parser.add_argument('--metric', choices=COMPARE_METRICS, default='p50_ms', help="比較するprocess_frameの値")
+    parser.add_argument('--cases', help=argparse.SUPPRESS)  # CPUの子プロセスに渡すケース（JSON）
+    args = parser.parse_args(argv)
+
+    for value in args.resolution:
+        try:
+            parse_resolution(value)
+        except ValueError as e:
+            parser.error(str(e))
+
+    precisions = args.precision
+    if DEVICE != 'cuda' and precisions != ['cpu']:
+        print("[WARNING] CUDA not available, measuring precision=cpu only")
+        precisions = ['cpu']
+
+    if args.cases:
+        cases = json.loads(args.cases)
+    else:
+        cases = sweep({
+            'resolution': args.resolution,
+            'downsample_ratio': args.downsample,
+            'alpha': args.alpha,
+            'smoothing': args.smoothing,
+            'edge': args.edge,
+            'precision': precisions,
+        }, full=args.full)
+
+    # CUDA環境ではcpuのケースだけ子プロセスで計測
+    local = [c for c in cases if DEVICE != 'cuda' or c['precision'] != 'cpu']
+    remote = [c for c in cases if DEVICE == 'cuda' and c['precision'] == 'cpu']
+    # モデルの読み込み直しが精度の切り替え時だけになるように並べる
+    local.sort(key=lambda c: PRECISIONS.index(c['precision']))
+
+    engine = RVMEngine(settings_file=args.settings)
+    if args.settings:
+        engine.load_settings()
+
+    results = run_cases(engine, local, args) if local else []
+    if remote:
+        results += run_cpu_subprocess(remote, args)
+    # 表示・保存はスイープの順番
+    order = {case_name(c): i for i, c in enumerate(cases)}
+    results.sort(key=lambda r: order.get(r['name'], len(order)))
+
+    environment = environment_info(
+        device=DEVICE,
+        gpu=torch.cuda.get_device_name(0) if DEVICE == 'cuda' else None,
+        torch=torch.__version__,
+        cuda=torch.version.cuda,
+        backend=engine.inference_backend,
+        cpu_precision=engine.cpu_precision,
+        output_mode=engine.output_mode,
+        model=os.path.basename(MODEL_PATH),
+    )
+    config = {
+        'frames': args.frames,
+        'warmup': args.warmup,
+        'distinct_frames': args.distinct_frames,
+        'input': args.input or 'synthetic',
+        'receive_format': args.receive_format,
+        'settings': args.settings,
+    }
+    if args.output:
+        write_baseline(args.output, 'rvm', results, environment, config)
+
+    if args.baseline:
+        regressions = compare_to_baseline(results, load_baseline(args.baseline), args.tolerance / 100.0,
+                                          args.metric, environment=environment)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,1114 @@
+"""
+RobustVideoMatting NDI エンジン（GUIなし）
+
+モデル・NDIハンドル・処理ループを持つ。GUI (app_complete.py) とCLI
+(python -m rvm_ndi) のどちらからも使い、表示のない環境ではCLIだけで動かす。
+"""
+import sys
+import os
+import time
+import threading
+import json
+import numpy as np
+import torch
+import cv2
+
+# スレッド数制限（CPU使用率制御）
+torch.set_num_threads(4)  # PyTorchのスレッド数を4に制限
+cv2.setNumThreads(4)  # OpenCVのスレッド数を4に制限
+os.environ['OMP_NUM_THREADS'] = '4'  # OpenMPのスレッド数を4に制限
+os.environ['MKL_NUM_THREADS'] = '4'  # Intel MKLのスレッド数を4に制限
+
+# Get base path (works for both script and PyInstaller exe)
+if getattr(sys, 'frozen', False):
+    # Running as compiled executable
+    BASE_PATH = sys._MEIPASS
+else:
+    # Running as script (rvm-ndi-app)
+    BASE_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    # 共有ndi_wrapperパッケージ（リポジトリ直下）
+    sys.path.insert(0, os.path.dirname(BASE_PATH))
+
+# Add RobustVideoMatting to path
+sys.path.insert(0, os.path.join(BASE_PATH, 'RobustVideoMatting'))
+
+from model import MattingNetwork
+from ndi_wrapper import (
+    NDIFinder, NDISourceCache, NDIReceiverHub, NDISender, NDIOutputActivity, NDIFramePool, get_backend, configure,
+    NDIlib_recv_color_format_e, BT709_UYVY_TO_RGB, uyvy_to_chw_float, pinned_allocator, PooledFrame,
+    LatencyController, MetricsRegistry, MetricsExporter,
+)
+from .pipeline import PipelineExecutor
+from .backends import create_backend
+from .quantize import REQUIREMENTS_FILE, missing_dependencies
+from .refine import refine_edges
+
+# GPU設定（詳細ログ付き）
+print("[INFO] Checking CUDA availability...")
+print(f"[INFO] torch.cuda.is_available() = {torch.cuda.is_available()}")
+if torch.cuda.is_available():
+    print(f"[INFO] CUDA device count: {torch.cuda.device_count()}")
+    print(f"[INFO] CUDA device name: {torch.cuda.get_device_name(0)}")
+    print(f"[INFO] CUDA version: {torch.version.cuda}")
+    DEVICE = 'cuda'
+else:
+    print("[WARNING] CUDA not available - will use CPU (slower)")
+    DEVICE = 'cpu'
+
+print(f"[INFO] Selected device: {DEVICE}")
+
+MODEL_PATH = os.path.join(BASE_PATH, 'RobustVideoMatting', 'rvm_mobilenetv3.pth')
+SETTINGS_FILE = 'rvm_settings.json'
+SOURCES_CACHE_FILE = 'rvm_ndi_sources.json'  # 前回のNDIソース（名前とURL）
+MODEL_CACHE_DIR = 'rvm_model_cache'  # TorchScript/ONNXのエクスポート結果
+
+# 自動解像度で使うdownsample_ratioの段階（設定のdownsample_ratioが上限）
+DOWNSAMPLE_LEVELS = (0.1, 0.125, 0.15, 0.2, 0.25, 0.3, 0.4, 0.5, 0.6, 0.75, 1.0)
+# 前フレームのアルファの平均がこれ未満なら被写体なしとみなし、再帰状態のリセットが目立たない
+EMPTY_FRAME_COVERAGE = 0.005
+# 出力モード: 'key' = アルファマスクのみ, 'fill_alpha' = 乗算済みフィル + アルファのBGRA 1本,
+# 'fill_key' = フィル（BGRX）とキー（output_format）を別のNDI出力に
+OUTPUT_MODES = ('key', 'fill_alpha', 'fill_key')
+
+
+def uyvy_to_chw_tensor(uyvy):
+    """UYVY uint8テンソル (H, W, 2) → 正規化RGBテンソル (3, H, W)（デバイス上で変換）"""
+    k = BT709_UYVY_TO_RGB
+    h, w = uyvy.shape[:2]
+    pairs = uyvy.reshape(h, w // 2, 4).float()  # [U, Y0, V, Y1]
+    luma = (pairs[:, :, 1::2] - 16.0) * k['Y_SCALE']
+    cb = pairs[:, :, 0:1] - 128.0
+    cr = pairs[:, :, 2:3] - 128.0
+    rgb = torch.stack([
+        luma + cr * k['CR_R'],
+        luma + cb * k['CB_G'] + cr * k['CR_G'],
+        luma + cb * k['CB_B'],
+    ])
+    return rgb.reshape(3, h, w).clamp_(0.0, 1.0)
+
+
+def bgra_to_chw_tensor(bgra, out):
+    """BGRA uint8テンソル (H, W, 4) → 正規化RGBテンソル (3, H, W)（チャンネル入替と正規化を1パスでoutに書き込み）"""
+    for channel in range(3):
+        torch.mul(bgra[:, :, 2 - channel], 1.0 / 255.0, out=out[channel])
+    return out
+
+
+def release_payload(payload):
+    """パイプラインで捨てたフレームのバッファをプールに返却"""
+    items = payload if isinstance(payload, tuple) else (payload,)
+    for item in items:
+        if isinstance(item, PooledFrame):
+            item.release()
+
+
+class RVMEngine:
+    """
+    ヘッドレス処理エンジン
+
+    NDI受信 → RVM推論 → アルファマスクのNDI送信。処理スレッドからの通知は
+    コールバック（on_status / on_fps / on_output）で受け取る。コールバックは
+    処理スレッドで呼ばれるので、GUIは自分のUIスレッドに渡して使う。
+    """
+
+    # 設定ファイルに保存するパラメータ
+    SETTINGS_KEYS = (
+        'downsample_ratio', 'alpha_threshold', 'use_soft_alpha', 'alpha_contrast',
+        'smoothing_enabled', 'smoothing_alpha', 'edge_refinement', 'edge_kernel_size',
+        'receive_format', 'capture_policy', 'capture_depth', 'output_format',
+        'idle_mode', 'idle_fps', 'pipeline_enabled', 'pipeline_depth', 'ndi_lib_path',
+        'inference_backend', 'model_cache_dir', 'cpu_precision', 'calibration_frames',
+        'auto_resolution', 'latency_budget_ms', 'batch_wait_ms', 'output_mode',
+        'metrics_interval_s', 'metrics_port', 'metrics_file',
+    )
+
+    def __init__(self, settings_file=SETTINGS_FILE, sources_cache_file=SOURCES_CACHE_FILE):
+        self.settings_file = settings_file
+        self.sources_cache_file = sources_cache_file
+
+        # NDI関連
+        self.finder = None
+        self.process_sub = None  # 処理用サブスクリプション
+        self.sender = None
+        self.key_sender = None  # output_mode = 'fill_key' のキー出力
+        # 受信フレームと出力フレームで共有するバッファプール（CUDA時はピン留めメモリで非同期転送）
+        self.frame_pool = NDIFramePool(allocator=pinned_allocator if DEVICE == 'cuda' else None)
+        self.receiver_hub = NDIReceiverHub(self.frame_pool)  # ソースごとに1接続をプレビューと処理で共有
+
+        # AI Model
+        self.model = None
+        self.backend = None  # 推論バックエンド（load_modelで作成）
+        self.rec = [None] * 4  # Recurrent states
+        self.reset_requested = False  # 次の推論の前にreset_state()する（推論ステージ以外のスレッドから要求）
+
+        # RVM Parameters
+        self.downsample_ratio = 0.2  # 0.25→0.2に変更 (高速化のため解像度をさらに下げる)
+        self.prev_downsample_ratio = 0.2  # 前回の値を保存
+        self.alpha_threshold = 0.5
+        self.use_soft_alpha = False  # ソフトアルファ（グラデーション）を使用
+        self.alpha_contrast = 1.0  # アルファコントラスト調整
+        self.smoothing_enabled = False
+        self.smoothing_alpha = 0.3
+        self.edge_refinement = False
+        self.edge_kernel_size = 3
+        self.use_fp16 = True  # FP16 (半精度) モード - GPU演算を2倍高速化
+        self.receive_format = 'bgra'  # NDI受信フォーマット ('bgra' or 'uyvy')
+        self.capture_policy = 'latest'  # キャプチャリング方式 ('latest': 古いフレームを破棄, 'fifo': 順番通り, 'framesync': 一定間隔で最新フレームを取得)
+        self.capture_depth = 3  # キャプチャリングのフレーム数
+        self.output_format = 'uyvy'  # NDI出力フォーマット ('uyvy': 2バイト/画素, 'uyva': 3, 'bgra': 4)
+        self.output_mode = 'key'  # 出力モード（OUTPUT_MODES、次回開始時に反映）。フィルはRVMの前景から作る
+        self.idle_mode = 'connections'  # 出力が使われていない時に推論を間引く条件 ('always', 'connections', 'tally')
+        self.idle_fps = 1.0  # アイドル時の処理フレームレート (0 = 処理しない)
+        self.output_activity = None
+        self.pipeline_enabled = True  # 推論・後処理・送信を別スレッドで並行実行
+        self.pipeline_depth = 2  # ステージ間キューのフレーム数
+        self.ndi_lib_path = ''  # NDIランタイムのパス（空 = NDI_LIB_PATH / NDI_RUNTIME_DIR_V5 / システムから検索）
+        self.inference_backend = 'eager'  # 推論バックエンド ('eager', 'torchscript', 'compile', 'onnxruntime')
+        self.model_cache_dir = MODEL_CACHE_DIR  # エクスポート結果のキャッシュ（変更はモデル再読み込みで反映）
+        self.cpu_precision = 'fp32'  # CPU時の精度 ('fp32', 'int8_dynamic', 'int8_static')。INT8はonnxruntimeで実行
+        self.calibration_frames = 30  # INT8化の前に記録するフレーム数（キャリブレーションと品質比較）
+        self.auto_resolution = False  # 推論時間が予算を超えたらdownsample_ratioを下げる（downsample_ratioが上限）
+        self.latency_budget_ms = 0.0  # 1フレームの推論時間の予算 (0 = 受信ソースのフレーム間隔)
+        self.latency_controller = None
+        self.source_frame_rate = 0.0
+        self.batch_wait_ms = 8.0  # 複数ソース (RVMBatchEngine): 最初のフレームから他のソースを待つ時間
+
+        # Processing
+        self.is_processing = False
+        self.processing_thread = None
+        self.pipeline = None
+
+        # 処理時間の計測（ステージごとのヒストグラム）と定期レポート
+        self.metrics = MetricsRegistry()
+        self.metrics.add_info('engine', self.metrics_info)
+        self.metrics_exporter = None
+        self.metrics_interval_s = 5.0  # レポート（コンソール・JSONL・GUI）の間隔
+        self.metrics_port = 0  # http://127.0.0.1:<port>/metrics でJSONを公開 (0 = 公開しない)
+        self.metrics_file = ''  # レポートを1行1JSONで追記するファイル（空 = 書かない）
+        self._last_recv_perf = None
+
+        # Stats
+        self.fps_counter = 0
+        self.fps_time = time.time()
+        self.current_fps = 0
+
+        # 処理スレッドからの通知（Noneなら通知しない）
+        self.on_status = None  # on_status(text)
+        self.on_fps = None  # on_fps(fps) 1秒ごと
+        self.on_output = None  # on_output(alpha_buf) 5フレームに1回。保持するならretain()する
+        self.on_metrics = None  # on_metrics(report) metrics_interval_sごと（MetricsExporterのスレッドから）
+
+    def notify_status(self, text):
+        if self.on_status is not None:
+            self.on_status(text)
+
+    def save_settings(self, path=None):
+        """設定をJSONファイルに保存（失敗時は例外）"""
+        path = path or self.settings_file
+        settings = {key: getattr(self, key) for key in self.SETTINGS_KEYS}
+
+        with open(path, 'w') as f:
+            json.dump(settings, f, indent=2)
+
+        print(f"[INFO] Settings saved to {path}")
+
+    def load_settings(self, path=None):
+        """設定をJSONファイルから読み込み"""
+        path = path or self.settings_file
+        try:
+            if not os.path.exists(path):
+                print(f"[INFO] Settings file not found, using defaults")
+                return
+
+            with open(path, 'r') as f:
+                settings = json.load(f)
+
+            # パラメータを復元
+            self.downsample_ratio = settings.get('downsample_ratio', 0.25)
+            self.prev_downsample_ratio = self.downsample_ratio
+            self.alpha_threshold = settings.get('alpha_threshold', 0.5)
+            self.use_soft_alpha = settings.get('use_soft_alpha', False)
+            self.alpha_contrast = settings.get('alpha_contrast', 1.0)
+            self.smoothing_enabled = settings.get('smoothing_enabled', False)
+            self.smoothing_alpha = settings.get('smoothing_alpha', 0.3)
+            self.edge_refinement = settings.get('edge_refinement', False)
+            self.edge_kernel_size = settings.get('edge_kernel_size', 3)
+            self.receive_format = settings.get('receive_format', 'bgra')
+            self.capture_policy = settings.get('capture_policy', 'latest')
+            self.capture_depth = settings.get('capture_depth', 3)
+            self.output_format = settings.get('output_format', 'uyvy')
+            self.idle_mode = settings.get('idle_mode', 'connections')
+            self.idle_fps = settings.get('idle_fps', 1.0)
+            self.pipeline_enabled = settings.get('pipeline_enabled', True)
+            self.pipeline_depth = settings.get('pipeline_depth', 2)
+            self.ndi_lib_path = settings.get('ndi_lib_path', '')
+            self.inference_backend = settings.get('inference_backend', 'eager')
+            self.model_cache_dir = settings.get('model_cache_dir', MODEL_CACHE_DIR)
+            self.cpu_precision = settings.get('cpu_precision', 'fp32')
+            self.calibration_frames = settings.get('calibration_frames', 30)
+            self.auto_resolution = settings.get('auto_resolution', False)
+            self.latency_budget_ms = settings.get('latency_budget_ms', 0.0)
+            self.batch_wait_ms = settings.get('batch_wait_ms', 8.0)
+            self.output_mode = settings.get('output_mode', 'key')
+            self.metrics_interval_s = settings.get('metrics_interval_s', 5.0)
+            self.metrics_port = settings.get('metrics_port', 0)
+            self.metrics_file = settings.get('metrics_file', '')
+
+            print(f"[INFO] Settings loaded from {path}")
+        except Exception as e:
+            print(f"[ERROR] Failed to load settings: {e}")
+
+    def reset_parameters(self):
+        """RVMパラメータをデフォルト値にリセット"""
+        self.downsample_ratio = 0.25
+        self.alpha_threshold = 0.5
+        self.use_soft_alpha = False
+        self.alpha_contrast = 1.0
+        self.smoothing_enabled = False
+        self.smoothing_alpha = 0.3
+        self.edge_refinement = False
+        self.edge_kernel_size = 3
+
+    def initialize_ndi(self, on_sources_changed=None):
+        """
+        NDI初期化とバックグラウンドでのソース探索開始
+
+        Args:
+            on_sources_changed: ソースの追加・削除時に呼ばれる関数（探索スレッドから）
+        """
+        configure(lib_path=self.ndi_lib_path or None)
+        print(f"[INFO] Initializing NDI (backend: {get_backend().name})...")
+        self.finder = NDIFinder(cache=NDISourceCache(self.sources_cache_file))
+        self.finder.initialize()
+        print("[INFO] NDI initialized successfully")
+
+        notify = (lambda src: on_sources_changed()) if on_sources_changed else None
+        self.finder.start_discovery(on_added=notify, on_removed=notify)
+
+    def find_source(self, name, timeout=5.0):
+        """
+        名前でソースを検索（完全一致 → 部分一致）。timeout秒以内に探索で
+        見つからなければ、以前に見つかったソースをキャッシュのURLで使う
+
+        Returns:
+            ソースのdict、見つからなければNone
+        """
+        deadline = time.time() + timeout
+        while True:
+            sources = self.finder.sources
+            for src in sources:
+                if src['name'] == name:
+                    return src
+            for src in sources:
+                if name.lower() in src['name'].lower():
+                    return src
+            if time.time() >= deadline:
+                break
+            time.sleep(0.1)
+
+        cached = self.finder.cache.get(name)
+        if cached:
+            print(f"[INFO] Source not discovered, using cached URL: {cached['url']}")
+        return cached
+
+    def load_model(self):
+        """RVMモデル読み込み（失敗時は例外）"""
+        # GPU情報を表示
+        if DEVICE == 'cuda':
+            gpu_name = torch.cuda.get_device_name(0)
+            print(f"[INFO] Using GPU: {gpu_name}")
+            print(f"[INFO] CUDA Version: {torch.version.cuda}")
+            # CUDAの最適化設定
+            torch.backends.cudnn.benchmark = True  # 自動最適化
+        else:
+            print(f"[WARNING] CUDA not available, using CPU (will be slower)")
+
+        # Load model
+        model = MattingNetwork('mobilenetv3').eval().to(DEVICE)
+        model.load_state_dict(torch.load(MODEL_PATH, map_location=DEVICE))
+
+        # FP16モード (半精度) で高速化
+        if DEVICE == 'cuda' and self.use_fp16:
+            model = model.half()
+            print("[INFO] Model converted to FP16 (half precision) for faster inference")
+
+        # 推論バックエンド（使えなければeagerで続行）
+        fp16 = DEVICE == 'cuda' and self.use_fp16
+        backend_name = self.inference_backend
+        precision = self.cpu_precision if DEVICE == 'cpu' else 'fp32'
+        if precision != 'fp32':
+            # INT8を指定してFP32で動かさない（使えなければ読み込みを失敗させる）
+            missing = missing_dependencies()
+            if missing:
+                raise RuntimeError(f"cpu_precision '{precision}' requires {' and '.join(missing)} "
+                                   f"(pip install -r {REQUIREMENTS_FILE})")
+            if backend_name != 'onnxruntime':
+                print(f"[INFO] {precision} runs on ONNX Runtime, using the onnxruntime backend")
+                backend_name = 'onnxruntime'
+        try:
+            backend = create_backend(backend_name, model, MODEL_PATH, DEVICE, fp16=fp16,
+                                     cache_dir=self.model_cache_dir, precision=precision,
+                                     calibration_frames=self.calibration_frames)
+        except Exception as e:
+            if precision != 'fp32':
+                raise RuntimeError(f"cpu_precision '{precision}' unavailable: {e}")
+            print(f"[WARNING] Inference backend '{backend_name}' ({precision}) unavailable ({e}), using eager")
+            backend = create_backend('eager', model, MODEL_PATH, DEVICE, fp16=fp16)
+        # INT8の速度・品質比較の結果をステータスに表示
+        backend.on_report = self.on_precision_report
+        print(f"[INFO] Inference backend: {backend.name} ({backend.precision})")
+
+        self.reset_state()
+        self.model = model
+        self.backend = backend
+
+    def on_precision_report(self, report):
+        """INT8モデルへの切り替え時の比較結果（量子化スレッドから呼ばれる）"""
+        speedup = report['fp32_ms'] / report['int8_ms'] if report['int8_ms'] > 0 else 0
+        tail = f", p95 {report['int8_p95_ms']:.1f}ms" if 'int8_p95_ms' in report else ''
+        self.notify_status(f"{report['precision']}: x{speedup:.2f}{tail}, alpha MAE {report['alpha_mae'] * 255:.2f}/255")
+
+    def start(self, source, output_name="RVM Alpha Mask"):
+        """
+        処理開始
+
+        Args:
+            source: ソースのdict（NDIFinder.sources / find_source）
+            output_name: NDI出力名
+        """
+        if self.model is None:
+            raise RuntimeError("Model is not loaded")
+        if self.is_processing:
+            raise RuntimeError("Already processing")
+        if self.output_mode not in OUTPUT_MODES:
+            raise ValueError(f"Unknown output mode: {self.output_mode!r} (choose from {', '.join(OUTPUT_MODES)})")
+
+        # 処理用に購読（プレビューと同じ接続を共有するので、プレビューは止めない）
+        # 'framesync'はフレームシンクロナイザ用に別接続を開き、ソースのフレームレートで最新フレームを取得する
+        self.process_sub = self.receiver_hub.subscribe(
+            source, color_format=self.recv_color_format(),
+            policy=self.capture_policy, depth=self.capture_depth
+        )
+
+        try:
+            # 送信ペースは受信ソースに従うので、SDKによるclock_videoの間引きは使わない
+            self.sender = NDISender(output_name, async_send=True, clock_video=False)
+            self.sender.initialize()
+            if self.output_mode == 'fill_key':
+                self.key_sender = NDISender(f"{output_name} Key", async_send=True, clock_video=False)
+                self.key_sender.initialize()
+        except Exception:
+            self.process_sub.close()
+            self.process_sub = None
+            for sender in (self.sender, self.key_sender):
+                if sender:
+                    sender.close()
+            self.sender = None
+            self.key_sender = None
+            raise
+
+        # 受信者がいない・タリーが立っていない間は推論を間引く
+        self.output_activity = NDIOutputActivity(self.sender, mode=self.idle_mode, idle_fps=self.idle_fps)
+        self.start_metrics()
+
+        # Start processing thread immediately
+        self.is_processing = True
+        self.processing_thread = threading.Thread(target=self.processing_loop, daemon=True)
+        self.processing_thread.start()
+
+    def stop(self):
+        """処理停止"""
+        self.is_processing = False
+
+        if self.processing_thread:
+            self.processing_thread.join(timeout=2)
+            self.processing_thread = None
+        self.stop_metrics()
+
+        if self.process_sub:
+            print(f"[INFO] Capture stats: {self.process_sub.stats()}")
+            self.process_sub.close()
+            self.process_sub = None
+
+        if self.output_activity:
+            print(f"[INFO] Frames skipped while idle: {self.output_activity.frames_skipped}")
+            self.output_activity = None
+
+        if self.sender:
+            self.sender.close()
+            self.sender = None
+        if self.key_sender:
+            self.key_sender.close()
+            self.key_sender = None
+
+        if self.latency_controller:
+            print(f"[INFO] Auto resolution: {self.latency_controller.stats()}")
+            self.latency_controller = None
+        self.source_frame_rate = 0.0
+
+        self.reset_state()
+        if hasattr(self, '_debug_printed'):
+            delattr(self, '_debug_printed')
+
+        self.current_fps = 0
+
+    def close(self):
+        """処理を止め、NDIの接続と探索を閉じる"""
+        self.stop()
+        self.receiver_hub.close()
+        if self.finder:
+            self.finder.close()
+            self.finder = None
+
+    def start_metrics(self):
+        """ヒストグラムをリセットし、定期レポート（コンソール・JSONL・HTTP）を開始"""
+        self.metrics.reset()
+        self._last_recv_perf = None
+        options = dict(interval_s=self.metrics_interval_s, jsonl_path=self.metrics_file or None,
+                       on_report=self.on_metrics_report)
+        try:
+            self.metrics_exporter = MetricsExporter(self.metrics, http_port=self.metrics_port, **options).start()
+        except OSError as e:
+            # ポートが使用中など。HTTPで公開できなくてもレポートは続ける
+            print(f"[WARNING] Metrics HTTP port {self.metrics_port} unavailable: {e}")
+            self.metrics_exporter = MetricsExporter(self.metrics, **options).start()
+
+    def stop_metrics(self):
+        """定期レポートを止める（最後の区間もレポートする）"""
+        if self.metrics_exporter:
+            self.metrics_exporter.close()
+            self.metrics_exporter = None
+
+    def metrics_info(self):
+        """レポートに含める現在の状態（MetricsExporterのスレッドから呼ばれる）"""
+        info = {
+            'fps': self.current_fps,
+            'source_fps': self.source_frame_rate,
+            'backend': self.backend.name if self.backend else None,
+            'output_mode': self.output_mode,
+        }
+        process_sub = self.process_sub
+        if process_sub is not None:
+            info['capture'] = process_sub.stats()
+        pipeline = self.pipeline
+        if pipeline is not None:
+            info['pipeline'] = pipeline.stats()
+        controller = self.latency_controller
+        if controller is not None:
+            info['auto_resolution'] = controller.stats()
+        return info
+
+    def on_metrics_report(self, report):
+        """定期レポート（MetricsExporterのスレッドから呼ばれるので、処理ループは止まらない）"""
+        self.print_metrics(report)
+        if self.on_metrics is not None:
+            self.on_metrics(report)
+
+    def print_metrics(self, report):
+        """区間のステージごとの処理時間の分布と受信・自動解像度の状態を表示"""
+        if not report['histograms']:
+            return
+        print(f"\n[PERFORMANCE] Timing over {report['interval_s']:.1f}s (ms):")
+        for name, h in report['histograms'].items():
+            print(f"  {name:20s}: p50={h['p50_ms']:6.2f}, p95={h['p95_ms']:6.2f}, "
+                  f"p99={h['p99_ms']:6.2f}, max={h['max_ms']:6.2f} (n={h['count']})")
+        if self.source_frame_rate > 0:
+            print(f"  Target: {1000.0 / self.source_frame_rate:.2f}ms ({self.source_frame_rate:.2f}fps source), "
+                  f"output {self.current_fps}fps")
+
+        pipeline = self.pipeline
+        if pipeline is not None:
+            pipeline.print_stats()
+        self.print_source_stats()
+        self.print_resolution_stats()
+
+        if DEVICE == 'cuda':
+            print(f"  GPU Memory: {torch.cuda.memory_allocated(0) / 1024**2:.1f}MB / {torch.cuda.max_memory_allocated(0) / 1024**2:.1f}MB (max)")
+            torch.cuda.reset_peak_memory_stats()
+
+    def print_source_stats(self):
+        """受信側の統計（RVMBatchEngineはストリームごと）"""
+        if self.process_sub is not None:
+            self._last_recv_perf = self.print_receive_stats(self._last_recv_perf)
+
+    def recv_color_format(self):
+        """NDIReceiverに渡すカラーフォーマット"""
+        if self.receive_format == 'uyvy':
+            return NDIlib_recv_color_format_e.UYVY_BGRA
+        return NDIlib_recv_color_format_e.BGRX_BGRA
+
+    def processing_loop(self):
+        """メイン処理ループ（受信ソースのフレームレートに同期）"""
+        first_frame_received = False
+        connection_check_time = time.time()
+        frame_wait_timeout = 10.0
+
+        # パフォーマンス計測用（ヒストグラムに記録し、表示・公開はMetricsExporterのスレッドで行う）
+        metrics = self.metrics
+
+        # 推論・後処理・送信のパイプライン（fifoでは全フレームを処理するため押し出さずに待つ）
+        pipeline = None
+        if self.pipeline_enabled:
+            pipeline = PipelineExecutor([
+                ('inference', self.pipeline_inference),
+                ('postprocess', self.pipeline_postprocess),
+                ('send', self.pipeline_send),
+            ], depth=self.pipeline_depth,
+                policy=PipelineExecutor.BLOCK if self.capture_policy == 'fifo' else PipelineExecutor.DROP_OLDEST,
+                on_drop=release_payload, metrics=metrics)
+            pipeline.start()
+            self.pipeline = pipeline
+
+        while self.is_processing:
+            loop_start = time.time()
+
+            try:
+                # Receive video frame (キャプチャスレッドのリングバッファから取得)
+                t0 = time.time()
+                frame_buf = self.process_sub.read(timeout_ms=100)
+                t1 = time.time()
+                metrics.record('ndi_receive', (t1 - t0) * 1000)
+
+                if frame_buf is None:
+                    if not first_frame_received:
+                        elapsed = time.time() - connection_check_time
+                        if elapsed > frame_wait_timeout:
+                            print(f"[WARNING] No frames received after {frame_wait_timeout} seconds")
+                            self.notify_status("No video frames (check NDI source)")
+                            connection_check_time = time.time()
+                    continue
+
+                # 最初のフレーム受信時の通知
+                if not first_frame_received:
+                    first_frame_received = True
+                    print("[INFO] First frame received, processing started")
+                    self.notify_status("Processing...")
+                # 自動解像度の予算（latency_budget_ms = 0の場合）。ソースのフレームレートが変わったら追従する
+                if frame_buf.info is not None and frame_buf.info.frame_rate > 0:
+                    self.source_frame_rate = frame_buf.info.frame_rate
+
+                # 出力が使われていなければ推論を省略（idle_fpsの頻度でのみ処理）
+                was_idle = self.output_activity.idle
+                process_now = self.output_activity.should_process()
+                if self.output_activity.idle != was_idle:
+                    self.on_output_activity_changed()
+                if not process_now:
+                    frame_buf.release()
+                    continue
+
+                if pipeline is not None:
+                    # 以降はステージスレッドで実行（次フレームの推論と前フレームの後処理・送信が重なる）
+                    pipeline.submit(frame_buf)
+                    continue
+
+                # Process with RVM
+                frame = frame_buf.array
+                t2 = time.time()
+                alpha_buf = self.process_frame(frame)
+                t3 = time.time()
+                metrics.record('rvm_process', (t3 - t2) * 1000)
+
+                if alpha_buf is not None:
+                    # Send alpha mask via NDI
+                    t4 = time.time()
+                    # フレームレート・タイムコードは受信フレームのものを引き継ぐ
+                    self.send_output(self.sender, self.key_sender, alpha_buf, frame_buf.info)
+                    t5 = time.time()
+                    metrics.record('ndi_send', (t5 - t4) * 1000)
+
+                    # Update FPS / preview
+                    t6 = time.time()
+                    self.count_output_frame(alpha_buf)
+                    t7 = time.time()
+                    if self.fps_counter % 5 == 0:
+                        metrics.record('preview_update', (t7 - t6) * 1000)
+
+                    alpha_buf.release()
+
+                # バッファをプールに返却
+                frame_buf.release()
+
+                # Total timing
+                loop_end = time.time()
+                metrics.record('total', (loop_end - loop_start) * 1000)
+
+            except Exception as e:
+                print(f"Processing error: {e}")
+                import traceback
+                traceback.print_exc()
+                time.sleep(0.1)  # エラー時は100msスリープしてCPU負荷を軽減
+
+        if pipeline is not None:
+            pipeline.stop()
+            self.pipeline = None
+
+    def count_output_frame(self, alpha_buf):
+        """送信したフレームをFPSに数え、5フレームに1回on_outputに渡す（出力プレビュー用）"""
+        # Update FPS
+        self.fps_counter += 1
+        current_time = time.time()
+        if current_time - self.fps_time >= 1.0:
+            self.current_fps = self.fps_counter
+            self.fps_counter = 0
+            self.fps_time = current_time
+            if self.on_fps is not None:
+                self.on_fps(self.current_fps)
+
+        # Update preview (5フレームに1回 - カクついてもOK)
+        if self.on_output is not None and self.fps_counter % 5 == 0:
+            self.on_output(alpha_buf)
+
+    def pipeline_inference(self, frame_buf):
+        """パイプライン: 推論ステージ（入力バッファはここで返却）"""
+        try:
+            alpha_final = self.infer_alpha(frame_buf.array)
+            info = frame_buf.info
+        finally:
+            frame_buf.release()
+        if alpha_final is None:
+            return None
+        return info, alpha_final
+
+    def pipeline_postprocess(self, payload):
+        """パイプライン: 後処理ステージ（プールのバッファへの格納）"""
+        info, alpha_final = payload
+        alpha_buf = self.refine_alpha(alpha_final)
+        if alpha_buf is None:
+            return None
+        return info, alpha_buf
+
+    def pipeline_send(self, payload):
+        """パイプライン: 送信ステージ（フレームレート・タイムコードは受信フレームのものを引き継ぐ）"""
+        info, alpha_buf = payload
+        try:
+            self.send_output(self.sender, self.key_sender, alpha_buf, info)
+            self.count_output_frame(alpha_buf)
+        finally:
+            alpha_buf.release()
+
+    def send_output(self, sender, key_sender, alpha_buf, info):
+        """
+        出力バッファを送信
+
+        アルファマスク (H, W) はoutput_formatのキーとして送る。フィル+キーのBGRA (H, W, 4) は
+        key_senderがなければ1本のBGRA（アルファ付き）、あればフィルをBGRX（不透明）、
+        キーをoutput_formatで別々の出力に送る
+        """
+        if alpha_buf.array.ndim == 2:
+            sender.send_mask(alpha_buf, self.output_format, info=info)
+        elif key_sender is None:
+            sender.send_video(alpha_buf, info=info)
+        else:
+            # send_maskはその場でコピーするので、フィルと同じバッファのアルファチャンネルを渡せる
+            key_sender.send_mask(alpha_buf.array[:, :, 3], self.output_format, info=info)
+            sender.send_video(alpha_buf, info=info, alpha=False)
+
+    def print_receive_stats(self, previous):
+        """
+        受信側の統計を表示（前回からの増分）
+
+        NDI受信のドロップ・タイムスタンプ欠落が増えていればネットワーク/受信側の問題、
+        キャプチャリングのdropped/overwrittenが増えていれば推論が間に合っていない
+        """
+        capture = self.process_sub.stats()
+        if self.capture_policy == 'framesync':
+            # repeatedが多ければソースの到着が遅れている、lateが多ければ推論が間に合っていない
+            # unknown: タイムスタンプもタイムコードもないソースで、新規か繰り返しか判定できないフレーム
+            print(f"  Frame sync: ticks={capture['ticks']}, new={capture['new']}, "
+                  f"repeated={capture['repeated']}, unknown={capture['unknown']}, late={capture['late']}")
+        else:
+            print(f"  Capture ({self.capture_policy}): dropped={capture['dropped']}, "
+                  f"overwritten={capture['overwritten']}, queued={capture['queued']}")
+
+        recv = self.process_sub.receiver.get_performance()
+        prev = previous or {}
+        print(f"  NDI receive: sdk_dropped=+{recv['dropped_video'] - prev.get('dropped_video', 0)}, "
+              f"missed=+{recv['frames_missed'] - prev.get('frames_missed', 0)} "
+              f"({recv['timestamp_gaps'] - prev.get('timestamp_gaps', 0)} gaps), "
+              f"sdk_queue={recv['queued_video']}, total={recv['total_video']}")
+        return recv
+
+    def print_resolution_stats(self):
+        """自動解像度の状態を表示"""
+        controller = self.latency_controller
+        if controller is not None:
+            print(f"  Auto resolution: downsample_ratio={controller.value} (max {self.downsample_ratio}), "
+                  f"budget={controller.budget_ms:.2f}ms, steps down={controller.steps_down} up={controller.steps_up}")
+
+    def current_downsample_ratio(self):
+        """
+        このフレームで使うdownsample_ratio（推論ステージから呼ばれる）
+
+        自動解像度の変更は安全な時点でだけ反映する:
+        - 下げる: 予算を超えている間はフレームを落とすので、次のフレームで反映（再帰状態はリセット）
+        - 上げる: 再帰状態がリセット済み（開始・アイドル明け）か、前フレームに被写体がいない時
+        """
+        if not self.auto_resolution:
+            self.latency_controller = None
+            return self.downsample_ratio
+
+        levels = [level for level in DOWNSAMPLE_LEVELS if level < self.downsample_ratio] + [self.downsample_ratio]
+        budget = self.latency_budget()
+        controller = self.latency_controller
+        if controller is None:
+            controller = self.latency_controller = LatencyController(levels, budget_ms=budget)
+            self._alpha_coverage = 1.0
+            print(f"[INFO] Auto resolution: budget {budget:.2f}ms, downsample_ratio {levels[0]}-{levels[-1]}")
+        else:
+            if controller.levels[-1] != self.downsample_ratio:
+                # 上限（スライダー）が変わった
+                controller.set_levels(levels, self.downsample_ratio)
+            if controller.set_budget(budget):
+                print(f"[INFO] Auto resolution: budget {budget:.2f}ms")
+
+        if controller.pending is not None:
+            if not controller.stepping_up or self.resolution_step_safe():
+                previous = controller.value
+                controller.apply()
+                self._alpha_coverage = 1.0
+                print(f"[INFO] Auto resolution: downsample_ratio {previous} -> {controller.value}")
+        return controller.value
+
+    def latency_budget(self):
+        """自動解像度の予算（latency_budget_ms、0なら現在のソースのフレーム間隔。不明なら0）"""
+        if self.latency_budget_ms > 0:
+            return self.latency_budget_ms
+        if self.source_frame_rate > 0:
+            return 1000.0 / self.source_frame_rate
+        return 0.0
+
+    def resolution_step_safe(self):
+        """解像度を上げても目立たない時点か（再帰状態がリセット済み、または前フレームに被写体なし）"""
+        return self.rec[0] is None or self._alpha_coverage < EMPTY_FRAME_COVERAGE
+
+    def reset_state(self):
+        """フレーム間の状態（再帰状態と時間的平滑化の履歴）をリセット"""
+        self.reset_requested = False
+        self.rec = [None] * 4
+        if hasattr(self, '_prev_alpha_gpu'):
+            delattr(self, '_prev_alpha_gpu')
+
+    def on_output_activity_changed(self):
+        """出力のアイドル状態が変化した（処理スレッドから呼ばれる）"""
+        activity = self.output_activity
+        if activity.idle:
+            print(f"[INFO] Output idle ({activity.reason}), processing at {activity.idle_fps} fps")
+            status = f"Idle ({activity.reason})"
+        else:
+            print("[INFO] Output active, processing every frame")
+            # 間引いていた間の状態は古いのでリセット（推論ステージが使用中なので、次の推論の前に行う）
+            self.reset_requested = True
+            status = "Processing..."
+        self.notify_status(status)
+
+    def process_frame(self, frame):
+        """
+        フレーム処理 - RVMでアルファマスク生成（推論と後処理を続けて実行）
+
+        Returns:
+            アルファマスク (H, W) のPooledFrame（呼び出し側でrelease()する）、失敗時はNone
+            （フィル+キー出力ではBGRA (H, W, 4)）
+        """
+        alpha_final = self.infer_alpha(frame)
+        if alpha_final is None:
+            return None
+        return self.refine_alpha(alpha_final)
+
+    def infer_alpha(self, frame):
+        """
+        推論 - 入力テンソル作成、RVM推論、GPU上のアルファ処理、CPU転送
+
+        Returns:
+            アルファマスク (H, W) uint8（フィル+キー出力では乗算済みフィルとキーのBGRA (H, W, 4)）、
+            失敗時はNone
+        """
+        try:
+            # 詳細タイミング計測
+            metrics = self.metrics
+            t_start = time.time()
+
+            # Check if model is loaded
+            if self.model is None:
+                print("[ERROR] Model is not loaded!")
+                return None
+
+            # BGR to RGB - 最速化
+            h, w = frame.shape[:2]
+
+            # Check if downsample_ratio changed（スライダーまたは自動解像度）
+            downsample_ratio = self.current_downsample_ratio()
+            if abs(downsample_ratio - self.prev_downsample_ratio) > 0.01:
+                print(f"[INFO] Downsample ratio changed from {self.prev_downsample_ratio:.2f} to {downsample_ratio:.2f}, resetting states")
+                self.reset_requested = True
+                self.prev_downsample_ratio = downsample_ratio
+            if self.reset_requested:
+                self.reset_state()
+
+            t1 = time.time()
+            metrics.record('prepare', (t1 - t_start) * 1000)
+
+            if frame.shape[2] == 2:
+                # UYVY受信: 色変換と正規化を1回で行い、モデル入力を直接作成
+                src_tensor = self.uyvy_input_tensor(frame)
+            else:
+                # BGRA受信: uint8のまま1回だけ転送し、チャンネル入替と正規化は1パスで入力テンソルに書き込む
+                src_tensor = self.bgra_input_tensor(frame)
+
+            # FP16モード (半精度) で高速化
+            if DEVICE == 'cuda' and self.use_fp16:
+                src_tensor = src_tensor.half()
+            src_full = src_tensor  # フィル+キー出力: 前景を入力解像度に戻すときに使う
+
+            # GPU上でダウンサンプル (cv2.resizeをGPU処理に置き換え)
+            if downsample_ratio != 1.0:
+                new_h = max(16, int(h * downsample_ratio))
+                new_w = max(16, int(w * downsample_ratio))
+                src_tensor = torch.nn.functional.interpolate(
+                    src_tensor,
+                    size=(new_h, new_w),
+                    mode='bilinear',
+                    align_corners=False
+                )
+
+            t2 = time.time()
+            metrics.record('cpu_to_gpu', (t2 - t1) * 1000)
+
+            # First frame GPU check
+            if not hasattr(self, '_gpu_check_printed'):
+                print(f"[GPU CHECK] Input tensor device: {src_tensor.device}")
+                print(f"[GPU CHECK] Input tensor dtype: {src_tensor.dtype}")
+                print(f"[GPU CHECK] Input tensor shape: {src_tensor.shape}")
+                print(f"[GPU CHECK] Model device: {next(self.model.parameters()).device}")
+                print(f"[GPU CHECK] Inference backend: {self.backend.name}")
+                if DEVICE == 'cuda':
+                    print(f"[GPU CHECK] CUDA memory allocated: {torch.cuda.memory_allocated(0) / 1024**2:.1f} MB")
+                    print(f"[GPU CHECK] CUDA memory reserved: {torch.cuda.memory_reserved(0) / 1024**2:.1f} MB")
+                self._gpu_check_printed = True
+
+            # Run model
+            # Reset recurrent states if they contain invalid data
+            if any(r is not None and not isinstance(r, torch.Tensor) for r in self.rec):
+                self.rec = [None] * 4
+
+            # Ensure recurrent states are on the same device as input
+            rec_on_device = []
+            for r in self.rec:
+                if r is not None:
+                    if r.device != src_tensor.device:
+                        print(f"[WARNING] Moving recurrent state from {r.device} to {src_tensor.device}")
+                        r = r.to(src_tensor.device)
+                rec_on_device.append(r)
+
+            t3 = time.time()
+
+            # CUDAストリームを明示的に同期 (モデル推論前に転送完了を保証)
+            if DEVICE == 'cuda':
+                torch.cuda.synchronize()
+
+            with torch.no_grad():
+                # eager以外は最初のフレーム（解像度・比率の変更時）にエクスポート/キャッシュ読み込み
+                fgr, pha, self.rec = self.backend.infer(src_tensor, rec_on_device, downsample_ratio,
+                                                        with_fgr=self.output_mode != 'key')
+
+                # 解像度を上げる提案がある間は、被写体の有無（低解像度のアルファの平均）を見る
+                if self.latency_controller is not None and self.latency_controller.stepping_up:
+                    self._alpha_coverage = float(pha.mean())
+
+            # モデル推論完了を待つ
+            if DEVICE == 'cuda':
+                torch.cuda.synchronize()
+
+            t4 = time.time()
+            metrics.record('model_inference', (t4 - t3) * 1000)
+            if self.latency_controller is not None:
+                # 入力作成からモデル推論まで（解像度で変わる部分）
+                self.latency_controller.record((t4 - t_start) * 1000)
+
+            # Temporal Smoothing（時間的平滑化） - モデル解像度のままGPU上で実行
+            # （EMAは線形なので、アップサンプル後に行うのと同じ結果）
+            if self.smoothing_enabled:
+                if not hasattr(self, '_prev_alpha_gpu') or self._prev_alpha_gpu.shape != pha.shape:
+                    self._prev_alpha_gpu = pha
+                else:
+                    # EMA (Exponential Moving Average) - GPU演算
+                    pha = self.smoothing_alpha * pha + (1 - self.smoothing_alpha) * self._prev_alpha_gpu
+                    self._prev_alpha_gpu = pha
+
+            # Edge Refinement（モデル解像度のままGPU上で実行）、GPU上でリサイズ
+            pha, threshold = self.refine_and_upsample(pha, h, w)
+            if fgr is not None:
+                fgr = self.upsample_foreground(fgr, src_full, src_tensor).squeeze(0)  # (3, H, W)
+
+            # Get alpha (GPU→CPU転送は最後の1回のみ)
+            pha = pha.squeeze(0).squeeze(0)  # (1, 1, H, W) -> (H, W) - まだGPU上
+
+            t5 = time.time()
+            metrics.record('gpu_postprocess', (t5 - t4) * 1000)
+
+            # アルファ処理をGPU上で実行 (CPU転送を最小化)
+            alpha_final = self.alpha_to_uint8(pha, threshold, fgr)
+
+            # Debug (first frame only)
+            if not hasattr(self, '_debug_printed'):
+                print(f"[DEBUG] Alpha shape: {alpha_final.shape}")
+                print(f"[DEBUG] Alpha mode: {'Soft (Gradient)' if self.use_soft_alpha else 'Binary (Hard)'}")
+                self._debug_printed = True
+
+            t6 = time.time()
+            metrics.record('gpu_to_cpu', (t6 - t5) * 1000)
+
+            return alpha_final
+
+        except Exception as e:
+            import traceback
+            print(f"[ERROR] Frame processing error: {e}")
+            print(traceback.format_exc())
+            return None
+
+    def refine_and_upsample(self, pha, h, w):
+        """
+        モデル解像度のアルファ (N, 1, h', w') にエッジ精緻化を行い、出力解像度 (h, w) にリサイズ
+
+        ソフトアルファのコントラスト調整もここで行う（精緻化する時はぼかしの前、
+        しない時はリサイズの後。どちらもcv2版と同じく コントラスト → ぼかし の順）
+
+        Returns:
+            (アルファ (N, 1, h, w), alpha_to_uint8に渡す二値化の閾値)
+        """
+        threshold = self.alpha_threshold
+        contrast_applied = False
+        if self.edge_refinement:
+            binary_threshold = None if self.use_soft_alpha else self.alpha_threshold
+            if self.use_soft_alpha:
+                pha = self.apply_contrast(pha)
+                contrast_applied = True
+            pha = refine_edges(pha, self.edge_kernel_size, pha.shape[-1] / w, binary_threshold)
+            if binary_threshold is not None:
+                threshold = 0.5  # 二値化・モルフォロジー・ぼかし後の再二値化
+
+        if pha.shape[-2:] != (h, w):
+            pha = torch.nn.functional.interpolate(
+                pha,
+                size=(h, w),
+                mode='bilinear',
+                align_corners=False
+            )
+        if self.use_soft_alpha and not contrast_applied:
+            pha = self.apply_contrast(pha)
+        return pha, threshold
+
+    def apply_contrast(self, pha):
+        """ソフトアルファのコントラスト調整（alpha_contrast）"""
+        if self.alpha_contrast == 1.0:
+            return pha
+        return torch.clamp((pha - 0.5) * self.alpha_contrast + 0.5, 0.0, 1.0)
+
+    def upsample_foreground(self, fgr, src, src_small):
+        """
+        モデル解像度の前景 (N, 3, h', w') を入力解像度 (N, 3, H, W) に戻す（フィル+キー出力）
+
+        前景をそのまま拡大するとぼけるので、モデル入力との差分（背景の色かぶりを除いた分）
+        だけを拡大して入力解像度のフレームに足す（RVMのリファイナの前景と同じ考え方）
+
+        Args:
+            src: 入力解像度のモデル入力 (N, 3, H, W)
+            src_small: モデルに渡したダウンサンプル後の入力 (N, 3, h', w')
+        """
+        if fgr.shape[-2:] == src.shape[-2:]:
+            return fgr
+        residual = torch.nn.functional.interpolate(
+            fgr - src_small,
+            size=src.shape[-2:],
+            mode='bilinear',
+            align_corners=False
+        )
+        return (src + residual).clamp_(0.0, 1.0)
+
+    def alpha_to_uint8(self, pha, threshold=None, fgr=None):
+        """
+        GPU上のアルファ (..., H, W) をソフトアルファ（コントラストはrefine_and_upsampleで
+        調整済み）または二値化し、0-255に変換してからCPUへ転送
+
+        Args:
+            threshold: 二値化の閾値（None = alpha_threshold）
+            fgr: 入力解像度の前景 (..., 3, H, W)。指定するとフィル+キーを返す
+
+        Returns:
+            アルファ uint8 のndarray（形状は入力と同じ）。fgrを指定した場合は
+            BGR = 前景 × アルファ（乗算済みフィル）、A = アルファの (..., H, W, 4)
+        """
+        if self.use_soft_alpha:
+            # ソフトアルファモード（グラデーション）
+            if fgr is None:
+                return (pha * 255.0).to(torch.uint8).cpu().numpy()
+        else:
+            # 二値化モード - GPU上で処理してからCPU転送
+            threshold = self.alpha_threshold if threshold is None else threshold
+            if fgr is None:
+                return ((pha > threshold).to(torch.uint8) * 255).cpu().numpy()
+            pha = (pha > threshold).to(fgr.dtype)
+
+        # フィルとキーをGPU上でBGRAにまとめ、CPU転送は1回
+        pha = pha.unsqueeze(-3)
+        bgra = torch.cat([fgr.flip(-3) * pha, pha], dim=-3).movedim(-3, -1)
+        return (bgra * 255.0).to(torch.uint8).contiguous().cpu().numpy()
+
+    def refine_alpha(self, alpha_final):
+        """
+        後処理 - プールのバッファへの格納（エッジ精緻化は推論ステージでGPU上で実行済み）
+
+        Returns:
+            アルファマスク (H, W) のPooledFrame（呼び出し側でrelease()する）、失敗時はNone
+            （フィル+キー出力ではBGRA (H, W, 4)）
+        """
+        try:
+            t6 = time.time()
+
+            # 1チャンネルのマスクのまま返す（送信フォーマットへの展開はNDISender.send_mask）
+            alpha_buf = self.frame_pool.acquire(alpha_final.shape)
+            np.copyto(alpha_buf.array, alpha_final)
+
+            t7 = time.time()
+            self.metrics.record('cpu_postprocess', (t7 - t6) * 1000)
+
+            return alpha_buf
+
+        except Exception as e:
+            import traceback
+            print(f"[ERROR] Frame processing error: {e}")
+            print(traceback.format_exc())
+            return None
+
+    def uyvy_input_tensor(self, frame):
+        """UYVYフレームから正規化RGB入力テンソル (1, 3, H, W) を作成"""
+        h, w = frame.shape[:2]
+
+        if DEVICE == 'cuda':
+            # UYVY (2バイト/画素) のままGPUへ転送し、GPU上で色変換
+            uyvy = torch.from_numpy(np.ascontiguousarray(frame)).cuda(non_blocking=True)
+            return uyvy_to_chw_tensor(uyvy).unsqueeze(0)
+
+        # CPU: 再利用するfloatバッファに直接変換（中間コピーなし）
+        if getattr(self, '_uyvy_input', None) is None or self._uyvy_input.shape[1:] != (h, w):
+            self._uyvy_input = np.empty((3, h, w), dtype=np.float32)
+        uyvy_to_chw_float(frame, out=self._uyvy_input)
+        return torch.from_numpy(self._uyvy_input).unsqueeze(0)
+
+    def bgra_input_tensor(self, frame):
+        """BGRAフレームから正規化RGB入力テンソル (1, 3, H, W) を作成"""
+        h, w = frame.shape[:2]
+        dtype = torch.float16 if DEVICE == 'cuda' and self.use_fp16 else torch.float32
+
+        # 再利用する入力テンソル（FP16時は書き込み時に半精度へ変換）
+        if getattr(self, '_bgra_input', None) is None or \
+                self._bgra_input.shape[2:] != (h, w) or self._bgra_input.dtype != dtype:
+            self._bgra_input = torch.empty((1, 3, h, w), dtype=dtype, device=DEVICE)
+
+        # 受信バッファをそのまま参照（CPU時はコピーなし）
+        bgra = torch.from_numpy(frame)
+        if DEVICE == 'cuda':
+            # ピン留めメモリからの非同期転送（推論前のsynchronizeで完了を保証）
+            bgra = bgra.cuda(non_blocking=True)
+
+        bgra_to_chw_tensor(bgra, self._bgra_input[0])
+        return self._bgra_input
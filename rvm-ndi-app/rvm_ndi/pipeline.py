@@ -0,0 +1,263 @@
+"""
+多段パイプライン実行（rvm-decklink-app/PipelineProcessor.cs と同じ構成）
+
+ステージごとに専用スレッドを持ち、ステージ間は上限付きキューでつなぐ。
+推論中に前フレームの後処理・送信が並行して進むため、スループットは
+全ステージの合計ではなく最も遅いステージで決まる。
+"""
+import collections
+import threading
+import time
+
+from ndi_wrapper import MetricsRegistry
+
+
+class PipelineItem:
+    """パイプラインを流れる1フレーム分のデータ"""
+
+    __slots__ = ('seq', 'payload', 'submit_time')
+
+    def __init__(self, seq, payload):
+        self.seq = seq
+        self.payload = payload
+        self.submit_time = time.perf_counter()
+
+
+class StageQueue:
+    """
+    ステージ間の上限付きキュー
+
+    'drop_oldest': 満杯なら最も古い項目を捨てて追加（遅延を溜めない）
+    'block':       満杯なら空きが出るまで待つ（全フレームを処理）
+    """
+
+    def __init__(self, depth, policy):
+        self.depth = max(1, depth)
+        self.policy = policy
+        self._items = collections.deque()
+        self._cond = threading.Condition()
+        self._closed = False
+
+    def put(self, item):
+        """
+        項目を追加
+
+        Returns:
+            押し出された古い項目（なければNone）。閉じている場合はitem自身
+        """
+        with self._cond:
+            if self.policy == PipelineExecutor.BLOCK:
+                while len(self._items) >= self.depth and not self._closed:
+                    self._cond.wait(0.1)
+            if self._closed:
+                return item
+
+            dropped = None
+            if len(self._items) >= self.depth:
+                dropped = self._items.popleft()
+            self._items.append(item)
+            self._cond.notify_all()
+            return dropped
+
+    def get(self, timeout):
+        """次の項目を取得（タイムアウト・クローズ時はNone）"""
+        with self._cond:
+            if not self._items and not self._closed:
+                self._cond.wait(timeout)
+            if not self._items:
+                return None
+            item = self._items.popleft()
+            self._cond.notify_all()
+            return item
+
+    def __len__(self):
+        return len(self._items)
+
+    def close(self):
+        """待機中のスレッドを起こし、残っている項目を返す"""
+        with self._cond:
+            self._closed = True
+            items = list(self._items)
+            self._items.clear()
+            self._cond.notify_all()
+        return items
+
+
+class PipelineStage:
+    """1ステージ（専用スレッド1本）とその計測値"""
+
+    def __init__(self, name, func, queue):
+        self.name = name
+        self.func = func
+        self.queue = queue  # このステージの入力キュー
+        self.thread = None
+        self.last_seq = -1
+
+        # 計測値（処理時間はMetricsRegistryのヒストグラム 'pipeline.<name>'）
+        self.processed = 0
+        self.dropped = 0  # 入力キューから押し出された数
+        self.discarded = 0  # ステージ関数がNoneを返した・例外・順序違反
+        self.errors = 0
+
+
+class PipelineExecutor:
+    """
+    ステージ関数を直列につないだパイプライン
+
+    各ステージ関数は前段の戻り値を受け取り、次段に渡す値を返す。Noneを返すと
+    そのフレームはそこで終わる（関数側で資源を解放する）。最終段の戻り値は捨てる。
+
+    各ステージは1スレッドで順番に処理するので、フレームの順序は保たれる
+    （RVMの再帰状態のように前フレームに依存する処理も安全）。submit()で振った
+    シーケンス番号が前より小さいフレームは念のため捨てる。
+
+    捨てたフレーム（押し出し・例外・停止時の残り）はon_drop(payload)に渡す。
+    ステージの処理時間は 'pipeline.<name>'、submit()から最終段完了までは
+    'pipeline.latency' としてmetrics（MetricsRegistry）のヒストグラムに記録する。
+    """
+
+    DROP_OLDEST = 'drop_oldest'
+    BLOCK = 'block'
+
+    def __init__(self, stages, depth=2, policy=DROP_OLDEST, on_drop=None, metrics=None):
+        """
+        Args:
+            stages: [(name, func), ...] 実行順
+            depth: 各ステージの入力キューのフレーム数
+            policy: DROP_OLDEST or BLOCK（submit()と段間の両方に適用）
+            on_drop: 捨てたフレームのpayloadを受け取る関数（PooledFrameの解放など）
+            metrics: 処理時間を記録するMetricsRegistry（Noneなら専用のものを作る）
+        """
+        if policy not in (self.DROP_OLDEST, self.BLOCK):
+            raise ValueError(f"Unknown pipeline policy: {policy}")
+        self.policy = policy
+        self.on_drop = on_drop
+        self.stages = [PipelineStage(name, func, StageQueue(depth, policy)) for name, func in stages]
+        self.metrics = metrics if metrics is not None else MetricsRegistry()
+        self._running = False
+        self._seq = 0
+        self._completed = 0
+
+    def start(self):
+        """ステージスレッドを起動"""
+        if self._running:
+            return
+        self._running = True
+        for index, stage in enumerate(self.stages):
+            stage.thread = threading.Thread(
+                target=self._stage_loop, args=(index,), name=f"Pipeline-{stage.name}", daemon=True
+            )
+            stage.thread.start()
+        print(f"[PIPELINE] Started with {len(self.stages)} stages: {' -> '.join(s.name for s in self.stages)}")
+
+    def submit(self, payload):
+        """
+        フレームを先頭ステージに投入
+
+        Returns:
+            押し出されずに投入できればTrue
+        """
+        if not self._running:
+            self._drop(payload)
+            return False
+
+        item = PipelineItem(self._seq, payload)
+        self._seq += 1
+        return self._put(self.stages[0], item) is not item
+
+    def _put(self, stage, item):
+        dropped = stage.queue.put(item)
+        if dropped is not None:
+            stage.dropped += 1
+            self._drop(dropped.payload)
+        return dropped
+
+    def _drop(self, payload):
+        if self.on_drop is not None:
+            try:
+                self.on_drop(payload)
+            except Exception as e:
+                print(f"[PIPELINE ERROR] on_drop: {e}")
+
+    def _stage_loop(self, index):
+        stage = self.stages[index]
+        next_stage = self.stages[index + 1] if index + 1 < len(self.stages) else None
+        # ヒストグラムはこのスレッドだけが記録する（ロック不要）
+        stage_times = self.metrics.histogram(f'pipeline.{stage.name}')
+        latencies = self.metrics.histogram('pipeline.latency') if next_stage is None else None
+
+        while self._running:
+            item = stage.queue.get(timeout=0.1)
+            if item is None:
+                continue
+
+            if item.seq <= stage.last_seq:
+                # 順序違反（単一スレッドのステージでは起きない）
+                stage.discarded += 1
+                self._drop(item.payload)
+                continue
+            stage.last_seq = item.seq
+
+            t0 = time.perf_counter()
+            try:
+                result = stage.func(item.payload)
+            except Exception as e:
+                import traceback
+                print(f"[PIPELINE ERROR] {stage.name}: {e}")
+                traceback.print_exc()
+                stage.errors += 1
+                stage.discarded += 1
+                self._drop(item.payload)
+                continue
+            t1 = time.perf_counter()
+            stage_times.record((t1 - t0) * 1000)
+            stage.processed += 1
+
+            if next_stage is None:
+                latencies.record((t1 - item.submit_time) * 1000)
+                self._completed += 1
+            elif result is None:
+                stage.discarded += 1
+            else:
+                item.payload = result
+                self._put(next_stage, item)
+
+    def stats(self):
+        """
+        ステージごとのカウンタ（開始からの累計。処理時間はmetricsのヒストグラム）
+
+        Returns:
+            dict: {'stages': {name: {processed, dropped, discarded, errors, queued}}, 'completed'}
+        """
+        stages = {}
+        for stage in self.stages:
+            stages[stage.name] = {
+                'processed': stage.processed,
+                'dropped': stage.dropped,
+                'discarded': stage.discarded,
+                'errors': stage.errors,
+                'queued': len(stage.queue),
+            }
+        return {'stages': stages, 'completed': self._completed}
+
+    def print_stats(self):
+        """ステージごとのカウンタを表示"""
+        stats = self.stats()
+        for name, s in stats['stages'].items():
+            print(f"  pipeline {name:12s}: processed={s['processed']}, dropped={s['dropped']}, "
+                  f"discarded={s['discarded']}, queued={s['queued']}, errors={s['errors']}")
+        return stats
+
+    def stop(self):
+        """ステージスレッドを止め、キューに残ったフレームを解放"""
+        if not self._running:
+            return
+        self._running = False
+        for stage in self.stages:
+            for item in stage.queue.close():
+                self._drop(item.payload)
+        for stage in self.stages:
+            if stage.thread is not None:
+                stage.thread.join(timeout=1)
+                stage.thread = None
+        print("[PIPELINE] Stopped")
@@ -0,0 +1,202 @@
+"""
+CPUノード向けのINT8量子化（ONNX Runtime）
+
+PyTorchの動的量子化はLinear/LSTMしか対象にしないため、畳み込み主体のRVMには
+効かない。エクスポート済みのONNXモデルをonnxruntime.quantizationで量子化する:
+    'int8_dynamic' 重みのみ事前にINT8化、活性化はフレームごとにスケールを計算（ConvInteger）
+    'int8_static'  入力キャプチャでキャリブレーションし、活性化のスケールも固定（QDQ形式）
+
+エンコーダ（MobileNetV3）・LR-ASPP・デコーダを量子化し、エッジを決める
+Deep Guided Filterのリファイナはfloat32のまま残す。
+"""
+import importlib.util
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+PRECISIONS = ('fp32', 'int8_dynamic', 'int8_static')
+REQUIREMENTS_FILE = 'requirements-cpu.txt'  # onnxruntime・onnx（INT8・onnxruntimeバックエンド用）
+
+
+def missing_dependencies():
+    """INT8化に必要で、インストールされていないパッケージ名"""
+    return [name for name in ('onnxruntime', 'onnx') if importlib.util.find_spec(name) is None]
+
+
+def excluded_nodes(model_path):
+    """量子化しないノード名（リファイナ）"""
+    import onnx
+    graph = onnx.load(model_path).graph
+    return [node.name for node in graph.node if 'refiner' in node.name]
+
+
+def quantize_model(precision, fp32_path, int8_path, calibration_feeds=None):
+    """
+    FP32のONNXモデルをINT8化してint8_pathに保存
+
+    Args:
+        precision: 'int8_dynamic' or 'int8_static'
+        calibration_feeds: 'int8_static'のキャリブレーション入力（session.runに渡すdictのリスト）
+    """
+    from onnxruntime.quantization import (
+        CalibrationDataReader, QuantFormat, QuantType, quantize_dynamic, quantize_static,
+    )
+
+    exclude = excluded_nodes(fp32_path)
+    tmp_path = int8_path + '.tmp'
+    if precision == 'int8_dynamic':
+        # CPU実行プロバイダのConvIntegerはuint8の重みのみ対応
+        quantize_dynamic(fp32_path, tmp_path, weight_type=QuantType.QUInt8, nodes_to_exclude=exclude)
+    elif precision == 'int8_static':
+        class FeedReader(CalibrationDataReader):
+            def __init__(self, feeds):
+                self.feeds = iter(feeds)
+
+            def get_next(self):
+                return next(self.feeds, None)
+
+        quantize_static(
+            fp32_path, tmp_path, FeedReader(calibration_feeds),
+            quant_format=QuantFormat.QDQ, activation_type=QuantType.QUInt8, weight_type=QuantType.QInt8,
+            per_channel=True, nodes_to_exclude=exclude,
+        )
+    else:
+        raise ValueError(f"Unknown precision: {precision!r} (choose from {', '.join(PRECISIONS[1:])})")
+    os.replace(tmp_path, int8_path)
+
+
+def latency_summary(prefix, times_ms):
+    """1フレームの処理時間の分布（<prefix>_ms = 平均、p50・p95・最大）"""
+    times_ms = np.asarray(times_ms)
+    return {
+        f'{prefix}_ms': float(times_ms.mean()),
+        f'{prefix}_p50_ms': float(np.percentile(times_ms, 50)),
+        f'{prefix}_p95_ms': float(np.percentile(times_ms, 95)),
+        f'{prefix}_max_ms': float(times_ms.max()),
+    }
+
+
+def compare_sessions(int8_session, records):
+    """
+    記録したFP32の結果とINT8を比較（1フレームの推論時間の分布とアルファのMAE）
+
+    FP32の推論時間とアルファは記録時（実際の推論）のものを使い、FP32は再実行しない。
+    再帰状態はFP32の値を入力に使うので、MAEは1フレームごとの誤差（誤差の蓄積は含まない）
+
+    Args:
+        records: (入力のdict, FP32のアルファ, FP32の推論時間ms) のリスト
+    """
+    fp32_ms, int8_ms, errors = [], [], []
+    for feeds, pha_fp32, elapsed_ms in records:
+        t0 = time.perf_counter()
+        pha_int8 = int8_session.run(['pha'], feeds)[0]
+        int8_ms.append((time.perf_counter() - t0) * 1000)
+        fp32_ms.append(elapsed_ms)
+        errors.append(float(np.abs(pha_int8 - pha_fp32).mean()))
+
+    return {
+        'frames': len(records),
+        **latency_summary('fp32', fp32_ms),
+        **latency_summary('int8', int8_ms),
+        'alpha_mae': float(np.mean(errors)),
+        'alpha_mae_max': float(np.max(errors)),
+    }
+
+
+def format_report(report):
+    speedup = report['fp32_ms'] / report['int8_ms'] if report['int8_ms'] > 0 else 0
+    text = f"{report['precision']}: {report['int8_ms']:.2f}ms/frame vs fp32 {report['fp32_ms']:.2f}ms (x{speedup:.2f})"
+    if 'int8_p50_ms' in report:  # 以前のキャッシュの比較結果には分布がない
+        text += (f" [p50/p95/max int8 {report['int8_p50_ms']:.2f}/{report['int8_p95_ms']:.2f}/"
+                 f"{report['int8_max_ms']:.2f}ms, fp32 {report['fp32_p50_ms']:.2f}/{report['fp32_p95_ms']:.2f}/"
+                 f"{report['fp32_max_ms']:.2f}ms]")
+    return (f"{text}, alpha MAE {report['alpha_mae'] * 255:.2f}/255 "
+            f"(max {report['alpha_mae_max'] * 255:.2f}) over {report['frames']} frames")
+
+
+class Int8Calibrator:
+    """
+    INT8モデルができるまでFP32で推論しながら入力を記録し、揃ったらバックグラウンドで
+    量子化・比較して、以降の推論をINT8に切り替える（ONNX Runtimeのセッションと同じrun()を持つ）
+
+    'int8_static'は偶数番目のフレームでキャリブレーションし、奇数番目で品質を比較する。
+    FP32のアルファは比較に使うフレームの分だけ記録する
+    """
+
+    def __init__(self, precision, fp32_session, fp32_path, int8_path, open_session, frames=30, on_report=None):
+        """
+        Args:
+            open_session: パスからInferenceSessionを作る関数
+            frames: 記録するフレーム数
+            on_report: 比較結果（dict）を受け取る関数（量子化スレッドから呼ばれる）
+        """
+        self.precision = precision
+        self.fp32_session = fp32_session
+        self.fp32_path = fp32_path
+        self.int8_path = int8_path
+        self.open_session = open_session
+        self.frames = max(2, frames)
+        self.on_report = on_report
+        self.active = fp32_session
+        # フィル+キー用のモデルは前景 (fgr) が先に出力される
+        self.pha_index = [output.name for output in fp32_session.get_outputs()].index('pha')
+        self.records = []  # (入力のdict, FP32のアルファ（比較しないフレームはNone）, FP32の推論時間ms)
+        self.thread = None
+
+    def evaluated(self, index):
+        """index番目に記録するフレームを品質比較に使うか"""
+        return self.precision != 'int8_static' or index % 2 == 1
+
+    def run(self, output_names, feeds):
+        t0 = time.perf_counter()
+        outputs = self.active.run(output_names, feeds)
+        elapsed_ms = (time.perf_counter() - t0) * 1000
+        if self.records is not None:
+            # 入力バッファはエンジンが再利用するのでコピーして記録
+            pha = outputs[self.pha_index] if self.evaluated(len(self.records)) else None
+            self.records.append(({name: value.copy() for name, value in feeds.items()}, pha, elapsed_ms))
+            if len(self.records) >= self.frames:
+                records, self.records = self.records, None
+                print(f"[INFO] {self.precision}: {len(records)} frames captured, quantizing in background...")
+                self.thread = threading.Thread(target=self.quantize, args=(records,), daemon=True)
+                self.thread.start()
+        return outputs
+
+    def quantize(self, records):
+        try:
+            t0 = time.time()
+            if self.precision == 'int8_static':
+                calibration, evaluation = records[0::2], records[1::2]
+            else:
+                calibration, evaluation = None, records
+            quantize_model(self.precision, self.fp32_path, self.int8_path,
+                           [feeds for feeds, _, _ in calibration] if calibration else None)
+            int8_session = self.open_session(self.int8_path)
+
+            report = compare_sessions(int8_session, evaluation)
+            report['precision'] = self.precision
+            report['quantize_s'] = time.time() - t0
+            with open(self.int8_path + '.json', 'w') as f:
+                json.dump(report, f, indent=2)
+
+            self.active = int8_session
+            print(f"[INFO] Switched to {format_report(report)}")
+            if self.on_report is not None:
+                self.on_report(report)
+        except Exception as e:
+            # 量子化に失敗してもFP32のまま処理を続ける
+            import traceback
+            print(f"[ERROR] INT8 quantization failed, staying on fp32: {e}")
+            print(traceback.format_exc())
+
+
+def load_report(int8_path):
+    """キャッシュ済みINT8モデルの比較結果（なければNone）"""
+    try:
+        with open(int8_path + '.json', 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
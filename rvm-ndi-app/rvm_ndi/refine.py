@@ -0,0 +1,77 @@
+"""
+エッジ精緻化（テンソル演算、モデルと同じデバイスで実行）
+
+収縮・膨張はmax_pool2d、ぼかしは分離型のガウシアン畳み込み。アップサンプル前の
+モデル解像度のアルファ (N, 1, h, w) に適用し、CPUへの転送とcv2処理をなくす。
+カーネルサイズは出力解像度の画素数で指定し、モデル解像度に換算する。換算後が
+3未満になる場合（downsample_ratioが小さい時の通常の設定）も、精緻化が効くように
+モデル解像度で3を下限にする。構造要素はcv2のMORPH_ELLIPSEではなく正方形。
+"""
+import torch
+import torch.nn.functional as F
+
+_gaussian_kernels = {}  # (ksize, device, dtype) -> (1, 1, 1, ksize)
+
+
+def model_kernel_size(kernel_size, scale):
+    """出力解像度のカーネルサイズをモデル解像度の奇数サイズ（3以上）に換算"""
+    return max(3, 2 * int(round((kernel_size * scale - 1) / 2)) + 1)
+
+
+def dilate(x, ksize):
+    """膨張 (N, C, H, W)。画像外は無視する（cv2の既定と同じ）"""
+    return F.max_pool2d(x, ksize, stride=1, padding=ksize // 2)
+
+
+def erode(x, ksize):
+    """収縮 (N, C, H, W)"""
+    return -F.max_pool2d(-x, ksize, stride=1, padding=ksize // 2)
+
+
+def gaussian_kernel(ksize, device, dtype):
+    """1次元ガウシアン（sigmaはcv2.GaussianBlurでsigma=0の場合と同じ）"""
+    key = (ksize, device, dtype)
+    kernel = _gaussian_kernels.get(key)
+    if kernel is None:
+        sigma = 0.3 * ((ksize - 1) * 0.5 - 1) + 0.8
+        x = torch.arange(ksize, dtype=torch.float32) - (ksize - 1) / 2
+        weights = torch.exp(-x * x / (2 * sigma * sigma))
+        kernel = (weights / weights.sum()).view(1, 1, 1, ksize).to(device=device, dtype=dtype)
+        _gaussian_kernels[key] = kernel
+    return kernel
+
+
+def gaussian_blur(x, ksize):
+    """分離型ガウシアンぼかし (N, 1, H, W)。端はcv2の既定 (BORDER_REFLECT_101) と同じく反射"""
+    kernel = gaussian_kernel(ksize, x.device, x.dtype)
+    pad = ksize // 2
+    x = F.conv2d(F.pad(x, (pad, pad, 0, 0), mode='reflect'), kernel)
+    return F.conv2d(F.pad(x, (0, 0, pad, pad), mode='reflect'), kernel.transpose(2, 3))
+
+
+def refine_edges(pha, kernel_size, scale, binary_threshold=None):
+    """
+    アルファのエッジ精緻化
+
+    Args:
+        pha: モデル解像度のアルファ (N, 1, h, w)
+        kernel_size: 出力解像度でのカーネルサイズ（edge_kernel_size）
+        scale: モデル解像度 / 出力解像度
+        binary_threshold: 二値化モードの閾値（Noneならソフトアルファ: ぼかしのみ）
+
+    Returns:
+        精緻化したアルファ (N, 1, h, w)。二値化モードでは0.5で再二値化する前の値
+    """
+    ksize = model_kernel_size(kernel_size, scale)
+    # reflectパディングは画像より小さい必要がある（3x3未満の画像では何もしない）
+    ksize = min(ksize, 2 * ((min(pha.shape[-2:]) - 1) // 2) + 1)
+
+    if binary_threshold is not None:
+        pha = (pha > binary_threshold).to(pha.dtype)
+        if ksize >= 3:
+            pha = dilate(erode(pha, ksize), ksize)  # オープニング（ノイズ除去）
+            pha = erode(dilate(pha, ksize), ksize)  # クロージング（穴埋め）
+    if ksize >= 3:
+        pha = gaussian_blur(pha, ksize)
+    return pha
+
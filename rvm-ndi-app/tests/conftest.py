@@ -0,0 +1,26 @@
+"""
+rvm-ndi-app のテスト共通設定
+
+rvm_ndi をインポートできるようにする。RobustVideoMatting（modelパッケージ）は
+リポジトリに含まれないので、無い時はMattingNetworkを作れないスタブに置き換える
+（テストはモデルの代わりの推論バックエンドを使う）。
+"""
+import importlib.util
+import os
+import sys
+import types
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+sys.path.insert(0, os.path.join(APP_DIR, 'RobustVideoMatting'))
+
+
+class _MissingMattingNetwork:
+    def __init__(self, *args, **kwargs):
+        raise RuntimeError("RobustVideoMatting is not available (tests use a stand-in backend)")
+
+
+if importlib.util.find_spec('model') is None:
+    stub = types.ModuleType('model')
+    stub.MattingNetwork = _MissingMattingNetwork
+    sys.modules['model'] = stub
@@ -0,0 +1,37 @@
+"""Exported inference backends without a cache directory (create_backend's default)"""
+import os
+
+import pytest
+
+torch = pytest.importorskip('torch')
+pytest.importorskip('cv2')
+
+from rvm_ndi.backends import create_backend
+
+
+class TinyRVM(torch.nn.Module):
+    """RVMと同じ入出力 (src, r1..r4, downsample_ratio) -> (fgr, pha, r1..r4) の小さなモデル"""
+
+    def __init__(self):
+        super().__init__()
+        self.conv = torch.nn.Conv2d(3, 1, 3, padding=1)
+
+    def forward(self, src, r1, r2, r3, r4, downsample_ratio):
+        pha = torch.sigmoid(self.conv(src))
+        state = pha if r1 is None else pha + r1
+        return src, pha, state, state, state, state
+
+
+def test_torchscript_without_cache_dir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    model_path = tmp_path / 'model.pth'
+    model_path.write_bytes(b'weights')
+
+    backend = create_backend('torchscript', TinyRVM().eval(), str(model_path), 'cpu')
+    src = torch.rand((1, 3, 16, 16))
+    with torch.no_grad():
+        fgr, pha, rec = backend.infer(src, [None] * 4, 1.0)
+        _, pha2, _ = backend.infer(src, rec, 1.0)
+    assert fgr is None
+    assert pha.shape == pha2.shape == (1, 1, 16, 16)
+    assert os.listdir(tmp_path) == ['model.pth']  # 何もキャッシュしない
@@ -0,0 +1,150 @@
+"""RVMBatchEngine: per-stream recurrent state and output routing with synthetic NDI sources"""
+import pytest
+
+torch = pytest.importorskip('torch')
+pytest.importorskip('cv2')
+
+from rvm_ndi import batch as batch_module  # modelパッケージが無ければconftestのスタブ
+from ndi_wrapper import backend as backend_module, NDISender
+from ndi_wrapper.finder import make_source
+from ndi_wrapper.synthetic import SyntheticNDIBackend
+
+WIDTH, HEIGHT = 64, 32
+SOURCES = ("SYNTHETIC (Camera A)", "SYNTHETIC (Camera B)")
+REC_CHANNELS = (16, 20, 40, 64)  # rvm_mobilenetv3 の r1..r4
+
+
+class FakeMattingBackend:
+    """
+    RVMの代わり: 受け取った再帰状態を記録し、ストリームの位置 i を埋めた状態と
+    アルファ（位置0 = 背景、位置1 = 前景）を返す
+    """
+
+    name = 'fake'
+    precision = 'fp32'
+
+    def __init__(self):
+        self.received = []
+
+    def infer(self, src, rec, downsample_ratio, with_fgr=False):
+        self.received.append(rec)
+        n = src.shape[0]
+        h, w = src.shape[-2:]
+        index = torch.arange(n, dtype=src.dtype).view(n, 1, 1, 1)
+        new_rec = [index.expand(n, c, 2, 2).clone() + 1 for c in REC_CHANNELS]
+        pha = index.expand(n, 1, h, w).clone()
+        return None, pha, new_rec
+
+
+@pytest.fixture
+def ndi(monkeypatch):
+    ndi = SyntheticNDIBackend(width=WIDTH, height=HEIGHT, frame_rate=(30, 1), source_names=SOURCES,
+                              keep_sent_frames=True)
+    monkeypatch.setattr(backend_module, '_backend', ndi)
+    return ndi
+
+
+@pytest.fixture
+def engine(ndi, tmp_path):
+    engine = batch_module.RVMBatchEngine(settings_file=str(tmp_path / 'settings.json'),
+                                         sources_cache_file=str(tmp_path / 'sources.json'))
+    engine.backend = FakeMattingBackend()
+    engine.use_fp16 = False
+    engine.downsample_ratio = engine.prev_downsample_ratio = 1.0
+    engine.output_format = 'bgra'  # 送信データの先頭バイト = キー
+
+    for i, name in enumerate(SOURCES):
+        stream = batch_module.RVMStream(make_source(name, f"synthetic://{i}"), f"Alpha {i}")
+        stream.sub = engine.receiver_hub.subscribe(stream.source, color_format=engine.recv_color_format())
+        stream.sender = NDISender(stream.output_name, async_send=False, clock_video=False)
+        stream.sender.initialize()
+        engine.streams.append(stream)
+    try:
+        yield engine
+    finally:
+        engine.close_streams()
+        engine.receiver_hub.close()
+
+
+def process_batch(engine):
+    """両方のストリームから1フレームずつ集めて推論・送信"""
+    engine.is_processing = True
+    try:
+        frames = []
+        for _ in range(50):
+            frames = engine.gather_frames(timeout_ms=200)
+            if len(frames) == len(engine.streams):
+                break
+            for _, frame_buf in frames:
+                frame_buf.release()
+    finally:
+        engine.is_processing = False
+    assert len(frames) == len(engine.streams)
+    engine.send_batch(engine.refine_batch(engine.infer_batch(frames)))
+
+
+def test_states_are_split_and_concatenated_per_stream(engine):
+    stream_a, stream_b = engine.streams
+
+    process_batch(engine)
+    assert engine.backend.received[-1] == [None] * 4
+    for i, stream in enumerate(engine.streams):
+        for k, c in enumerate(REC_CHANNELS):
+            assert stream.rec[k].shape == (1, c, 2, 2)
+            assert torch.all(stream.rec[k] == i + 1)
+
+    # Bだけリセット: Aの状態はそのまま、Bはゼロ（RVMのNoneと同じ）で連結される
+    stream_b.reset_state()
+    process_batch(engine)
+    rec = engine.backend.received[-1]
+    for k, c in enumerate(REC_CHANNELS):
+        assert rec[k].shape == (2, c, 2, 2)
+        assert torch.all(rec[k][0] == 1)
+        assert torch.all(rec[k][1] == 0)
+    assert stream_a.rec[0].shape == stream_b.rec[0].shape == (1, REC_CHANNELS[0], 2, 2)
+
+
+def test_each_alpha_reaches_its_own_sender(engine, ndi):
+    process_batch(engine)
+    process_batch(engine)
+
+    for i, stream in enumerate(engine.streams):
+        sent = ndi.sent_frames(stream.output_name)
+        assert len(sent) == stream.frames_sent == 2
+        for record in sent:
+            assert (record.xres, record.yres) == (WIDTH, HEIGHT)
+            key = record.data.reshape(HEIGHT, WIDTH, 4)[:, :, 0]
+            assert (key == 255 * i).all()
+
+
+def test_resolution_change_resets_only_that_stream(engine):
+    stream_a, stream_b = engine.streams
+    process_batch(engine)
+
+    # Bだけ解像度が変わる: 別グループになり、前の形状の再帰状態は使わない
+    frame_a = engine.frame_pool.acquire((HEIGHT, WIDTH, 4))
+    frame_b = engine.frame_pool.acquire((HEIGHT * 2, WIDTH * 2, 4))
+    frame_a.array[:] = 0
+    frame_b.array[:] = 0
+    results = engine.infer_batch([(stream_a, frame_a), (stream_b, frame_b)])
+    assert [stream for stream, _, _ in results] == [stream_a, stream_b]
+    assert results[1][2].shape == (HEIGHT * 2, WIDTH * 2)
+
+    rec_a, rec_b = engine.backend.received[-2:]
+    assert rec_a[0].shape == (1, REC_CHANNELS[0], 2, 2)
+    assert rec_b == [None] * 4
+    assert stream_b.input_shape == (HEIGHT * 2, WIDTH * 2, 4)
+
+
+def test_reset_request_is_applied_by_the_inference_stage(engine):
+    stream_a, stream_b = engine.streams
+    process_batch(engine)
+
+    # 出力のアイドル明け（受信スレッド）は要求だけ出し、状態は推論ステージが次の推論の前に捨てる
+    stream_b.reset_requested = True
+    assert stream_b.rec[0] is not None
+    process_batch(engine)
+    rec = engine.backend.received[-1]
+    assert torch.all(rec[0][0] == 1)
+    assert torch.all(rec[0][1] == 0)
+    assert not stream_b.reset_requested
@@ -0,0 +1,43 @@
+"""Edge refinement at model resolution: the app's normal kernel sizes must have an effect"""
+import pytest
+
+torch = pytest.importorskip('torch')
+
+from rvm_ndi.refine import model_kernel_size, refine_edges, gaussian_blur
+
+
+def test_kernel_is_at_least_three_model_pixels():
+    for kernel_size in range(1, 10, 2):
+        for scale in (0.2, 0.25, 0.5):
+            assert model_kernel_size(kernel_size, scale) >= 3
+    assert model_kernel_size(9, 0.5) == 5
+
+
+def test_binary_refinement_removes_speck_and_fills_hole():
+    pha = torch.zeros((1, 1, 32, 32))
+    pha[..., 8:24, 8:24] = 1.0
+    pha[..., 16, 16] = 0.0  # 前景の中の1画素の穴
+    pha[..., 2, 28] = 1.0  # 背景の1画素のノイズ
+
+    refined = refine_edges(pha, kernel_size=3, scale=0.25, binary_threshold=0.5) > 0.5
+    assert not refined[..., 2, 28]
+    assert refined[..., 16, 16]
+    assert refined[..., 12, 12] and not refined[..., 0, 0]
+
+
+def test_soft_contrast_is_applied_before_blur(tmp_path):
+    pytest.importorskip('cv2')
+    from rvm_ndi.engine import RVMEngine
+
+    engine = RVMEngine(settings_file=str(tmp_path / 'settings.json'),
+                       sources_cache_file=str(tmp_path / 'sources.json'))
+    engine.use_soft_alpha = True
+    engine.edge_refinement = True
+    engine.edge_kernel_size = 3
+    engine.alpha_contrast = 3.0
+
+    pha = torch.zeros((1, 1, 16, 16))
+    pha[..., :, 8:] = 0.6
+    refined, _ = engine.refine_and_upsample(pha, 16, 16)
+    expected = gaussian_blur(torch.clamp((pha - 0.5) * 3.0 + 0.5, 0.0, 1.0), 3)
+    assert torch.allclose(refined, expected)
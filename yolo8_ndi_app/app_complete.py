@@ -14,34 +14,43 @@ from PIL import Image
 import customtkinter as ctk
 from ultralytics import YOLO
 
-from ndi_wrapper import NDIFinder, NDIReceiver, NDISender
+# 共有ndi_wrapperパッケージ（リポジトリ直下）
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ndi_wrapper import NDIFinder, NDISourceCache, NDIReceiverHub, NDISender, NDIOutputActivity, NDIFramePool, NDIlib_recv_color_format_e, get_backend, configure, LatencyController, MetricsRegistry, MetricsExporter
 
 # GPU設定
 DEVICE = 'cuda' if torch.cuda.is_available() else 'cpu'
 SETTINGS_FILE = 'yolo8_settings.json'
+SOURCES_CACHE_FILE = 'yolo8_ndi_sources.json'  # 前回のNDIソース（名前とURL）
 
+# 自動解像度で使う推論サイズの段階（32の倍数、設定のimgszが上限）
+IMGSZ_LEVELS = (320, 384, 448, 512, 576, 640, 768, 896, 1024, 1280)
 
-class YOLO8NDIApp(ctk.CTk):
-    def __init__(self):
-        super().__init__()
 
-        print("=" * 70)
-        print("YOLOv8 Segmentation NDI Application - Starting")
-        print("=" * 70)
+def frame_to_rgb(frame, dst=None):
+    """受信フレーム（BGRA or UYVY）をRGB uint8に変換"""
+    if frame.shape[2] == 2:
+        return cv2.cvtColor(frame, cv2.COLOR_YUV2RGB_UYVY, dst=dst)
+    return cv2.cvtColor(frame[:, :, :3], cv2.COLOR_BGR2RGB, dst=dst)
 
-        self.title("YOLOv8 Segmentation NDI Application")
-        self.geometry("1920x1080")
 
-        # NDI関連
-        self.finder = None
-        self.receiver = None
-        self.sender = None
-        self.preview_receiver = None  # プレビュー専用レシーバー
-        self.ndi_sources = []
-        self.selected_source = None
+class YOLO8Processor:
+    """
+    YOLOv8のフレーム処理（GUIなし）
+
+    モデル・YOLOパラメータ・process_frameを持つ。YOLO8NDIAppとオフライン
+    ベンチマーク (benchmark.py) で共有する
+    """
+
+    def init_processor(self):
+        """モデル・パラメータ・フレームプール・計測の初期値"""
+        self.frame_pool = NDIFramePool()  # 受信フレームと出力フレームで共有するバッファプール
 
         # AI Model
         self.model = None
+        self.device = DEVICE  # 推論デバイス（変更はモデル再読み込みで反映）
+        self.use_fp16 = False  # FP16 (半精度) で推論（CUDA時のみ）
 
         # YOLO Parameters
         self.confidence_threshold = 0.5
@@ -53,11 +62,244 @@ class YOLO8NDIApp(ctk.CTk):
         self.edge_refinement = False
         self.edge_kernel_size = 3
         self.person_only = True  # 人物のみを検出
+        self.imgsz = 640  # 推論サイズ（model.predictのimgsz）
+        self.auto_resolution = False  # 推論時間が予算を超えたらimgszを下げる（imgszが上限）
+        self.latency_budget_ms = 0.0  # 1フレームの推論時間の予算 (0 = 受信ソースのフレーム間隔)
+        self.latency_controller = None
+        self.source_frame_rate = 0.0
+
+        # 処理時間の計測（ステージごとのヒストグラム）
+        self.metrics = MetricsRegistry()
+
+    def load_yolo_model(self):
+        """YOLOv8-segモデルを読み込んでself.deviceに移す（失敗時は例外）"""
+        # Load YOLOv8-seg model (automatically downloads if not present)
+        print("[INFO] Loading YOLOv8-seg model...")
+        model = YOLO('yolov8n-seg.pt')  # nano version for speed
+
+        # Set device
+        if self.device == 'cuda':
+            model.to('cuda')
+            print("[INFO] Model moved to CUDA")
+
+        self.model = model
+
+    def reset_state(self):
+        """フレーム間の状態（時間的平滑化の履歴）をリセット"""
+        if hasattr(self, '_prev_alpha'):
+            delattr(self, '_prev_alpha')
+
+    def current_imgsz(self):
+        """
+        このフレームで使う推論サイズ
+
+        YOLOはフレーム間で状態を持たないので、自動解像度の提案はフレームの
+        区切りならいつでも反映できる
+        """
+        if not self.auto_resolution:
+            self.latency_controller = None
+            return self.imgsz
+
+        levels = [level for level in IMGSZ_LEVELS if level < self.imgsz] + [self.imgsz]
+        budget = self.latency_budget()
+        controller = self.latency_controller
+        if controller is None:
+            controller = self.latency_controller = LatencyController(levels, budget_ms=budget)
+            print(f"[INFO] Auto resolution: budget {budget:.2f}ms, imgsz {levels[0]}-{levels[-1]}")
+        else:
+            if controller.levels[-1] != self.imgsz:
+                controller.set_levels(levels, self.imgsz)
+            if controller.set_budget(budget):
+                print(f"[INFO] Auto resolution: budget {budget:.2f}ms")
+
+        if controller.pending is not None:
+            previous = controller.value
+            controller.apply()
+            print(f"[INFO] Auto resolution: imgsz {previous} -> {controller.value}")
+        return controller.value
+
+    def latency_budget(self):
+        """自動解像度の予算（latency_budget_ms、0なら現在のソースのフレーム間隔。不明なら0）"""
+        if self.latency_budget_ms > 0:
+            return self.latency_budget_ms
+        if self.source_frame_rate > 0:
+            return 1000.0 / self.source_frame_rate
+        return 0.0
+
+    def process_frame(self, frame):
+        """
+        フレーム処理 - YOLOv8でセグメンテーションマスク生成
+
+        Returns:
+            BGRA出力のPooledFrame（呼び出し側でrelease()する）、失敗時はNone
+        """
+        try:
+            # Check if model is loaded
+            if self.model is None:
+                print("[ERROR] Model is not loaded!")
+                return None
+
+            # BGR (or UYVY) to RGB - 再利用バッファに直接変換
+            t_start = time.time()
+            h, w = frame.shape[:2]
+            if getattr(self, '_rgb_input', None) is None or self._rgb_input.shape[:2] != (h, w):
+                self._rgb_input = np.empty((h, w, 3), dtype=np.uint8)
+            src = frame_to_rgb(frame, dst=self._rgb_input)
+
+            # Run YOLOv8 segmentation
+            imgsz = self.current_imgsz()
+            t0 = time.time()
+            self.metrics.record('yolo_convert', (t0 - t_start) * 1000)
+            results = self.model.predict(
+                src,
+                imgsz=imgsz,
+                conf=self.confidence_threshold,
+                iou=self.iou_threshold,
+                classes=[0] if self.person_only else None,  # 0 = person in COCO dataset
+                verbose=False,
+                device=self.device,
+                half=self.use_fp16 and self.device == 'cuda'
+            )
+            t1 = time.time()
+            predict_ms = (t1 - t0) * 1000
+            self.metrics.record('yolo_predict', predict_ms)
+            if self.latency_controller is not None:
+                self.latency_controller.record(predict_ms)
+
+            # Create empty mask
+            mask = np.zeros((h, w), dtype=np.float32)
+
+            # Process results
+            if len(results) > 0 and results[0].masks is not None:
+                masks_data = results[0].masks.data  # tensor of masks
+
+                # Combine all detected object masks
+                for i in range(len(masks_data)):
+                    # Get mask for this detection
+                    single_mask = masks_data[i].float().cpu().numpy()  # FP16推論でもcv2.resizeはfloat32
+
+                    # Resize mask to original size
+                    single_mask_resized = cv2.resize(single_mask, (w, h), interpolation=cv2.INTER_LINEAR)
+
+                    # Add to combined mask (max operation to combine overlapping masks)
+                    mask = np.maximum(mask, single_mask_resized)
+
+            t2 = time.time()
+            self.metrics.record('yolo_masks', (t2 - t1) * 1000)
+
+            # Debug: Print mask value range (first frame only)
+            if not hasattr(self, '_debug_printed'):
+                print(f"[DEBUG] Mask shape: {mask.shape}")
+                print(f"[DEBUG] Mask range: min={mask.min():.3f}, max={mask.max():.3f}, mean={mask.mean():.3f}")
+                if h > 0 and w > 0:
+                    center_val = mask[h//2, w//2]
+                    corner_val = mask[0, 0]
+                    print(f"[DEBUG] Center mask: {center_val:.3f}, Corner mask: {corner_val:.3f}")
+                print(f"[DEBUG] Alpha mode: {'Soft (Gradient)' if self.use_soft_alpha else 'Binary (Hard)'}")
+                self._debug_printed = True
+
+            # Temporal Smoothing（時間的平滑化）
+            if self.smoothing_enabled:
+                if not hasattr(self, '_prev_alpha'):
+                    self._prev_alpha = mask
+                else:
+                    # EMA (Exponential Moving Average)
+                    mask = self.smoothing_alpha * mask + (1 - self.smoothing_alpha) * self._prev_alpha
+                    self._prev_alpha = mask
+
+            # アルファ処理：ソフトアルファ or 二値化
+            if self.use_soft_alpha:
+                # ソフトアルファモード（グラデーション）
+                # アルファコントラスト調整
+                if self.alpha_contrast != 1.0:
+                    # コントラスト調整: mask = ((mask - 0.5) * contrast) + 0.5
+                    mask = np.clip((mask - 0.5) * self.alpha_contrast + 0.5, 0.0, 1.0)
+
+                # 0-255の範囲に変換（グラデーション保持）
+                alpha_soft = (mask * 255).astype(np.uint8)
+
+                # Edge Refinement（ソフトアルファ時はガウシアンブラーのみ）
+                if self.edge_refinement:
+                    # ガウシアンブラーでエッジを滑らかに
+                    alpha_soft = cv2.GaussianBlur(alpha_soft, (self.edge_kernel_size, self.edge_kernel_size), 0)
+
+                alpha_final = alpha_soft
+            else:
+                # 二値化モード（ハードエッジ）
+                # Binarize mask (threshold at 0.5)
+                # 人物: 255 (白), 背景: 0 (黒)
+                alpha_binary = (mask > 0.5).astype(np.uint8) * 255
+
+                # Edge Refinement（エッジ精緻化）
+                if self.edge_refinement:
+                    # モルフォロジー処理でエッジを滑らかに
+                    kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (self.edge_kernel_size, self.edge_kernel_size))
+                    # Opening: ノイズ除去
+                    alpha_binary = cv2.morphologyEx(alpha_binary, cv2.MORPH_OPEN, kernel)
+                    # Closing: 穴埋め
+                    alpha_binary = cv2.morphologyEx(alpha_binary, cv2.MORPH_CLOSE, kernel)
+                    # ガウシアンブラー + 再二値化でエッジを滑らかに
+                    alpha_binary = cv2.GaussianBlur(alpha_binary, (self.edge_kernel_size, self.edge_kernel_size), 0)
+                    alpha_binary = (alpha_binary > 127).astype(np.uint8) * 255
+
+                alpha_final = alpha_binary
+
+            # 1チャンネルのマスクのまま返す（送信フォーマットへの展開はNDISender.send_mask）
+            seg_buf = self.frame_pool.acquire((h, w))
+            np.copyto(seg_buf.array, alpha_final)
+            self.metrics.record('yolo_alpha', (time.time() - t2) * 1000)
+
+            return seg_buf
+
+        except Exception as e:
+            import traceback
+            print(f"[ERROR] Frame processing error: {e}")
+            print(traceback.format_exc())
+            return None
+
+
+class YOLO8NDIApp(YOLO8Processor, ctk.CTk):  # YOLO8Processorが先: Tkのメソッド名で処理が隠れないように
+    def __init__(self):
+        super().__init__()
+
+        print("=" * 70)
+        print("YOLOv8 Segmentation NDI Application - Starting")
+        print("=" * 70)
+
+        self.title("YOLOv8 Segmentation NDI Application")
+        self.geometry("1920x1080")
+
+        # NDI関連
+        self.finder = None
+        self.process_sub = None  # 処理用サブスクリプション
+        self.sender = None
+        self.preview_sub = None  # プレビュー用サブスクリプション
+        self.ndi_sources = []
+        self.selected_source = None
+        self.init_processor()  # モデル・YOLOパラメータ・フレームプール・処理時間の計測
+        self.receiver_hub = NDIReceiverHub(self.frame_pool)  # ソースごとに1接続をプレビューと処理で共有
+
+        # 受信・出力
+        self.receive_format = 'bgra'  # NDI受信フォーマット ('bgra' or 'uyvy')
+        self.capture_policy = 'latest'  # キャプチャリング方式 ('latest': 古いフレームを破棄, 'fifo': 順番通り, 'framesync': 一定間隔で最新フレームを取得)
+        self.capture_depth = 3  # キャプチャリングのフレーム数
+        self.output_format = 'uyvy'  # NDI出力フォーマット ('uyvy': 2バイト/画素, 'uyva': 3, 'bgra': 4)
+        self.idle_mode = 'connections'  # 出力が使われていない時に推論を間引く条件 ('always', 'connections', 'tally')
+        self.idle_fps = 1.0  # アイドル時の処理フレームレート (0 = 処理しない)
+        self.output_activity = None
+        self.ndi_lib_path = ''  # NDIランタイムのパス（空 = NDI_LIB_PATH / NDI_RUNTIME_DIR_V5 / システムから検索）
 
         # Processing
         self.is_processing = False
         self.processing_thread = None
 
+        # 処理時間の定期レポート
+        self.metrics_exporter = None
+        self.metrics_interval_s = 5.0  # レポート（コンソール・JSONL）の間隔
+        self.metrics_port = 0  # http://127.0.0.1:<port>/metrics でJSONを公開 (0 = 公開しない)
+        self.metrics_file = ''  # レポートを1行1JSONで追記するファイル（空 = 書かない）
+        self._last_recv_perf = None
+
         # Stats
         self.fps_counter = 0
         self.fps_time = time.time()
@@ -74,8 +316,8 @@ class YOLO8NDIApp(ctk.CTk):
         # Build UI
         self.create_ui()
 
-        # Initialize NDI
-        self.initialize_ndi()
+        # Initialize NDI（ウィンドウ表示後にランタイムを読み込む）
+        self.after(100, self.initialize_ndi)
 
     def create_ui(self):
         # メインフレーム
@@ -112,6 +354,19 @@ class YOLO8NDIApp(ctk.CTk):
         )
         self.refresh_btn.pack(side="left", padx=10)
 
+        self.uyvy_check = ctk.CTkCheckBox(
+            source_frame,
+            text="UYVY Receive (Low Bandwidth)",
+            command=self.on_receive_format_toggle
+        )
+        self.uyvy_check.pack(side="left", padx=10)
+        if self.receive_format == 'uyvy':
+            self.uyvy_check.select()
+        self.create_tooltip(
+            self.uyvy_check,
+            "NDIをUYVY (4:2:2) で受信\n受信データ量が半分になり、色変換をモデル入力作成時に1回で行う\nアルファ付きソースはBGRAのまま受信\n変更するとプレビューを再接続します"
+        )
+
         # モデル設定フレーム
         model_frame = ctk.CTkFrame(self.main_frame)
         model_frame.pack(fill="x", padx=20, pady=10)
@@ -147,6 +402,21 @@ class YOLO8NDIApp(ctk.CTk):
         self.output_name_entry.insert(0, "YOLO8 Segmentation Mask")
         self.output_name_entry.pack(side="left", padx=10)
 
+        ctk.CTkLabel(output_frame, text="Format:", font=("Arial", 14)).pack(side="left", padx=10)
+
+        self.output_format_menu = ctk.CTkOptionMenu(
+            output_frame,
+            values=["UYVY", "UYVA", "BGRA"],
+            command=self.on_output_format_change,
+            width=100
+        )
+        self.output_format_menu.set(self.output_format.upper())
+        self.output_format_menu.pack(side="left", padx=10)
+        self.create_tooltip(
+            self.output_format_menu,
+            "NDI出力フォーマット\nUYVY = 輝度にマスク（2バイト/画素、最軽量）\nUYVA = UYVY + アルファプレーン（3バイト/画素）\nBGRA = 従来の白黒BGRA（4バイト/画素）"
+        )
+
         # 処理開始/停止ボタン
         control_frame = ctk.CTkFrame(self.main_frame)
         control_frame.pack(fill="x", padx=20, pady=10)
@@ -263,6 +533,23 @@ class YOLO8NDIApp(ctk.CTk):
             "人物(person)のみを検出\nOFF = 全クラスを検出\nON = 人物のみを検出\n推奨: ON"
         )
 
+        # 3b. Auto Resolution
+        auto_resolution_frame = ctk.CTkFrame(scroll_frame)
+        auto_resolution_frame.pack(fill="x", pady=5)
+
+        self.auto_resolution_check = ctk.CTkCheckBox(
+            auto_resolution_frame,
+            text="Auto Resolution (Latency Budget)",
+            command=self.on_auto_resolution_toggle
+        )
+        if self.auto_resolution:
+            self.auto_resolution_check.select()
+        self.auto_resolution_check.pack(side="left", padx=10)
+        self.create_tooltip(
+            self.auto_resolution_check,
+            "推論時間がフレーム間隔（予算）を超えたら推論サイズ(imgsz)を自動で下げる\n余裕ができたら設定のimgszまで戻す\n推奨: GPUのない・負荷が変動するマシンでON"
+        )
+
         # 4. Soft Alpha (Gradient Alpha)
         soft_alpha_frame = ctk.CTkFrame(scroll_frame)
         soft_alpha_frame.pack(fill="x", pady=5)
@@ -398,6 +685,33 @@ class YOLO8NDIApp(ctk.CTk):
         mode = "Person Only" if self.person_only else "All Classes"
         print(f"[INFO] Detection mode changed to: {mode}")
 
+    def on_auto_resolution_toggle(self):
+        """自動解像度の有効/無効切替"""
+        self.auto_resolution = bool(self.auto_resolution_check.get())
+        print(f"[INFO] Auto resolution: {'ON' if self.auto_resolution else 'OFF'}")
+
+    def on_receive_format_toggle(self):
+        """受信カラーフォーマット切替（BGRA / UYVY）"""
+        self.receive_format = 'uyvy' if self.uyvy_check.get() else 'bgra'
+        print(f"[INFO] Receive format changed to: {self.receive_format.upper()}")
+
+        # プレビューを新しいフォーマットで再接続（処理中のレシーバーは次回開始時に反映）
+        with self.preview_lock:
+            self.stop_preview()
+            if self.selected_source:
+                self.start_preview()
+
+    def on_output_format_change(self, value):
+        """NDI出力フォーマット変更（次のフレームから反映）"""
+        self.output_format = value.lower()
+        print(f"[INFO] Output format changed to: {value}")
+
+    def recv_color_format(self):
+        """NDIReceiverに渡すカラーフォーマット"""
+        if self.receive_format == 'uyvy':
+            return NDIlib_recv_color_format_e.UYVY_BGRA
+        return NDIlib_recv_color_format_e.BGRX_BGRA
+
     def on_soft_alpha_toggle(self):
         """Soft Alpha有効/無効切替"""
         self.use_soft_alpha = bool(self.soft_alpha_check.get())
@@ -469,7 +783,20 @@ class YOLO8NDIApp(ctk.CTk):
                 'smoothing_enabled': self.smoothing_enabled,
                 'smoothing_alpha': self.smoothing_alpha,
                 'edge_refinement': self.edge_refinement,
-                'edge_kernel_size': self.edge_kernel_size
+                'edge_kernel_size': self.edge_kernel_size,
+                'receive_format': self.receive_format,
+                'capture_policy': self.capture_policy,
+                'capture_depth': self.capture_depth,
+                'output_format': self.output_format,
+                'idle_mode': self.idle_mode,
+                'idle_fps': self.idle_fps,
+                'ndi_lib_path': self.ndi_lib_path,
+                'imgsz': self.imgsz,
+                'auto_resolution': self.auto_resolution,
+                'latency_budget_ms': self.latency_budget_ms,
+                'metrics_interval_s': self.metrics_interval_s,
+                'metrics_port': self.metrics_port,
+                'metrics_file': self.metrics_file
             }
 
             with open(SETTINGS_FILE, 'w') as f:
@@ -501,6 +828,19 @@ class YOLO8NDIApp(ctk.CTk):
             self.smoothing_alpha = settings.get('smoothing_alpha', 0.3)
             self.edge_refinement = settings.get('edge_refinement', False)
             self.edge_kernel_size = settings.get('edge_kernel_size', 3)
+            self.receive_format = settings.get('receive_format', 'bgra')
+            self.capture_policy = settings.get('capture_policy', 'latest')
+            self.capture_depth = settings.get('capture_depth', 3)
+            self.output_format = settings.get('output_format', 'uyvy')
+            self.idle_mode = settings.get('idle_mode', 'connections')
+            self.idle_fps = settings.get('idle_fps', 1.0)
+            self.ndi_lib_path = settings.get('ndi_lib_path', '')
+            self.imgsz = settings.get('imgsz', 640)
+            self.auto_resolution = settings.get('auto_resolution', False)
+            self.latency_budget_ms = settings.get('latency_budget_ms', 0.0)
+            self.metrics_interval_s = settings.get('metrics_interval_s', 5.0)
+            self.metrics_port = settings.get('metrics_port', 0)
+            self.metrics_file = settings.get('metrics_file', '')
 
             print(f"[INFO] Settings loaded from {SETTINGS_FILE}")
         except Exception as e:
@@ -535,6 +875,12 @@ class YOLO8NDIApp(ctk.CTk):
             else:
                 self.edge_check.deselect()
 
+        if hasattr(self, 'auto_resolution_check'):
+            if self.auto_resolution:
+                self.auto_resolution_check.select()
+            else:
+                self.auto_resolution_check.deselect()
+
         self.status_label.configure(text="Settings loaded successfully")
         print("[INFO] Settings loaded and UI updated")
 
@@ -583,6 +929,7 @@ class YOLO8NDIApp(ctk.CTk):
 
             if selected_source:
                 self.selected_source = selected_source
+                self.finder.cache.remember_selection(selected_source)
                 self.start_preview()
             else:
                 print(f"[WARNING] Source '{source_name}' not found in sources list")
@@ -596,22 +943,13 @@ class YOLO8NDIApp(ctk.CTk):
         try:
             print(f"[INFO] Starting preview for source: {self.selected_source['name']}")
 
-            # プレビュー用レシーバー作成
-            self.preview_receiver = NDIReceiver(self.selected_source)
-            self.preview_receiver.initialize()
-            print("[INFO] Preview receiver initialized")
-
-            # 接続確認（最大3秒待機）
-            print("[INFO] Waiting for connection...")
-            for i in range(30):  # 30 x 100ms = 3秒
-                time.sleep(0.1)
-                num_conn = self.preview_receiver.get_num_connections()
-                if num_conn > 0:
-                    print(f"[INFO] Connected to source (took {(i+1)*100}ms)")
-                    break
-            else:
-                print("[WARNING] No connection established yet, but starting preview anyway")
+            # プレビュー用に購読（処理中なら同じ接続を共有）
+            self.preview_sub = self.receiver_hub.subscribe(
+                self.selected_source, color_format=self.recv_color_format(), depth=1
+            )
+            print("[INFO] Preview subscription created")
 
+            # 接続待ちはしない（最初のフレームはキャプチャスレッドが届け次第表示）
             # プレビュースレッド開始
             self.preview_running = True
             self.preview_thread = threading.Thread(target=self.preview_loop, daemon=True)
@@ -625,7 +963,7 @@ class YOLO8NDIApp(ctk.CTk):
 
     def stop_preview(self):
         """プレビュー停止（lockの中で呼び出される前提）"""
-        if not self.preview_running and not self.preview_receiver:
+        if not self.preview_running and not self.preview_sub:
             return  # 既に停止済み
 
         print("[INFO] Stopping preview...")
@@ -638,18 +976,14 @@ class YOLO8NDIApp(ctk.CTk):
             self.preview_thread = None
             print("[DEBUG] Preview thread stopped")
 
-        # レシーバーをクローズ
-        if self.preview_receiver:
+        # 購読を解除（最後の購読者ならハブが接続を閉じる）
+        if self.preview_sub:
             try:
-                print("[DEBUG] Closing preview receiver...")
-                self.preview_receiver.close()
-                print("[DEBUG] Preview receiver closed")
+                self.preview_sub.close()
             except Exception as e:
-                print(f"[WARNING] Error closing preview receiver: {e}")
-            self.preview_receiver = None
+                print(f"[WARNING] Error closing preview subscription: {e}")
+            self.preview_sub = None
 
-        # NDIリソースが完全に解放されるまで待機
-        time.sleep(0.3)
         print("[INFO] Preview stopped")
 
     def preview_loop(self):
@@ -664,22 +998,25 @@ class YOLO8NDIApp(ctk.CTk):
             start_time = time.time()
 
             try:
-                # レシーバーの状態確認
-                if not self.preview_receiver or not self.preview_receiver._is_initialized:
-                    print("[ERROR] Preview receiver not initialized in loop")
+                # 購読の状態確認
+                if not self.preview_sub or self.preview_sub.closed:
+                    print("[ERROR] Preview subscription closed in loop")
                     break
 
-                # フレーム受信（短いタイムアウト）
-                frame = self.preview_receiver.receive_video(timeout_ms=16)
+                # 最新フレームを取得（古いフレームはハブ側で破棄される）
+                frame_buf = self.preview_sub.read(timeout_ms=100)
 
-                if frame is not None:
-                    if not first_frame_received:
-                        print(f"[INFO] First preview frame received: {frame.shape}")
-                        first_frame_received = True
+                if frame_buf is not None:
+                    try:
+                        if not first_frame_received:
+                            print(f"[INFO] First preview frame received: {frame_buf.array.shape}")
+                            first_frame_received = True
 
-                    frame_count += 1
-                    # 入力プレビューのみ更新
-                    self.update_input_preview(frame)
+                        frame_count += 1
+                        # 入力プレビューのみ更新（縮小コピーを作るので解放後も安全）
+                        self.update_input_preview(frame_buf.array)
+                    finally:
+                        frame_buf.release()
 
                     # 1秒ごとにフレーム数を表示
                     if frame_count % 60 == 0:
@@ -709,7 +1046,7 @@ class YOLO8NDIApp(ctk.CTk):
             preview_h = int(h * preview_w / w)
 
             # RGB変換とリサイズ
-            input_rgb = cv2.cvtColor(input_frame[:, :, :3], cv2.COLOR_BGR2RGB)
+            input_rgb = frame_to_rgb(input_frame)
             input_small = cv2.resize(input_rgb, (preview_w, preview_h), interpolation=cv2.INTER_LINEAR)
             input_img = Image.fromarray(input_small)
             input_photo = ctk.CTkImage(light_image=input_img, dark_image=input_img, size=(preview_w, preview_h))
@@ -727,15 +1064,29 @@ class YOLO8NDIApp(ctk.CTk):
     def initialize_ndi(self):
         """NDI初期化"""
         try:
-            print("[INFO] Initializing NDI...")
-            self.finder = NDIFinder()
+            configure(lib_path=self.ndi_lib_path or None)
+            print(f"[INFO] Initializing NDI (backend: {get_backend().name})...")
+            self.finder = NDIFinder(cache=NDISourceCache(SOURCES_CACHE_FILE))
             self.finder.initialize()
             self.status_label.configure(text="NDI Initialized")
             print("[INFO] NDI initialized successfully")
 
-            # ソースリスト更新
-            print("[INFO] Scheduling source refresh in 1 second...")
-            self.after(1000, self.refresh_sources)
+            # 前回のソースにURLで直接接続（探索の完了を待たない）
+            last_source = self.finder.cache.last_source()
+            if last_source:
+                print(f"[INFO] Connecting to last source: {last_source['name']} ({last_source['url']})")
+                self.ndi_sources = [last_source]
+                self.source_menu.configure(values=[last_source['name']])
+                self.source_menu.set(last_source['name'])
+                with self.preview_lock:
+                    self.selected_source = last_source
+                    self.start_preview()
+
+            # バックグラウンドで探索し、追加・削除をUIスレッドで反映
+            self.finder.start_discovery(
+                on_added=lambda src: self.after(0, self.refresh_sources),
+                on_removed=lambda src: self.after(0, self.refresh_sources)
+            )
         except Exception as e:
             import traceback
             print(f"[ERROR] NDI initialization failed: {e}")
@@ -743,24 +1094,30 @@ class YOLO8NDIApp(ctk.CTk):
             self.status_label.configure(text=f"NDI Error: {e}")
 
     def refresh_sources(self):
-        """NDIソースリスト更新"""
-        print("[INFO] refresh_sources called")
+        """NDIソースリスト更新（探索スレッドのレジストリを参照するので待機なし）"""
         if not self.finder:
             print("[WARNING] Finder not initialized")
             return
 
         try:
-            print("[INFO] Waiting 0.5s for source discovery...")
-            time.sleep(0.5)  # Wait for source discovery
-
-            print("[INFO] Getting NDI sources...")
-            self.ndi_sources = self.finder.get_sources()
-            print(f"[INFO] Found {len(self.ndi_sources)} source(s)")
+            # 選択中のソースは同じdictを使い続ける（ハブの接続を共有するため）
+            selected = self.selected_source
+            self.ndi_sources = [
+                selected if selected and src['name'] == selected['name'] else src
+                for src in self.finder.sources
+            ]
+            # 探索でまだ見つかっていない選択中ソース（キャッシュから接続）も残す
+            if selected and selected not in self.ndi_sources:
+                self.ndi_sources.append(selected)
 
             if self.ndi_sources:
                 source_names = [src['name'] for src in self.ndi_sources]
                 print(f"[INFO] Sources: {source_names}")
                 self.source_menu.configure(values=source_names)
+                self.status_label.configure(text=f"Found {len(self.ndi_sources)} source(s)")
+
+                if selected:
+                    return  # 選択中のソースはそのまま（再接続しない）
 
                 # 映像があるソースを優先的に選択（Test Pattern, vMix Outputなど）
                 preferred_source = None
@@ -774,13 +1131,12 @@ class YOLO8NDIApp(ctk.CTk):
                     preferred_source = self.ndi_sources[0]
 
                 self.source_menu.set(preferred_source['name'])
-                self.status_label.configure(text=f"Found {len(self.ndi_sources)} source(s)")
 
                 # 選択されたソースでプレビュー開始（排他制御）
                 print(f"[INFO] Auto-selecting source: {preferred_source['name']}")
                 with self.preview_lock:
                     self.selected_source = preferred_source
-                    print(f"[INFO] Starting preview for: {self.selected_source['name']}")
+                    self.finder.cache.remember_selection(preferred_source)
                     self.start_preview()
             else:
                 print("[WARNING] No NDI sources found")
@@ -798,16 +1154,9 @@ class YOLO8NDIApp(ctk.CTk):
             self.model_status_label.configure(text="Loading...")
             self.load_model_btn.configure(state="disabled")
 
-            # Load YOLOv8-seg model (automatically downloads if not present)
-            print("[INFO] Loading YOLOv8-seg model...")
-            self.model = YOLO('yolov8n-seg.pt')  # nano version for speed
-
-            # Set device
-            if DEVICE == 'cuda':
-                self.model.to('cuda')
-                print("[INFO] Model moved to CUDA")
+            self.load_yolo_model()
 
-            self.model_status_label.configure(text=f"Loaded (Device: {DEVICE})")
+            self.model_status_label.configure(text=f"Loaded (Device: {self.device})")
             self.status_label.configure(text="Model loaded successfully")
             print("[INFO] YOLOv8-seg model loaded successfully")
         except Exception as e:
@@ -841,19 +1190,23 @@ class YOLO8NDIApp(ctk.CTk):
             return
 
         try:
-            # プレビューを停止（処理専用のレシーバーを使用）
-            with self.preview_lock:
-                self.stop_preview()
-
-            # Create receiver
-            self.receiver = NDIReceiver(selected_source)
-            self.receiver.initialize()
+            # 処理用に購読（プレビューと同じ接続を共有するので、プレビューは止めない）
+            # 'framesync'はフレームシンクロナイザ用に別接続を開き、ソースのフレームレートで最新フレームを取得する
+            self.process_sub = self.receiver_hub.subscribe(
+                selected_source, color_format=self.recv_color_format(),
+                policy=self.capture_policy, depth=self.capture_depth
+            )
 
             # Create sender
             output_name = self.output_name_entry.get() or "YOLO8 Segmentation Mask"
-            self.sender = NDISender(output_name)
+            # 送信ペースは受信ソースに従うので、SDKによるclock_videoの間引きは使わない
+            self.sender = NDISender(output_name, async_send=True, clock_video=False)
             self.sender.initialize()
 
+            # 受信者がいない・タリーが立っていない間は推論を間引く
+            self.output_activity = NDIOutputActivity(self.sender, mode=self.idle_mode, idle_fps=self.idle_fps)
+            self.start_metrics()
+
             # Start processing thread immediately
             self.is_processing = True
             self.processing_thread = threading.Thread(target=self.processing_loop, daemon=True)
@@ -875,24 +1228,33 @@ class YOLO8NDIApp(ctk.CTk):
             self.processing_thread.join(timeout=2)
             self.processing_thread = None
 
-        if self.receiver:
-            self.receiver.close()
-            self.receiver = None
+        # レポートが受信統計を読むので、購読を閉じる前に止める
+        if self.metrics_exporter:
+            self.metrics_exporter.close()
+            self.metrics_exporter = None
+
+        if self.process_sub:
+            print(f"[INFO] Capture stats: {self.process_sub.stats()}")
+            self.process_sub.close()
+            self.process_sub = None
+
+        if self.output_activity:
+            print(f"[INFO] Frames skipped while idle: {self.output_activity.frames_skipped}")
+            self.output_activity = None
 
         if self.sender:
             self.sender.close()
             self.sender = None
 
-        # Reset smoothing history
-        if hasattr(self, '_prev_alpha'):
-            delattr(self, '_prev_alpha')
+        if self.latency_controller:
+            print(f"[INFO] Auto resolution: {self.latency_controller.stats()}")
+            self.latency_controller = None
+        self.source_frame_rate = 0.0
+
+        self.reset_state()
         if hasattr(self, '_debug_printed'):
             delattr(self, '_debug_printed')
 
-        # プレビューを再開
-        if self.selected_source:
-            self.start_preview()
-
         # Update UI
         self.start_btn.configure(state="normal")
         self.stop_btn.configure(state="disabled")
@@ -900,20 +1262,20 @@ class YOLO8NDIApp(ctk.CTk):
         self.fps_label.configure(text="FPS: 0")
 
     def processing_loop(self):
-        """メイン処理ループ（60fps目標）"""
+        """メイン処理ループ（受信ソースのフレームレートに同期）"""
         first_frame_received = False
         connection_check_time = time.time()
         frame_wait_timeout = 10.0
-        frame_time = 1.0 / 60.0  # 60fps目標
 
-        while self.is_processing:
-            start_time = time.time()
+        # パフォーマンス計測用（ヒストグラムに記録し、表示・公開はMetricsExporterのスレッドで行う）
+        metrics = self.metrics
 
+        while self.is_processing:
             try:
-                # Receive video frame
-                frame = self.receiver.receive_video(timeout_ms=16)
+                # Receive video frame (キャプチャスレッドのリングバッファから取得)
+                frame_buf = self.process_sub.read(timeout_ms=100)
 
-                if frame is None:
+                if frame_buf is None:
                     if not first_frame_received:
                         elapsed = time.time() - connection_check_time
                         if elapsed > frame_wait_timeout:
@@ -927,13 +1289,29 @@ class YOLO8NDIApp(ctk.CTk):
                     first_frame_received = True
                     print("[INFO] First frame received, processing started")
                     self.after(0, lambda: self.status_label.configure(text="Processing..."))
+                # 自動解像度の予算（latency_budget_ms = 0の場合）。ソースのフレームレートが変わったら追従する
+                if frame_buf.info is not None and frame_buf.info.frame_rate > 0:
+                    self.source_frame_rate = frame_buf.info.frame_rate
+
+                # 出力が使われていなければ推論を省略（idle_fpsの頻度でのみ処理）
+                was_idle = self.output_activity.idle
+                process_now = self.output_activity.should_process()
+                if self.output_activity.idle != was_idle:
+                    self.on_output_activity_changed()
+                if not process_now:
+                    frame_buf.release()
+                    continue
 
                 # Process with YOLO8
-                seg_mask = self.process_frame(frame)
+                frame = frame_buf.array
+                t0 = time.time()
+                seg_buf = self.process_frame(frame)
+                metrics.record('yolo_process', (time.time() - t0) * 1000)
 
-                if seg_mask is not None:
+                if seg_buf is not None:
                     # Send segmentation mask via NDI
-                    self.sender.send_video(seg_mask)
+                    # フレームレート・タイムコードは受信フレームのものを引き継ぐ
+                    self.sender.send_mask(seg_buf, self.output_format, info=frame_buf.info)
 
                     # Update FPS
                     self.fps_counter += 1
@@ -945,13 +1323,12 @@ class YOLO8NDIApp(ctk.CTk):
                         self.after(0, lambda fps=self.current_fps: self.fps_label.configure(text=f"FPS: {fps}"))
 
                     # Update preview (毎フレーム更新 - 60fps)
-                    self.update_both_previews(frame, seg_mask)
+                    self.update_output_preview(seg_buf.array)
 
-                # フレームレート制御
-                elapsed = time.time() - start_time
-                sleep_time = frame_time - elapsed
-                if sleep_time > 0:
-                    time.sleep(sleep_time)
+                    seg_buf.release()
+
+                # バッファをプールに返却
+                frame_buf.release()
 
             except Exception as e:
                 print(f"Processing error: {e}")
@@ -959,143 +1336,87 @@ class YOLO8NDIApp(ctk.CTk):
                 traceback.print_exc()
                 time.sleep(0.01)
 
-    def process_frame(self, frame):
-        """フレーム処理 - YOLOv8でセグメンテーションマスク生成"""
+    def start_metrics(self):
+        """ヒストグラムをリセットし、定期レポート（コンソール・JSONL・HTTP）を開始"""
+        self.metrics.reset()
+        self._last_recv_perf = None
+        options = dict(interval_s=self.metrics_interval_s, jsonl_path=self.metrics_file or None,
+                       on_report=self.print_metrics)
         try:
-            # Check if model is loaded
-            if self.model is None:
-                print("[ERROR] Model is not loaded!")
-                return None
-
-            # BGR to RGB
-            src = cv2.cvtColor(frame[:, :, :3], cv2.COLOR_BGR2RGB)
-            h, w = src.shape[:2]
-
-            # Run YOLOv8 segmentation
-            results = self.model.predict(
-                src,
-                conf=self.confidence_threshold,
-                iou=self.iou_threshold,
-                classes=[0] if self.person_only else None,  # 0 = person in COCO dataset
-                verbose=False,
-                device=DEVICE
-            )
-
-            # Create empty mask
-            mask = np.zeros((h, w), dtype=np.float32)
-
-            # Process results
-            if len(results) > 0 and results[0].masks is not None:
-                masks_data = results[0].masks.data  # tensor of masks
-
-                # Combine all detected object masks
-                for i in range(len(masks_data)):
-                    # Get mask for this detection
-                    single_mask = masks_data[i].cpu().numpy()
-
-                    # Resize mask to original size
-                    single_mask_resized = cv2.resize(single_mask, (w, h), interpolation=cv2.INTER_LINEAR)
-
-                    # Add to combined mask (max operation to combine overlapping masks)
-                    mask = np.maximum(mask, single_mask_resized)
-
-            # Debug: Print mask value range (first frame only)
-            if not hasattr(self, '_debug_printed'):
-                print(f"[DEBUG] Mask shape: {mask.shape}")
-                print(f"[DEBUG] Mask range: min={mask.min():.3f}, max={mask.max():.3f}, mean={mask.mean():.3f}")
-                if h > 0 and w > 0:
-                    center_val = mask[h//2, w//2]
-                    corner_val = mask[0, 0]
-                    print(f"[DEBUG] Center mask: {center_val:.3f}, Corner mask: {corner_val:.3f}")
-                print(f"[DEBUG] Alpha mode: {'Soft (Gradient)' if self.use_soft_alpha else 'Binary (Hard)'}")
-                self._debug_printed = True
-
-            # Temporal Smoothing（時間的平滑化）
-            if self.smoothing_enabled:
-                if not hasattr(self, '_prev_alpha'):
-                    self._prev_alpha = mask
-                else:
-                    # EMA (Exponential Moving Average)
-                    mask = self.smoothing_alpha * mask + (1 - self.smoothing_alpha) * self._prev_alpha
-                    self._prev_alpha = mask
-
-            # アルファ処理：ソフトアルファ or 二値化
-            if self.use_soft_alpha:
-                # ソフトアルファモード（グラデーション）
-                # アルファコントラスト調整
-                if self.alpha_contrast != 1.0:
-                    # コントラスト調整: mask = ((mask - 0.5) * contrast) + 0.5
-                    mask = np.clip((mask - 0.5) * self.alpha_contrast + 0.5, 0.0, 1.0)
-
-                # 0-255の範囲に変換（グラデーション保持）
-                alpha_soft = (mask * 255).astype(np.uint8)
-
-                # Edge Refinement（ソフトアルファ時はガウシアンブラーのみ）
-                if self.edge_refinement:
-                    # ガウシアンブラーでエッジを滑らかに
-                    alpha_soft = cv2.GaussianBlur(alpha_soft, (self.edge_kernel_size, self.edge_kernel_size), 0)
-
-                alpha_final = alpha_soft
-            else:
-                # 二値化モード（ハードエッジ）
-                # Binarize mask (threshold at 0.5)
-                # 人物: 255 (白), 背景: 0 (黒)
-                alpha_binary = (mask > 0.5).astype(np.uint8) * 255
-
-                # Edge Refinement（エッジ精緻化）
-                if self.edge_refinement:
-                    # モルフォロジー処理でエッジを滑らかに
-                    kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (self.edge_kernel_size, self.edge_kernel_size))
-                    # Opening: ノイズ除去
-                    alpha_binary = cv2.morphologyEx(alpha_binary, cv2.MORPH_OPEN, kernel)
-                    # Closing: 穴埋め
-                    alpha_binary = cv2.morphologyEx(alpha_binary, cv2.MORPH_CLOSE, kernel)
-                    # ガウシアンブラー + 再二値化でエッジを滑らかに
-                    alpha_binary = cv2.GaussianBlur(alpha_binary, (self.edge_kernel_size, self.edge_kernel_size), 0)
-                    alpha_binary = (alpha_binary > 127).astype(np.uint8) * 255
-
-                alpha_final = alpha_binary
-
-            # Create BGRA output - セグメンテーションマスクのみを表示（白黒画像）
-            seg_mask_output = np.zeros((h, w, 4), dtype=np.uint8)
-
-            # 全チャンネルにマスクを適用（白黒表示）
-            seg_mask_output[:, :, 0] = alpha_final  # B
-            seg_mask_output[:, :, 1] = alpha_final  # G
-            seg_mask_output[:, :, 2] = alpha_final  # R
-            seg_mask_output[:, :, 3] = 255          # A (完全不透明)
-
-            return seg_mask_output
-
-        except Exception as e:
-            import traceback
-            print(f"[ERROR] Frame processing error: {e}")
-            print(traceback.format_exc())
-            return None
-
-    def update_both_previews(self, input_frame, output_frame):
-        """両方のプレビューを更新（60fps目標）"""
+            self.metrics_exporter = MetricsExporter(self.metrics, http_port=self.metrics_port, **options).start()
+        except OSError as e:
+            # ポートが使用中など。HTTPで公開できなくてもレポートは続ける
+            print(f"[WARNING] Metrics HTTP port {self.metrics_port} unavailable: {e}")
+            self.metrics_exporter = MetricsExporter(self.metrics, **options).start()
+
+    def print_metrics(self, report):
+        """定期レポートの表示（MetricsExporterのスレッドから呼ばれるので、処理ループは止まらない）"""
+        if not report['histograms']:
+            return
+        print(f"\n[PERFORMANCE] Timing over {report['interval_s']:.1f}s (ms, source {self.source_frame_rate:.2f}fps):")
+        for name, h in report['histograms'].items():
+            print(f"  {name:15s}: p50={h['p50_ms']:6.2f}, p95={h['p95_ms']:6.2f}, "
+                  f"p99={h['p99_ms']:6.2f}, max={h['max_ms']:6.2f} (n={h['count']})")
+        if self.process_sub is not None:
+            self._last_recv_perf = self.print_receive_stats(self._last_recv_perf)
+        controller = self.latency_controller
+        if controller is not None:
+            print(f"  Auto resolution: imgsz={controller.value} (max {self.imgsz}), "
+                  f"budget={controller.budget_ms:.2f}ms, steps down={controller.steps_down} up={controller.steps_up}")
+
+    def print_receive_stats(self, previous):
+        """
+        受信側の統計を表示（前回からの増分）
+
+        NDI受信のドロップ・タイムスタンプ欠落が増えていればネットワーク/受信側の問題、
+        キャプチャリングのdropped/overwrittenが増えていれば推論が間に合っていない
+        """
+        capture = self.process_sub.stats()
+        if self.capture_policy == 'framesync':
+            # repeatedが多ければソースの到着が遅れている、lateが多ければ推論が間に合っていない
+            # unknown: タイムスタンプもタイムコードもないソースで、新規か繰り返しか判定できないフレーム
+            print(f"  Frame sync: ticks={capture['ticks']}, new={capture['new']}, "
+                  f"repeated={capture['repeated']}, unknown={capture['unknown']}, late={capture['late']}")
+        else:
+            print(f"  Capture ({self.capture_policy}): dropped={capture['dropped']}, "
+                  f"overwritten={capture['overwritten']}, queued={capture['queued']}")
+
+        recv = self.process_sub.receiver.get_performance()
+        prev = previous or {}
+        print(f"  NDI receive: sdk_dropped=+{recv['dropped_video'] - prev.get('dropped_video', 0)}, "
+              f"missed=+{recv['frames_missed'] - prev.get('frames_missed', 0)} "
+              f"({recv['timestamp_gaps'] - prev.get('timestamp_gaps', 0)} gaps), "
+              f"sdk_queue={recv['queued_video']}, total={recv['total_video']}")
+        return recv
+
+    def on_output_activity_changed(self):
+        """出力のアイドル状態が変化した（処理スレッドから呼ばれる）"""
+        activity = self.output_activity
+        if activity.idle:
+            print(f"[INFO] Output idle ({activity.reason}), processing at {activity.idle_fps} fps")
+            status = f"Idle ({activity.reason})"
+        else:
+            print("[INFO] Output active, processing every frame")
+            # 間引いていた間の平滑化履歴は古いのでリセット
+            self.reset_state()
+            status = "Processing..."
+        self.after(0, lambda: self.status_label.configure(text=status))
+
+    def update_output_preview(self, output_frame):
+        """出力プレビューを更新（入力プレビューはプレビュー購読側で更新）"""
         try:
             preview_w = 800
-            h, w = input_frame.shape[:2]
+            h, w = output_frame.shape[:2]
             preview_h = int(h * preview_w / w)
 
-            # Input preview
-            input_rgb = cv2.cvtColor(input_frame[:, :, :3], cv2.COLOR_BGR2RGB)
-            input_small = cv2.resize(input_rgb, (preview_w, preview_h), interpolation=cv2.INTER_LINEAR)
-            input_img = Image.fromarray(input_small)
-            input_photo = ctk.CTkImage(light_image=input_img, dark_image=input_img, size=(preview_w, preview_h))
-
-            # Output preview
-            output_rgb = cv2.cvtColor(output_frame[:, :, :3], cv2.COLOR_BGR2RGB)
-            output_small = cv2.resize(output_rgb, (preview_w, preview_h), interpolation=cv2.INTER_LINEAR)
+            # 1チャンネルのマスクを縮小してからRGBに展開
+            output_small = cv2.resize(output_frame, (preview_w, preview_h), interpolation=cv2.INTER_LINEAR)
+            output_small = cv2.cvtColor(output_small, cv2.COLOR_GRAY2RGB)
             output_img = Image.fromarray(output_small)
             output_photo = ctk.CTkImage(light_image=output_img, dark_image=output_img, size=(preview_w, preview_h))
 
             # UIスレッドで更新
             def update():
-                self.input_preview.configure(image=input_photo, text="")
-                self.input_preview.image = input_photo
                 self.output_preview.configure(image=output_photo, text="")
                 self.output_preview.image = output_photo
 
@@ -1108,6 +1429,7 @@ class YOLO8NDIApp(ctk.CTk):
         """ウィンドウクローズ処理"""
         self.stop_processing()
         self.stop_preview()
+        self.receiver_hub.close()
 
         if self.finder:
             self.finder.close()
@@ -0,0 +1,167 @@
+"""
+YOLOv8 process_frame のオフラインベンチマーク（NDI・GUIなし）
+
+合成フレーム（カラーバー＋移動バー）または録画ファイルのフレームで
+YOLO8Processor.process_frame を繰り返し呼び、ステージごとの処理時間の分布を
+表示してJSONに保存する。yolo8_ndi_appで実行:
+
+    python benchmark.py --output yolo8_baseline.json
+    python benchmark.py --baseline yolo8_baseline.json   # 10%以上遅くなったケースがあれば終了コード1
+
+各軸は複数の値を指定でき、先頭の値が基準。既定では基準のケースと、1つの軸だけを
+変えたケースを計測する（--full で全組み合わせ）。CUDAのない環境ではcpuだけを計測する。
+"""
+import argparse
+import json
+import os
+import sys
+
+import torch
+
+# 共有ndi_wrapperパッケージ（リポジトリ直下）
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app_complete import YOLO8Processor, DEVICE, SETTINGS_FILE
+from ndi_wrapper.benchmark import (
+    RESOLUTIONS, COMPARE_METRICS, parse_resolution, benchmark_frames, sweep, case_name, run_case, print_case,
+    environment_info, write_baseline, load_baseline, compare_to_baseline,
+)
+
+PRECISIONS = ('fp16', 'fp32', 'cpu')
+
+# 設定ファイルから全ケースに適用するパラメータ（スイープする軸以外）
+FIXED_SETTINGS = (
+    'confidence_threshold', 'iou_threshold', 'person_only', 'alpha_contrast', 'smoothing_alpha', 'edge_kernel_size',
+)
+
+
+def load_fixed_settings(processor, path):
+    """設定ファイル（GUIの"Save Settings"で保存したもの）のうちFIXED_SETTINGSを反映"""
+    with open(path, 'r') as f:
+        settings = json.load(f)
+    for key in FIXED_SETTINGS:
+        if key in settings:
+            setattr(processor, key, settings[key])
+    print(f"[INFO] Settings loaded from {path}")
+
+
+def apply_case(processor, settings):
+    """ケースのパラメータを設定し、前のケースの平滑化履歴をリセット"""
+    processor.imgsz = settings['imgsz']
+    processor.use_soft_alpha = settings['alpha'] == 'soft'
+    processor.smoothing_enabled = settings['smoothing'] == 'on'
+    processor.edge_refinement = settings['edge'] == 'on'
+    processor.auto_resolution = False
+    processor.latency_controller = None
+    processor.reset_state()
+
+
+def run_cases(processor, cases, args):
+    """ケースを計測（モデルは精度・デバイスが変わる時だけ読み込み直す）"""
+    results = []
+    loaded = None
+    for settings in cases:
+        precision = settings['precision']
+        if loaded != precision:
+            processor.device = 'cpu' if precision == 'cpu' else 'cuda'
+            processor.use_fp16 = precision == 'fp16'
+            processor.load_yolo_model()
+            loaded = precision
+
+        apply_case(processor, settings)
+        width, height = parse_resolution(settings['resolution'])
+        frames = benchmark_frames(width, height, args.distinct_frames, args.input, args.receive_format)
+        result = run_case(processor.process_frame, frames, args.frames, args.warmup, metrics=processor.metrics)
+
+        name = case_name(settings)
+        print_case(name, result)
+        results.append(dict(name=name, settings=settings, **result))
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python benchmark.py", description="YOLOv8 process_frame offline benchmark")
+    parser.add_argument('--resolution', nargs='+', default=['1080p', '720p', '2160p'],
+                        help=f"入力解像度（{', '.join(RESOLUTIONS)} または WIDTHxHEIGHT）")
+    parser.add_argument('--imgsz', nargs='+', type=int, default=[640, 320, 1280], help="推論サイズ（32の倍数）")
+    parser.add_argument('--alpha', nargs='+', choices=('binary', 'soft'), default=['binary', 'soft'], help="アルファモード")
+    parser.add_argument('--smoothing', nargs='+', choices=('off', 'on'), default=['off', 'on'], help="時間的平滑化")
+    parser.add_argument('--edge', nargs='+', choices=('off', 'on'), default=['off', 'on'], help="エッジ精緻化")
+    parser.add_argument('--precision', nargs='+', choices=PRECISIONS, default=list(PRECISIONS),
+                        help="fp16/fp32 (CUDA) または cpu")
+    parser.add_argument('--full', action='store_true', help="全組み合わせを計測（既定は1軸ずつ）")
+    parser.add_argument('--frames', type=int, default=100, help="計測するフレーム数（ケースごと）")
+    parser.add_argument('--warmup', type=int, default=10, help="計測前に処理するフレーム数")
+    parser.add_argument('--distinct-frames', type=int, default=8, help="繰り返し使う入力フレームの枚数")
+    parser.add_argument('--input', help="合成フレームの代わりに使う動画/画像ファイル")
+    parser.add_argument('--receive-format', choices=('bgra', 'uyvy'), default='bgra', help="入力フレームの形式")
+    parser.add_argument('--settings', help=f"全ケースに適用する設定ファイル（例: {SETTINGS_FILE}）")
+    parser.add_argument('--output', help="結果を保存するJSONファイル（ベースライン）")
+    parser.add_argument('--baseline', help="比較するベースラインのJSONファイル")
+    parser.add_argument('--tolerance', type=float, default=10.0, help="ベースラインより遅くてよい割合（%%）")
+    parser.add_argument('--metric', choices=COMPARE_METRICS, default='p50_ms', help="比較するprocess_frameの値")
+    args = parser.parse_args(argv)
+
+    for value in args.resolution:
+        try:
+            parse_resolution(value)
+        except ValueError as e:
+            parser.error(str(e))
+
+    precisions = args.precision
+    if DEVICE != 'cuda' and precisions != ['cpu']:
+        print("[WARNING] CUDA not available, measuring precision=cpu only")
+        precisions = ['cpu']
+
+    cases = sweep({
+        'resolution': args.resolution,
+        'imgsz': args.imgsz,
+        'alpha': args.alpha,
+        'smoothing': args.smoothing,
+        'edge': args.edge,
+        'precision': precisions,
+    }, full=args.full)
+
+    processor = YOLO8Processor()
+    processor.init_processor()
+    if args.settings:
+        load_fixed_settings(processor, args.settings)
+
+    # モデルの読み込み直しが精度の切り替え時だけになるように並べ、表示・保存はスイープの順番
+    order = {case_name(c): i for i, c in enumerate(cases)}
+    results = run_cases(processor, sorted(cases, key=lambda c: PRECISIONS.index(c['precision'])), args)
+    results.sort(key=lambda r: order[r['name']])
+
+    try:
+        from ultralytics import __version__ as ultralytics_version
+    except ImportError:
+        ultralytics_version = None
+    environment = environment_info(
+        device=DEVICE,
+        gpu=torch.cuda.get_device_name(0) if DEVICE == 'cuda' else None,
+        torch=torch.__version__,
+        cuda=torch.version.cuda,
+        ultralytics=ultralytics_version,
+        model='yolov8n-seg.pt',
+    )
+    config = {
+        'frames': args.frames,
+        'warmup': args.warmup,
+        'distinct_frames': args.distinct_frames,
+        'input': args.input or 'synthetic',
+        'receive_format': args.receive_format,
+        'settings': args.settings or '',
+    }
+    if args.output:
+        write_baseline(args.output, 'yolo8', results, environment, config)
+
+    if args.baseline:
+        regressions = compare_to_baseline(results, load_baseline(args.baseline), args.tolerance / 100.0,
+                                          args.metric, environment=environment)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
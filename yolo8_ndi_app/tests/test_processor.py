@@ -0,0 +1,108 @@
+"""YOLO8Processor: the GUI and the benchmark run the same process_frame"""
+import os
+import sys
+
+import numpy as np
+import pytest
+
+# app_completeのあるディレクトリ（yolo8_ndi_app）
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+torch = pytest.importorskip('torch')
+pytest.importorskip('cv2')
+pytest.importorskip('customtkinter')
+pytest.importorskip('ultralytics')
+
+from app_complete import YOLO8Processor, YOLO8NDIApp
+
+WIDTH, HEIGHT = 64, 32
+
+
+class FakeMasks:
+    def __init__(self, data):
+        self.data = data
+
+
+class FakeResult:
+    def __init__(self, data):
+        self.masks = FakeMasks(data) if data is not None else None
+
+
+class FakeYOLO:
+    """model.predictの代わり: 指定したマスク（モデル解像度）を返し、引数を記録"""
+
+    def __init__(self, masks):
+        self.masks = list(masks)
+        self.calls = []
+
+    def predict(self, src, **kwargs):
+        self.calls.append((src.shape, kwargs))
+        return [FakeResult(self.masks.pop(0))]
+
+
+def left_half_mask():
+    # モデル解像度 (16, 32) の1検出: 左半分が人物
+    data = torch.zeros((1, HEIGHT // 2, WIDTH // 2))
+    data[:, :, :WIDTH // 4] = 1.0
+    return data
+
+
+@pytest.fixture
+def processor():
+    processor = YOLO8Processor()
+    processor.init_processor()
+    processor.device = 'cpu'
+    return processor
+
+
+def bgra_frame():
+    return np.full((HEIGHT, WIDTH, 4), 128, dtype=np.uint8)
+
+
+def test_app_uses_the_processor_methods():
+    # Tk側の同名メソッド・属性で処理が隠れていない（GUIもこのprocess_frameを呼ぶ）
+    for name, value in vars(YOLO8Processor).items():
+        if callable(value) and not name.startswith('__'):
+            assert getattr(YOLO8NDIApp, name) is value, name
+
+
+def test_binary_mask_and_predict_arguments(processor):
+    processor.model = FakeYOLO([left_half_mask()])
+    result = processor.process_frame(bgra_frame())
+    try:
+        alpha = result.array
+        assert alpha.shape == (HEIGHT, WIDTH)
+        assert (alpha[:, :WIDTH // 2 - 4] == 255).all()
+        assert (alpha[:, WIDTH // 2 + 4:] == 0).all()
+    finally:
+        result.release()
+
+    shape, kwargs = processor.model.calls[0]
+    assert shape == (HEIGHT, WIDTH, 3)
+    assert kwargs == dict(imgsz=640, conf=0.5, iou=0.5, classes=[0], verbose=False, device='cpu', half=False)
+
+
+def test_no_detection_gives_empty_mask(processor):
+    processor.model = FakeYOLO([None])
+    result = processor.process_frame(bgra_frame())
+    try:
+        assert not result.array.any()
+    finally:
+        result.release()
+
+
+def test_soft_alpha_smoothing_and_reset(processor):
+    processor.use_soft_alpha = True
+    processor.smoothing_enabled = True
+    processor.model = FakeYOLO([left_half_mask(), None, None])
+
+    processor.process_frame(bgra_frame()).release()
+    # 検出が消えても前フレームの履歴が残る: 0.3 * 0 + 0.7 * 1
+    result = processor.process_frame(bgra_frame())
+    assert result.array[0, 0] == int(0.7 * 255)
+    result.release()
+
+    processor.reset_state()
+    result = processor.process_frame(bgra_frame())
+    assert not result.array.any()
+    result.release()